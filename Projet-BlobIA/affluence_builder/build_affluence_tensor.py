@@ -0,0 +1,36 @@
+import sys
+import os
+import json
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from affluence_builder.get_affluence import JOURS, get_affluence_tensor_from_file
+from blobia.affluence_tensor import index_path
+from blobia.graph_store import load_graph_store
+
+# -- Répertoires --
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+
+TENSOR_FILENAME = "affluence_tensor.npy"
+
+def save_affluence_tensor():
+    """
+    Écrit le tenseur d'affluence float32 [jour, heure, noeud] (data/affluence_tensor.npy,
+    ouvert en mmap par blobia/affluence_tensor.py) et son index (jours, identifiants des noeuds
+    du graphe, dans l'ordre du réseau compilé).
+    """
+    net = load_graph_store(os.path.join(DATA_DIR, "graph_blobia.graph")).network()
+    t0 = time.perf_counter()
+    tensor = get_affluence_tensor_from_file(os.path.join(DATA_DIR, "Stations_IDF_aligned_affluence.csv"), net)
+    path = os.path.join(DATA_DIR, TENSOR_FILENAME)
+    np.save(path, tensor.astype(np.float32))
+    with open(index_path(path), "w") as f:
+        json.dump({"jours": JOURS, "node_keys": [str(k) for k in net.node_keys]}, f)
+    print(f"Tenseur d'affluence {tensor.shape} ({tensor.size * 4 / 1024:.0f} Ko) "
+          f"en {time.perf_counter() - t0:.2f} s : {TENSOR_FILENAME}")
+
+if __name__ == "__main__":
+    save_affluence_tensor()
@@ -1,5 +1,7 @@
 import sys
 import os
+import json
+import hashlib
 import pandas as pd
 import numpy as np
 
@@ -30,59 +32,146 @@ BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DATA_PATH = os.path.join(BASE_DIR, 'data', 'Stations_IDF_aligned.csv')
 OUTPUT_PATH = os.path.join(BASE_DIR, 'data', 'Stations_IDF_aligned_affluence.csv')
 
-# -- Chargement du dataset --
-df = pd.read_csv(DATA_PATH)
-df["station_key"] = df["station_key"].astype(str).apply(normalize_station_key)
-df["ligne"] = df["ligne"].astype(str)
-df["main_line"] = df["ligne"].apply(extract_main_line)
-
-# -- Colonne affluence_score vide --
-df["affluence_score"] = np.nan
-
-# 1. Affecte le score des BIG_HUBS sur toutes les lignes où ils apparaissent
-for idx, row in df.iterrows():
-    s_key = row["station_key"]
-    score_hub = BIG_HUBS_SCORE.get(s_key, None)
-    if score_hub is not None:
-        df.at[idx, "affluence_score"] = score_hub  # score hub absolu, non pondéré
-
-# 2. Bonus pour correspondances (multi-lignes) non hubs
-corresp = df.groupby("station_key")["main_line"].nunique()
-for s_key, n_lines in corresp[corresp > 1].items():
-    if pd.isna(df.loc[df["station_key"] == s_key, "affluence_score"]).all():
-        bonus = 0.5 + 0.05 * min(n_lines, 5)  # 0.5 à 0.75 max
-        for idx in df[df["station_key"] == s_key].index:
-            main_line = df.at[idx, "main_line"]
-            line_score = LINE_SCORE.get(main_line, DEFAULT_LINE_SCORE)
-            affluence = min(1.0, bonus * line_score)
-            df.at[idx, "affluence_score"] = affluence
-
-# 3. Propagation sur chaque branche réelle (ligne), pas juste main_line !
 PROPAGATION_FACTOR = 0.9
 SCORE_MIN = 0.15
-for ligne, group in df.groupby("ligne"):
-    indices = group.sort_values("ordre").index.tolist()
+
+def load_stations(data_path=DATA_PATH):
+    df = pd.read_csv(data_path)
+    df["station_key"] = df["station_key"].astype(str).apply(normalize_station_key)
+    df["ligne"] = df["ligne"].astype(str)
+    df["main_line"] = df["ligne"].apply(extract_main_line)
+    return df
+
+def seed_scores(df, hubs=BIG_HUBS_SCORE, line_score=LINE_SCORE, default_line_score=DEFAULT_LINE_SCORE):
+    """
+    Scores posés avant propagation (NaN ailleurs) :
+    1. BIG_HUBS : score hub absolu, non pondéré, sur toutes les lignes où la station apparaît ;
+    2. correspondances (plusieurs lignes principales) non hubs : bonus 0.5 à 0.75 selon le nombre
+       de lignes, pondéré par LINE_SCORE de la ligne.
+    """
+    scores = df["station_key"].map(hubs).astype(np.float64)
+    n_lines = df.groupby("station_key")["main_line"].transform("nunique")
+    hub = scores.notna().groupby(df["station_key"]).transform("any")
+    corresp = (n_lines > 1) & ~hub
+    bonus = 0.5 + 0.05 * np.minimum(n_lines, 5)
+    ligne_score = df["main_line"].map(line_score).fillna(default_line_score)
+    scores[corresp] = np.minimum(1.0, bonus * ligne_score)[corresp]
+    return scores
+
+def _line_order(df):
+    # Ordre de chaque branche (même tri que groupby("ligne") + sort_values("ordre"), y compris
+    # pour les ex aequo de "ordre" sur les lignes en boucle)
+    return np.concatenate([group.sort_values("ordre").index.to_numpy() for _, group in df.groupby("ligne")])
+
+def _chain(seeds, lines):
+    """
+    Propagation dans l'ordre donné : chaque trou suivant un score reçoit le précédent
+    * PROPAGATION_FACTOR (au moins SCORE_MIN). Les produits cumulés par segment (un segment
+    commence à chaque score posé) font exactement les mêmes multiplications que la boucle
+    station par station. Renvoie le numéro de segment (0 : avant le premier score) et les valeurs.
+    """
+    manquant = np.isnan(seeds)
+    seg = pd.Series(~manquant).groupby(lines).cumsum().to_numpy()
+    facteurs = np.where(manquant, PROPAGATION_FACTOR, seeds)
+    produits = pd.Series(facteurs).groupby([lines, seg]).cumprod().to_numpy()
+    return seg, np.where(manquant, np.maximum(SCORE_MIN, produits), seeds)
+
+def propagate(df, seeds, lignes=None):
+    """
+    Scores finaux (propagation sur chaque branche réelle, pas juste main_line, dans les deux sens,
+    trous restants à SCORE_MIN, plafond 1.0), pour les branches `lignes` seulement si donné.
+    """
+    order = _line_order(df if lignes is None else df[df["ligne"].isin(lignes)])
+    lines = df["ligne"].to_numpy()[order]
+    seeds = seeds.to_numpy()[order]
     # Sens croissant
-    for i in range(1, len(indices)):
-        if pd.isna(df.at[indices[i], "affluence_score"]) and not pd.isna(df.at[indices[i-1], "affluence_score"]):
-            df.at[indices[i], "affluence_score"] = max(SCORE_MIN, df.at[indices[i-1], "affluence_score"] * PROPAGATION_FACTOR)
-    # Sens décroissant
-    for i in range(len(indices)-2, -1, -1):
-        if pd.isna(df.at[indices[i], "affluence_score"]) and not pd.isna(df.at[indices[i+1], "affluence_score"]):
-            df.at[indices[i], "affluence_score"] = max(SCORE_MIN, df.at[indices[i+1], "affluence_score"] * PROPAGATION_FACTOR)
-
-# 4. Remplis les trous par le minimum
-df["affluence_score"] = df["affluence_score"].fillna(SCORE_MIN)
-
-# 5. Normalise max à 1.0 (au cas où)
-df["affluence_score"] = df["affluence_score"].clip(upper=1.0)
-
-# 6. Sauvegarde
-df.to_csv(OUTPUT_PATH, index=False)
-print(f"Fichier généré : {OUTPUT_PATH}")
-
-# 7. Affiche quelques stats de vérif
-print("\nDistribution des scores :")
-print(df["affluence_score"].describe())
-print("\nTop 15 stations les plus affluentes :")
-print(df.sort_values("affluence_score", ascending=False)[["station_key", "main_line", "affluence_score"]].head(15))
+    seg, avant = _chain(seeds, lines)
+    # Sens décroissant : seuls les trous avant le premier score de la branche restent à remplir
+    _, arriere = _chain(seeds[::-1], lines[::-1])
+    valeurs = np.where(seg > 0, avant, arriere[::-1])
+    scores = pd.Series(valeurs, index=order).sort_index()
+    return scores.fillna(SCORE_MIN).clip(upper=1.0)
+
+def compute_affluence(df, hubs=BIG_HUBS_SCORE, line_score=LINE_SCORE, default_line_score=DEFAULT_LINE_SCORE):
+    df = df.copy()
+    df["affluence_score"] = propagate(df, seed_scores(df, hubs, line_score, default_line_score))
+    return df
+
+def affected_lines(df, old, new):
+    """
+    Branches dont le score peut changer entre deux jeux de paramètres (hubs, line_score,
+    default_line_score) : celles qui passent par un hub modifié, ajouté ou retiré, et celles
+    d'une ligne principale dont le poids a changé, si elles ont une correspondance non hub.
+    """
+    hubs = set(old["hubs"]) | set(new["hubs"])
+    hubs_changes = {s for s in hubs if old["hubs"].get(s) != new["hubs"].get(s)}
+    lignes_changees = {
+        m for m in df["main_line"].unique()
+        if old["line_score"].get(m, old["default_line_score"]) != new["line_score"].get(m, new["default_line_score"])
+    }
+    n_lines = df.groupby("station_key")["main_line"].transform("nunique")
+    touchees = df["station_key"].isin(hubs_changes) | (df["main_line"].isin(lignes_changees) & (n_lines > 1))
+    return set(df.loc[touchees, "ligne"])
+
+def _params_path(output_path):
+    return os.path.splitext(output_path)[0] + "_params.json"
+
+def _file_sha1(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def create_affluence(data_path=DATA_PATH, output_path=OUTPUT_PATH, hubs=BIG_HUBS_SCORE, line_score=LINE_SCORE,
+                     default_line_score=DEFAULT_LINE_SCORE, incremental=True):
+    """
+    Écrit le CSV d'affluence et, à côté, les paramètres utilisés (_params.json).
+    incremental=True : si le CSV précédent a été produit depuis les mêmes stations, avec les mêmes
+    PROPAGATION_FACTOR / SCORE_MIN et le même code (empreinte de ce fichier), seules les branches
+    touchées par un changement de BIG_HUBS_SCORE / LINE_SCORE / DEFAULT_LINE_SCORE sont
+    recalculées, les autres gardent leur score ; sinon tout est recalculé. Renvoie (df, branches recalculées ou None si
+    tout a été recalculé).
+    """
+    df = load_stations(data_path)
+    params = {
+        "source": _file_sha1(data_path),
+        "code": _file_sha1(os.path.abspath(__file__)),
+        "propagation_factor": PROPAGATION_FACTOR,
+        "score_min": SCORE_MIN,
+        "hubs": dict(hubs),
+        "line_score": dict(line_score),
+        "default_line_score": default_line_score,
+    }
+    previous = None
+    if incremental and os.path.exists(output_path) and os.path.exists(_params_path(output_path)):
+        with open(_params_path(output_path)) as f:
+            previous = json.load(f)
+        # Paramètres hors de affected_lines (ou ancien fichier sans eux) : reconstruction complète
+        if any(previous.get(cle) != params[cle] for cle in ("source", "code", "propagation_factor", "score_min")):
+            previous = None
+
+    if previous is None:
+        lignes = None
+        df["affluence_score"] = propagate(df, seed_scores(df, hubs, line_score, default_line_score))
+    else:
+        lignes = affected_lines(df, previous, params)
+        # round_trip : relit exactement les flottants écrits, pour un CSV identique octet par octet
+        df["affluence_score"] = pd.read_csv(output_path, float_precision="round_trip")["affluence_score"].to_numpy()
+        if lignes:
+            scores = propagate(df, seed_scores(df, hubs, line_score, default_line_score), lignes)
+            df.loc[scores.index, "affluence_score"] = scores
+
+    df.to_csv(output_path, index=False)
+    with open(_params_path(output_path), "w") as f:
+        json.dump(params, f, indent=1, sort_keys=True)
+    return df, lignes
+
+if __name__ == "__main__":
+    df, lignes = create_affluence()
+    if lignes is not None:
+        print(f"Branches recalculées : {len(lignes)} ({', '.join(sorted(lignes)) or 'aucune'})")
+    print(f"Fichier généré : {OUTPUT_PATH}")
+
+    # Affiche quelques stats de vérif
+    print("\nDistribution des scores :")
+    print(df["affluence_score"].describe())
+    print("\nTop 15 stations les plus affluentes :")
+    print(df.sort_values("affluence_score", ascending=False)[["station_key", "main_line", "affluence_score"]].head(15))
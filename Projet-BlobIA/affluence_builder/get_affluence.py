@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import pandas as pd
 import sys
 
@@ -7,6 +8,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import PROFILE_JOUR, PROFILE_HEURE
 
 SCORE_MIN = 0.15
+JOURS = list(PROFILE_JOUR)  # axe 0 du tenseur d'affluence (lundi -> dimanche)
 
 def get_affluence_mapping(affluence_df, jour, heure):
     """
@@ -29,6 +31,30 @@ def get_affluence_mapping_from_file(affluence_path, jour, heure):
     df["ligne"] = df["ligne"].astype(str).str.strip()
     return get_affluence_mapping(df, jour, heure)
 
+def get_affluence_tensor(affluence_df, net, default=0.2):
+    """
+    Tenseur float64 [jour (JOURS), heure (0-23), noeud du réseau compilé] : chaque tranche
+    [j, h] vaut exactement net.affluence_vector(get_affluence_mapping(affluence_df, JOURS[j], h)),
+    calculée en une seule fois (recherche horaire en O(1) par noeud).
+    """
+    base = {(k, l): s for k, l, s in zip(affluence_df['station_key'], affluence_df['ligne'], affluence_df['affluence_score'])}
+    base = np.array([
+        base.get((net.stations[s], net.lines[l]), np.nan)
+        for s, l in zip(net.station_id.tolist(), net.line_id.tolist())
+    ], dtype=np.float64)
+    coef_jour = np.array([PROFILE_JOUR[j] for j in JOURS])
+    coef_heure = np.array([PROFILE_HEURE.get(h, 0.5) for h in range(24)])
+    # Même ordre d'opérations que get_affluence_mapping : (score * coef_jour) * coef_heure
+    tensor = np.minimum(1.0, base[None, None, :] * coef_jour[:, None, None] * coef_heure[None, :, None])
+    tensor[:, :, np.isnan(base)] = default
+    return tensor
+
+def get_affluence_tensor_from_file(affluence_path, net):
+    df = pd.read_csv(affluence_path)
+    df["station_key"] = df["station_key"].astype(str).str.strip().str.lower()
+    df["ligne"] = df["ligne"].astype(str).str.strip()
+    return get_affluence_tensor(df, net)
+
 def apply_affluence_to_graph(G, affluence_mapping):
     """
     Applique les scores dynamiques à chaque noeud du graphe NetworkX.
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import pickle
+import argparse
+import statistics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from blobia.graph_store import load_graph_store
+from blobia.network import compile_network
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+PICKLE_PATH = os.path.join(DATA_DIR, "graph_blobia.gpickle")
+STORE_PATH = os.path.join(DATA_DIR, "graph_blobia.graph")
+
+NB_REPETITIONS = 20
+
+def _chrono(fn, nb_repetitions):
+    durees = []
+    for _ in range(nb_repetitions):
+        t0 = time.perf_counter()
+        fn()
+        durees.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(durees), min(durees)
+
+def _pickle_network():
+    with open(PICKLE_PATH, "rb") as f:
+        return compile_network(pickle.load(f))
+
+def _pickle_graph():
+    with open(PICKLE_PATH, "rb") as f:
+        return pickle.load(f)
+
+def run(nb_repetitions=NB_REPETITIONS):
+    """
+    Temps de chargement (ms, médiane et minimum) du graphe pickle et du format colonne, jusqu'au
+    réseau compilé (ce que chargent les moteurs) et jusqu'au graphe NetworkX (adaptateur).
+    """
+    net = load_graph_store(STORE_PATH).network()
+    if net.fingerprint() != _pickle_network().fingerprint():
+        raise SystemExit("graph_blobia.graph ne correspond pas à graph_blobia.gpickle : relancer graph_builder/build_graph.py")
+
+    mesures = [
+        ("pickle -> Network", lambda: _pickle_network()),
+        ("colonne -> Network", lambda: load_graph_store(STORE_PATH).network()),
+        ("pickle -> nx.Graph", lambda: _pickle_graph()),
+        ("colonne -> nx.Graph", lambda: load_graph_store(STORE_PATH).to_networkx()),
+    ]
+    print(f"{'chargement':<22} {'médiane ms':>11} {'min ms':>8}")
+    for nom, fn in mesures:
+        mediane, minimum = _chrono(fn, nb_repetitions)
+        print(f"{nom:<22} {mediane:>11.2f} {minimum:>8.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare le chargement du graphe pickle et du format colonne")
+    parser.add_argument("--repetitions", type=int, default=NB_REPETITIONS)
+    args = parser.parse_args()
+    run(args.repetitions)
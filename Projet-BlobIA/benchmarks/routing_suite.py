@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Code et données mesurés : ce dépôt, ou l'arbre de référence extrait par --reference
+RACINE = os.path.abspath(os.environ.get("BLOBIA_RACINE", BASE_DIR))
+sys.path.append(RACINE)
+from affluence_builder.get_affluence import get_affluence_mapping_from_file
+from blobia.mapping import find_stations_near_monument, normalize_name
+from blobia.route import find_best_route
+from blobia.graph_store import load_graph_store
+
+DATA_DIR = os.path.join(RACINE, 'data')
+GRAPH_PATH = os.path.join(DATA_DIR, "graph_blobia.graph")
+AFFLUENCE_PATH = os.path.join(DATA_DIR, "Stations_IDF_aligned_affluence.csv")
+MONUMENTS_PATH = os.path.join(DATA_DIR, "monuments.csv")
+GRAPH_NODES_PATH = os.path.join(DATA_DIR, "graph_nodes.csv")
+
+SEED = 0
+NB_REQUETES = 120
+NB_MONUMENTS = 12
+JOURS = ["lundi", "mercredi", "samedi", "dimanche"]
+HEURES = [3, 8, 13, 18]
+CURSEURS = range(1, 11)
+RAYON_M = 900
+# Ralentissement toléré par rapport à la référence (même session) avant de signaler une régression
+TOLERANCE = 1.25
+NB_TOURS = 2
+# En dessous de cet écart (Mo), une hausse du pic mémoire n'est pas une régression
+ECART_MEMOIRE_MB = 1.0
+
+def select_destinations(net, monuments, seed=SEED, nb_monuments=NB_MONUMENTS):
+    """
+    Monuments de la charge, tirés avec la graine : ceux dont aucune station à moins de RAYON_M
+    n'est dans le graphe sont écartés (la requête échouerait), jusqu'à en avoir nb_monuments.
+    Renvoie ({monument: stations d'arrivée}, monuments écartés, durées de
+    find_stations_near_monument).
+    """
+    candidats = sorted(monuments)
+    random.Random(seed).shuffle(candidats)
+    destinations = {}
+    ecartes = []
+    durees = []
+    for monument in candidats:
+        if len(destinations) == nb_monuments:
+            break
+        proches, d = _timed(find_stations_near_monument, monument, rayon_m=RAYON_M,
+                            monuments_csv=MONUMENTS_PATH, stations_csv=GRAPH_NODES_PATH)
+        durees.append(d)
+        arrivees = [s for s, _ in proches if net.nodes_of_station(s)]
+        if arrivees:
+            destinations[monument] = arrivees
+        else:
+            ecartes.append(monument)
+    return destinations, ecartes, durees
+
+def build_workload(stations, monuments, nb_requetes=NB_REQUETES, seed=SEED):
+    """
+    Requêtes (départ, monument, jour, heure, curseur) tirées avec une graine fixe,
+    départs parmi les stations du graphe.
+    """
+    rng = random.Random(seed)
+    stations = sorted(stations)
+    monuments = sorted(monuments)
+    return [
+        (rng.choice(stations), rng.choice(monuments), rng.choice(JOURS), rng.choice(HEURES), rng.choice(CURSEURS))
+        for _ in range(nb_requetes)
+    ]
+
+def _timed(fonction, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = fonction(*args, **kwargs)
+    return result, time.perf_counter() - t0
+
+def _peak_mb(fonction, *args, **kwargs):
+    # Pic des allocations Python et numpy (tracemalloc) pendant l'appel, au-dessus de l'état d'avant
+    tracemalloc.reset_peak()
+    avant = tracemalloc.get_traced_memory()[0]
+    fonction(*args, **kwargs)
+    return (tracemalloc.get_traced_memory()[1] - avant) / (1 << 20)
+
+def summarize(durees, pics_mb=None):
+    """
+    Latences (ms) p50 / p95 / p99 / moyenne, débit (appels par seconde) et pic mémoire (Mo, pire
+    appel, None s'il n'a pas été mesuré) d'une série d'appels.
+    """
+    ms = np.asarray(durees) * 1000
+    total = float(np.sum(durees))
+    return {
+        "appels": len(durees),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "moyenne_ms": float(np.mean(ms)),
+        "debit_par_s": len(durees) / total if total else 0.0,
+        "pic_memoire_mb": max(pics_mb) if pics_mb else None,
+    }
+
+def run(nb_requetes=NB_REQUETES, seed=SEED, backend="python", memoire=True):
+    """
+    Chronomètre séparément get_affluence_mapping_from_file (une fois par jour/heure de la charge),
+    find_stations_near_monument (une fois par monument tiré) et find_best_route (chaque requête,
+    réseau compilé et affluence déjà chargés), sur le code et les données de RACINE.
+    Si memoire, un second passage, non chronométré, mesure le pic de chaque appel avec tracemalloc.
+    Une requête en erreur interrompt le run. Renvoie le dictionnaire de résultats.
+    """
+    net = load_graph_store(GRAPH_PATH).network()
+    monuments = pd.read_csv(MONUMENTS_PATH, encoding='cp1252')["Monument"].drop_duplicates()
+    gares = {normalize_name(g) for g in pd.read_csv(GRAPH_NODES_PATH)["gare_key"]}
+    stations = [s for s in set(net.stations) if s in gares]
+    destinations, ecartes, durees_monuments = select_destinations(net, monuments, seed)
+    workload = build_workload(stations, destinations, nb_requetes, seed)
+    creneaux = sorted({(j, h) for _, _, j, h, _ in workload})
+
+    durees_affluence = []
+    affluences = {}
+    for jour, heure in creneaux:
+        affluences[(jour, heure)], d = _timed(get_affluence_mapping_from_file, AFFLUENCE_PATH, jour, heure)
+        durees_affluence.append(d)
+
+    def route(requete):
+        depart, monument, jour, heure, curseur = requete
+        return find_best_route(net, affluences[(jour, heure)], depart, destinations[monument],
+                               curseur=curseur, backend=backend)
+
+    # Hors mesure : compilation ou chargement du noyau numba, premières conversions d'affluence
+    route(workload[0])
+    durees_routes = []
+    empreinte = hashlib.sha1()
+    for requete in workload:
+        routes, d = _timed(route, requete)
+        durees_routes.append(d)
+        empreinte.update(repr([(r["raw_path"], round(r["score"], 9)) for r in routes]).encode())
+
+    pics_affluence = pics_monuments = pics_routes = None
+    if memoire:
+        tracemalloc.start()
+        try:
+            pics_affluence = [_peak_mb(get_affluence_mapping_from_file, AFFLUENCE_PATH, j, h) for j, h in creneaux]
+            pics_monuments = [_peak_mb(find_stations_near_monument, m, rayon_m=RAYON_M, monuments_csv=MONUMENTS_PATH,
+                                       stations_csv=GRAPH_NODES_PATH) for m in list(destinations) + ecartes]
+            pics_routes = [_peak_mb(route, requete) for requete in workload]
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "meta": {
+            "racine": RACINE,
+            "seed": seed,
+            "requetes": nb_requetes,
+            "backend": backend,
+            "monuments_ecartes": ecartes,
+            "charge": hashlib.sha1(repr(workload).encode()).hexdigest(),
+            "resultats": empreinte.hexdigest(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "benchmarks": {
+            "get_affluence_mapping_from_file": summarize(durees_affluence, pics_affluence),
+            "find_stations_near_monument": summarize(durees_monuments, pics_monuments),
+            "find_best_route": summarize(durees_routes, pics_routes),
+        },
+    }
+
+def run_tree(racine, out_path, nb_requetes, seed, backend, memoire):
+    """
+    Un run dans un processus neuf, sur le code et les données de `racine` (ce script mesure les
+    deux arbres avec la même charge et les mêmes mesures).
+    """
+    commande = [sys.executable, os.path.abspath(__file__), "--mesurer", "--out", out_path,
+                "--requetes", str(nb_requetes), "--seed", str(seed), "--backend", backend]
+    if not memoire:
+        commande.append("--sans-memoire")
+    subprocess.run(commande, env=dict(os.environ, BLOBIA_RACINE=racine), cwd=racine, check=True)
+    with open(out_path) as f:
+        return json.load(f)
+
+def extract_reference(revision, dossier):
+    """
+    Extrait `revision` dans `dossier` (git worktree détaché) ; renvoie la racine du projet
+    dans l'arbre extrait.
+    """
+    top = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=BASE_DIR, check=True,
+                         capture_output=True, text=True).stdout.strip()
+    subprocess.run(["git", "worktree", "add", "--detach", dossier, revision], cwd=BASE_DIR, check=True,
+                   capture_output=True)
+    return os.path.join(dossier, os.path.relpath(BASE_DIR, top))
+
+def best_of(runs):
+    """
+    Meilleur des tours pour chaque mesure : latences et pic mémoire minimaux (pic mesuré au
+    premier tour seulement, il ne dépend pas de la charge de la machine), débit maximal.
+    """
+    meilleur = {}
+    for nom in runs[0]["benchmarks"]:
+        series = [r["benchmarks"][nom] for r in runs]
+        meilleur[nom] = {cle: (max if cle == "debit_par_s" else min)(s[cle] for s in series if s[cle] is not None)
+                         for cle in ("p50_ms", "p95_ms", "debit_par_s", "pic_memoire_mb")}
+    return meilleur
+
+def compare(courant, reference, tolerance=TOLERANCE):
+    """
+    Ratios courant / référence (mêmes sessions, meilleur des tours) et régressions : latence p50 /
+    p95 ou pic mémoire au-delà de tolerance fois la référence (pic : et d'au moins
+    ECART_MEMOIRE_MB), débit en dessous de référence / tolerance.
+    """
+    ratios = {}
+    regressions = []
+    for nom, ref in reference.items():
+        cur = courant[nom]
+        ratios[nom] = {cle: cur[cle] / ref[cle] if ref[cle] else float("inf") for cle in ref}
+        for cle in ("p50_ms", "p95_ms"):
+            if cur[cle] > ref[cle] * tolerance:
+                regressions.append(f"{nom} {cle} : {cur[cle]:.2f} > {ref[cle]:.2f} x {tolerance}")
+        if cur["debit_par_s"] < ref["debit_par_s"] / tolerance:
+            regressions.append(f"{nom} debit_par_s : {cur['debit_par_s']:.1f} < {ref['debit_par_s']:.1f} / {tolerance}")
+        if (cur["pic_memoire_mb"] > ref["pic_memoire_mb"] * tolerance
+                and cur["pic_memoire_mb"] - ref["pic_memoire_mb"] > ECART_MEMOIRE_MB):
+            regressions.append(f"{nom} pic_memoire_mb : {cur['pic_memoire_mb']:.1f} > "
+                               f"{ref['pic_memoire_mb']:.1f} x {tolerance}")
+    return ratios, regressions
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de routage reproductible, comparé à une référence mesurée dans la même session.")
+    parser.add_argument("--reference", default="HEAD",
+                        help="révision git (extraite dans un worktree temporaire) ou dossier du projet de référence")
+    parser.add_argument("--tours", type=int, default=NB_TOURS, help="runs alternés référence / courant")
+    parser.add_argument("--out", help="fichier JSON des résultats")
+    parser.add_argument("--requetes", type=int, default=NB_REQUETES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--backend", default="python", choices=["python", "numba"])
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--mesurer", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--sans-memoire", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mesurer:
+        # Run unique (processus lancé par run_tree), sur l'arbre de BLOBIA_RACINE
+        resultats = run(args.requetes, args.seed, args.backend, memoire=not args.sans_memoire)
+        with open(args.out, "w") as f:
+            json.dump(resultats, f, indent=2)
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        worktree = None
+        if os.path.isdir(args.reference):
+            racine_ref = os.path.abspath(args.reference)
+        else:
+            worktree = os.path.join(tmp, "reference")
+            racine_ref = extract_reference(args.reference, worktree)
+        try:
+            runs = {"reference": [], "courant": []}
+            for tour in range(args.tours):
+                for nom, racine in (("reference", racine_ref), ("courant", BASE_DIR)):
+                    print(f"Tour {tour + 1}/{args.tours} : {nom} ({racine})")
+                    runs[nom].append(run_tree(racine, os.path.join(tmp, f"{nom}_{tour}.json"),
+                                              args.requetes, args.seed, args.backend, memoire=tour == 0))
+        finally:
+            if worktree is not None:
+                subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=BASE_DIR)
+
+    reference, courant = best_of(runs["reference"]), best_of(runs["courant"])
+    ratios, regressions = compare(courant, reference, args.tolerance)
+    print(f"\n{'':<32} {'p50':>8} {'p95':>8} {'débit':>8} {'mémoire':>8}   (courant / référence)")
+    for nom, r in ratios.items():
+        print(f"{nom:<32} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['debit_par_s']:>8.2f} {r['pic_memoire_mb']:>8.2f}")
+    for nom, r in courant.items():
+        print(f"{nom:<32} p50 {r['p50_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms  "
+              f"{r['debit_par_s']:>8.1f} /s  pic {r['pic_memoire_mb']:>6.1f} Mo")
+    meta_ref, meta_cur = runs["reference"][0]["meta"], runs["courant"][0]["meta"]
+    if meta_cur["monuments_ecartes"]:
+        print(f"Monuments écartés (aucune station du graphe à moins de {RAYON_M} m) : "
+              f"{', '.join(meta_cur['monuments_ecartes'])}")
+    if meta_ref["charge"] != meta_cur["charge"]:
+        print("Attention : charge différente de la référence (données différentes)")
+    elif meta_ref["resultats"] != meta_cur["resultats"]:
+        print("Attention : les trajets calculés diffèrent de ceux de la référence")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"runs": runs, "reference": reference, "courant": courant, "ratios": ratios,
+                       "regressions": regressions}, f, indent=2)
+
+    for r in regressions:
+        print(f"RÉGRESSION {r}")
+    if not regressions:
+        print(f"Aucune régression (tolérance x{args.tolerance})")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+
+from affluence_builder.get_affluence import JOURS
+
+class AffluenceTensor:
+    """
+    Tenseur d'affluence float32 [jour, heure, noeud] projeté en mémoire (np.load mmap_mode="r") :
+    rien n'est lu avant le premier accès et les processus qui l'ouvrent partagent les mêmes pages.
+    """
+
+    def __init__(self, data, index):
+        self.data = data
+        self.jours = index["jours"]
+        self.node_keys = index["node_keys"]
+
+    def slot(self, jour, heure):
+        """
+        Affluence par noeud pour (jour, heure) : vue sur le tenseur, sans copie, utilisable
+        directement comme affluence_mapping des moteurs (vecteur par noeud du réseau compilé).
+        """
+        return self.data[self.jours.index(jour.lower()), int(heure) % 24]
+
+def load_affluence_tensor(path, net):
+    """
+    Ouvre le tenseur écrit par affluence_builder/build_affluence_tensor.py (fichier .npy et
+    index .json à côté). Les ids de noeuds doivent être ceux du réseau : un tenseur construit
+    sur un autre graphe est refusé.
+    """
+    with open(index_path(path)) as f:
+        index = json.load(f)
+    if index["node_keys"] != [str(k) for k in net.node_keys] or index["jours"] != JOURS:
+        raise ValueError(f"Le tenseur {path} ne correspond pas au graphe chargé : relancer affluence_builder/build_affluence_tensor.py")
+    return AffluenceTensor(np.load(path, mmap_mode="r"), index)
+
+def index_path(path):
+    return path[:-len(".npy")] + "_index.json" if path.endswith(".npy") else path + "_index.json"
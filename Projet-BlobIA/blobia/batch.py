@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from blobia.blob_solver import blob_path_solver
+from blobia.ksp import k_shortest_solver
+from blobia.network import as_network
+
+def batch_routes(
+    G,
+    affluence_mapping,
+    stations_depart,
+    destinations,
+    curseur=1,
+    k=3,
+    moteur="ksp",
+    stats=None
+):
+    """
+    Trajets de plusieurs stations de départ vers plusieurs destinations, renvoyés au fil de l'eau :
+    générateur de (station_depart, nom_destination, trajets), destination par destination.
+
+    destinations : {nom: [station_key, ...]} (ex. stations proches de chaque monument).
+    affluence_mapping : mapping {(station_key, ligne): score} ou vecteur d'affluence par noeud.
+    Les stations sont résolues une seule fois par l'index du réseau compilé.
+
+    moteur="ksp" : un seul arbre des plus courts chemins (calculé en sens inverse depuis la
+    destination) est partagé par tous les départs ; le meilleur trajet de chaque paire s'y lit
+    directement, seules les déviations (k > 1) demandent des recherches.
+    moteur="blob" : le score blob (moyenne, pénalité du dernier changement) n'est pas additif et
+    ses arrivées sont terminales, un arbre ne peut pas être partagé : une recherche par paire.
+    Une paire sans station connue ou sans trajet donne une liste vide.
+    stats (dict optionnel) reçoit "paires", "arbres" et la durée totale "duree_s".
+    """
+    net = as_network(G)
+    aff = net.affluence_list(affluence_mapping)
+    departs = [(s, net.nodes_of_station(s)) for s in stations_depart]
+
+    t0 = time.perf_counter()
+    nb_paires = 0
+    nb_arbres = 0
+    for nom, stations_arrivee in destinations.items():
+        nodes_arrivee = []
+        for s in stations_arrivee:
+            nodes_arrivee.extend(net.nodes_of_station(s))
+        if not nodes_arrivee:
+            solve = None
+        elif moteur == "ksp":
+            solve = k_shortest_solver(net, aff, nodes_arrivee, curseur=curseur, k=k)
+            nb_arbres += 1
+        else:
+            def solve(nodes_depart, nodes_arrivee=nodes_arrivee):
+                return blob_path_solver(net, aff, nodes_depart, nodes_arrivee, curseur=curseur,
+                                        max_visites_station=2, topk=8)
+        for station, nodes_depart in departs:
+            nb_paires += 1
+            yield station, nom, (solve(nodes_depart) if solve and nodes_depart else [])
+
+    if stats is not None:
+        stats["paires"] = nb_paires
+        stats["arbres"] = nb_arbres
+        stats["duree_s"] = time.perf_counter() - t0
+
+if __name__ == "__main__":
+    from affluence_builder.get_affluence import get_affluence_mapping_from_file
+    from blobia.mapping import find_stations_near_monument
+
+    BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    DATA_DIR = os.path.join(BASE_DIR, 'data')
+    MONUMENTS_PATH = os.path.join(DATA_DIR, "monuments.csv")
+
+    from blobia.graph_store import load_graph_store
+    net = load_graph_store(os.path.join(DATA_DIR, "graph_blobia.graph")).network()
+    afflu_map = get_affluence_mapping_from_file(
+        os.path.join(DATA_DIR, "Stations_IDF_aligned_affluence.csv"), "lundi", 8)
+
+    # Toutes les stations vers tous les monuments (stations à moins de 900 m de chaque monument)
+    stations = pd.read_csv(os.path.join(DATA_DIR, "Stations_IDF_aligned.csv"))["station_key"].astype(str).unique()
+    monuments = pd.read_csv(MONUMENTS_PATH, encoding='cp1252')["Monument"].drop_duplicates()
+    destinations = {
+        m: [s for s, _ in find_stations_near_monument(
+            m, rayon_m=900, monuments_csv=MONUMENTS_PATH, stations_csv=os.path.join(DATA_DIR, "graph_nodes.csv"))]
+        for m in monuments
+    }
+
+    # Un processus par coeur (réseau et affluence en mémoire partagée), voir blobia/parallel.py
+    from blobia.parallel import parallel_batch_routes
+    stats = {}
+    nb_trajets = 0
+    for depart, monument, trajets in parallel_batch_routes(net, afflu_map, stations, destinations, curseur=5, stats=stats):
+        nb_trajets += len(trajets)
+    print(f"{stats['paires']} paires, {nb_trajets} trajets en {stats['duree_s']:.1f} s "
+          f"({stats['paires_par_s']:.0f} paires/s)")
+    for pid, p in sorted(stats["processus"].items()):
+        print(f"  processus {pid} : {p['paires']} paires, {p['paires_par_s']:.0f} paires/s")
@@ -1,136 +1,420 @@
 import heapq
-from collections import defaultdict
 import random
+import time
 
-def normalize_line(line):
-    parts = line.upper().split()
-    if parts[0] in {"RER", "METRO"}:
-        return f"{parts[0]} {parts[1]}"
-    return line.upper()
+import numpy as np
 
-def blob_path_solver(
-    G,
-    affluence_mapping,
-    nodes_depart,
-    nodes_arrivee,
-    curseur=1,
-    verbose=False,
-    max_iter=25000,
-    max_visites_station=2,
-    topk=10,
-    return_all_explored=False  # <---- Option pour visu
-):
+from blobia.horaire import edge_minutes, tranches_horaires
+from blobia.kernel import NUMBA_AVAILABLE, blob_search_kernel
+from blobia.network import Network, as_network, normalize_line
+from blobia.trace import TraceEvent
+
+TOP_ROUTES = 3  # nombre de trajets distincts retournés
+
+class _Label:
+    """
+    Etiquette de l'arbre de recherche : un noeud, un pointeur vers l'étiquette parente
+    et les cumuls nécessaires au score. Le chemin n'est reconstruit qu'à la demande.
+    """
+    __slots__ = ("parent", "node", "ligne", "aff", "aff_sum", "length", "visits", "trace_id", "temps")
+
+    def __init__(self, parent, node, ligne, aff):
+        self.parent = parent
+        self.node = node
+        self.ligne = ligne
+        self.aff = aff
+        if parent is None:
+            self.aff_sum = aff
+            self.length = 1
+        else:
+            self.aff_sum = parent.aff_sum + aff
+            self.length = parent.length + 1
+        self.visits = None  # renseigné au dépilement
+
+    def _chain(self):
+        chain = []
+        label = self
+        while label is not None:
+            chain.append(label)
+            label = label.parent
+        chain.reverse()
+        return chain
+
+    def path(self):
+        return [label.node for label in self._chain()]
+
+    def affluences(self):
+        return [label.aff for label in self._chain()]
+
+    def lignes(self):
+        return [label.ligne for label in self._chain()]
+
+    def __lt__(self, other):
+        # Départage à score et noeud égaux : même ordre que la comparaison des listes de chemins,
+        # obtenu en remontant jusqu'à l'ancêtre commun plutôt qu'en reconstruisant les chemins
+        a, b = self, other
+        while a.length > b.length:
+            a = a.parent
+        while b.length > a.length:
+            b = b.parent
+        if a is b:
+            # L'un des chemins est préfixe de l'autre
+            return self.length < other.length
+        while a.parent is not b.parent:
+            a = a.parent
+            b = b.parent
+        return a.node < b.node
+
+def _visit(visits, bit):
+    """
+    Compte un passage de plus par la station `bit`.
+    visits[k] est le masque des stations déjà vues au moins k+1 fois (compteur saturé).
+    """
+    for k, mask in enumerate(visits):
+        if not mask & bit:
+            return visits[:k] + (mask | bit,) + visits[k + 1:]
+    return visits
+
+def ponderations(curseur):
+    """
+    Poids (alpha, beta, gamma) du score : nombre d'arrêts, affluence moyenne, changement de ligne.
+    """
     # Pondérations adaptées, restent progressives mais impactent bien les extrêmes
     alpha = max(0.1, 1.0 - 0.09 * (curseur - 1)) if curseur < 10 else 0.01
     beta = 0.1 + 0.12 * (curseur - 1) if curseur > 1 else 0.01
     gamma = 1.0 - 0.09 * (curseur-1)
+    return alpha, beta, gamma
+
+def route_result(net, score, path, affluences):
+    """
+    Formatage standard d'un trajet (ids de noeuds du réseau compilé) pour main.py.
+    """
+    _, _, station_of, _, main_of = net.py_arrays()
+    stations = [net.names[n] for n in path]
+    lignes_aff = [net.main_lines[main_of[n]] for n in path]
+    aff_moy = sum(affluences) / len(affluences)
+    aff_max = max(affluences)
+    stations_aff_max = [stations[i] for i, aff in enumerate(affluences) if aff == aff_max]
+    changements = [i for i in range(1, len(lignes_aff)) if lignes_aff[i] != lignes_aff[i-1]]
+    nb_changements = len(changements)
+    path_keys = [(net.stations[station_of[n]], lignes_aff[i]) for i, n in enumerate(path)]
+    return {
+        "path": path_keys,
+        "score": score,
+        "nb_stations": len(path),
+        "nb_changements": nb_changements,
+        "changements": changements,
+        "affluence_moyenne": aff_moy,
+        "affluence_max": aff_max,
+        "stations_affluence_max": stations_aff_max,
+        "raw_path": [net.node_keys[n] for n in path],
+        "raw_lignes": lignes_aff,
+    }
+
+def _search(net, affluences_noeuds, nodes_depart, is_target, alpha, beta, gamma, nb_niveaux,
+            marge, max_iter, topk, max_front, return_all_explored, trace=None, horaire=None,
+            compter=False):
+    """
+    Boucle best-first en Python pur. Renvoie (itérations, finales (score, noeud, chemin,
+    affluences, durée en minutes ou None), chemins explorés pour la visu, exact, compteurs).
+    horaire = (tranches, minute de départ, minutes par arête) : l'affluence d'un noeud est lue
+    dans la tranche de l'heure estimée de passage (voir blobia/horaire.py).
+    Les compteurs (élagages, pic du tas) ne sont tenus que si compter est vrai (stats demandées),
+    sinon compteurs vaut None ; les empilements se déduisent en fin de recherche.
+    """
+    indptr, indices, station_of, line_of, main_of = net.py_arrays()
+    station_bits = net.station_bits()
+    empty_visits = (0,) * nb_niveaux
+    meilleurs_finals = {}  # séquence de stations -> meilleur score
+    seuil_arret = float('inf')
+    tronque = False  # étiquettes abandonnées par le mode faisceau
+    nb_abandons = 0
+    nb_domination = 0
+    nb_visites = 0
+
+    if horaire is not None:
+        tranches, minute0, minutes = horaire
 
     front = []
     heapq.heapify(front)
     for dep in nodes_depart:
-        data = G.nodes[dep]
         score_init = 0.0
-        aff_init = affluence_mapping.get((data['station_key'], data['ligne']), 0.2)
-        visits = defaultdict(int)
-        visits[G.nodes[dep]['station_key']] = 1
-        heapq.heappush(front, (score_init, dep, [dep], [aff_init], [data['ligne']], visits))
+        label = _Label(None, dep, line_of[dep], affluences_noeuds[dep])
+        label.temps = 0.0
+        heapq.heappush(front, (score_init, dep, label))
+    pic_tas = len(front)
 
-    visited = dict()
+    best_score = [float('inf')] * net.n_nodes
     finals = []
     explored_paths = []  # <- pour visu
 
     it = 0
-    while front and it < max_iter and len(finals) < topk * 5:
+    while front and it < max_iter and len(finals) < topk * 5 and front[0][0] < seuil_arret:
         it += 1
-        score, node, path, affluences, lignes, visits = heapq.heappop(front)
-        visits = visits.copy()
-        visits[G.nodes[node]['station_key']] += 1
+        score, node, label = heapq.heappop(front)
+        node_station = station_of[node]
+        node_bit = station_bits[node_station]
+        if label.parent is None:
+            # La station de départ compte pour un passage avant même le premier dépilement
+            visits = _visit(empty_visits, node_bit)
+        else:
+            visits = label.parent.visits
+        visits = label.visits = _visit(visits, node_bit)
+        ligne = label.ligne
+
+        if trace is not None:
+            # Événement compact : le chemin se reconstruit par les ids parents (voir blobia/trace.py)
+            label.trace_id = it - 1
+            trace(TraceEvent(it - 1, -1 if label.parent is None else label.parent.trace_id,
+                             node, score, is_target[node]))
 
         # Sauvegarde du chemin courant (pour la visu)
         if return_all_explored:
             explored_paths.append({
                 "score": score,
-                "raw_path": list(path),
-                "affluences": list(affluences),
-                "lignes": list(lignes)
+                "raw_path": [net.node_keys[n] for n in label.path()],
+                "affluences": label.affluences(),
+                "lignes": [net.lines[l] for l in label.lignes()]
             })
 
-        if node in nodes_arrivee:
-            finals.append((score, node, path, affluences, lignes))
+        if is_target[node]:
+            finals.append((score, node, label))
+            seq = tuple([station_of[n] for n in label.path()])
+            if score < meilleurs_finals.get(seq, float('inf')):
+                meilleurs_finals[seq] = score
+                if len(meilleurs_finals) >= TOP_ROUTES:
+                    seuil_arret = sorted(meilleurs_finals.values())[TOP_ROUTES - 1] + marge
             continue
 
-        key = (node, lignes[-1])
-        if key in visited and visited[key] <= score:
+        # La ligne est un attribut du noeud : la clé (noeud, ligne) se réduit au noeud
+        if best_score[node] <= score:
+            if compter:
+                nb_domination += 1
             continue
-        visited[key] = score
+        best_score[node] = score
 
-        for succ in G.neighbors(node):
-            succ_line = G.nodes[succ]['ligne']
-            succ_aff = affluence_mapping.get((G.nodes[succ]['station_key'], succ_line), 0.2)
+        nb_arrets = label.length
+        aff_sum = label.aff_sum
+        main_line = main_of[node]
+        for j in range(indptr[node], indptr[node + 1]):
+            succ = indices[j]
+            succ_line = line_of[succ]
+            succ_station = station_of[succ]
+            if horaire is None:
+                succ_aff = affluences_noeuds[succ]
+            else:
+                # Affluence à l'heure estimée d'arrivée en succ (lecture O(1) dans la tranche)
+                temps = label.temps + minutes[j]
+                succ_aff = tranches[min(int(minute0 + temps) // 60, 23)][succ]
             # Ne repasse jamais plus de 2 fois par une station, sauf pour une correspondance (ligne différente)
-            if visits[G.nodes[succ]['station_key']] >= max_visites_station:
+            if not nb_niveaux or visits[-1] & station_bits[succ_station]:
                 # Autorise de repasser si changement de ligne
-                if succ_line == lignes[-1]:
+                if succ_line == ligne:
+                    if compter:
+                        nb_visites += 1
                     continue
             # Empêche de tourner en rond juste pour baisser l'affluence
-            if (normalize_line(succ_line) == normalize_line(lignes[-1])
-                and G.nodes[succ]['station_key'] == G.nodes[node]['station_key']
-                and succ_line != lignes[-1]):
+            if (main_of[succ] == main_line
+                and succ_station == node_station
+                and succ_line != ligne):
                 continue
             penalty = 0.0
-            if succ_line != lignes[-1]:
+            if succ_line != ligne:
                 penalty += gamma
-            nb_arrets = len(path)
-            aff_moy = (sum(affluences) + succ_aff) / (len(affluences) + 1)
+            aff_moy = (aff_sum + succ_aff) / (nb_arrets + 1)
             new_score = (
                 alpha * (nb_arrets + 1) +
                 beta * aff_moy +
                 penalty
             )
+            succ_label = _Label(label, succ, succ_line, succ_aff)
+            if horaire is not None:
+                succ_label.temps = temps
             heapq.heappush(front, (
                 new_score,
                 succ,
-                path + [succ],
-                affluences + [succ_aff],
-                lignes + [succ_line],
-                visits
+                succ_label
             ))
 
+        if compter and len(front) > pic_tas:
+            pic_tas = len(front)
+        # Mode faisceau : au-delà de 2 * max_front étiquettes, on ne garde que les max_front meilleures
+        # (une liste triée est déjà un tas)
+        if max_front and len(front) > 2 * max_front:
+            taille = len(front)
+            front = heapq.nsmallest(max_front, front)
+            nb_abandons += taille - max_front
+            tronque = True
+
+    # Exact : front épuisé, ou plus aucune étiquette ne peut battre le TOP_ROUTES-ième trajet distinct
+    exact = not tronque and (not front or front[0][0] >= seuil_arret)
+    compteurs = {
+        "empilements": it + len(front) + nb_abandons,
+        "elagages_domination": nb_domination,
+        "elagages_visites": nb_visites,
+        "pic_tas": pic_tas,
+    } if compter else None
+    finals = [
+        (score, node, label.path(), label.affluences(), label.temps if horaire is not None else None)
+        for score, node, label in finals
+    ]
+    return it, finals, explored_paths, exact, compteurs
+
+def blob_path_solver(
+    G,
+    affluence_mapping,
+    nodes_depart,
+    nodes_arrivee,
+    curseur=1,
+    verbose=False,
+    max_iter=25000,
+    max_visites_station=2,
+    topk=10,
+    return_all_explored=False,  # <---- Option pour visu
+    stats=None,
+    backend="python",
+    max_front=None,
+    trace=None,
+    affluence_horaire=None,
+    depart=None
+):
+    """
+    G peut être un graphe NetworkX (compilé à la volée, noeuds donnés par leurs identifiants)
+    ou un `Network` déjà compilé (noeuds donnés par leurs ids entiers ; affluence_mapping
+    peut alors aussi être le vecteur d'affluence par noeud).
+
+    La recherche s'arrête dès que plus aucune étiquette du front ne peut battre le
+    TOP_ROUTES-ième trajet distinct déjà trouvé (le score minimal du front, moins l'écart
+    maximal entre un score et le score final de ses descendants, le dépasse) : le
+    résultat est alors prouvé, comme lorsque le front s'épuise. Sinon la recherche a été coupée
+    par max_iter ou par topk * 5 arrivées.
+    max_front (optionnel) borne la mémoire pour les appels pressés (mode faisceau) : dès que le
+    front dépasse 2 * max_front étiquettes, seules les max_front meilleures sont gardées.
+    Chaque trajet porte "exact" (False si la recherche a été coupée ou si le faisceau a
+    abandonné des étiquettes).
+
+    Mode horaire : affluence_horaire (tenseur [jour, heure, noeud] de
+    get_affluence_tensor) et depart=(jour, heure), heure en "7h30" ou en heures décimales.
+    L'heure de passage à chaque noeud est estimée (distance_m et vitesse du mode, durée des
+    correspondances, voir blobia/horaire.py) et l'affluence lue pour cette heure-là ;
+    affluence_mapping est alors ignoré. Chaque trajet porte sa durée estimée "duree_min".
+
+    stats (dict optionnel) reçoit le profil de la requête : étiquettes dépilées ("expansions"),
+    "empilements", élagages par le meilleur score déjà vu au noeud ("elagages_domination") et par
+    max_visites_station ("elagages_visites"), taille maximale du tas ("pic_tas"), arrivées
+    collectées ("finales"), "exact" et les durées par phase ("durees" : "preparation",
+    "recherche", "formatage", en secondes). Sans stats, rien n'est compté ni chronométré.
+    trace (callable optionnel) reçoit un TraceEvent (id, id parent, noeud, score, arrivée) à
+    chaque dépilement, ids de noeuds du réseau compilé ; blobia/trace.ExplorationTrace les
+    garde avec échantillonnage ou tampon circulaire et ne reconstruit que les chemins demandés.
+    return_all_explored copie au contraire chemin, affluences et lignes à chaque dépilement
+    (mémoire quadratique) : à réserver aux petites recherches.
+    backend="numba" exécute la boucle dans le noyau compilé de blobia/kernel.py (sans le GIL),
+    avec des résultats identiques ; repli sur la boucle Python si numba est absent, avec
+    return_all_explored, avec trace ou en mode horaire.
+    """
+    t0 = time.perf_counter() if stats is not None else None
+    if isinstance(G, Network):
+        net = G
+    else:
+        net = as_network(G)
+        nodes_depart = [net.index[n] for n in nodes_depart]
+        nodes_arrivee = [net.index[n] for n in nodes_arrivee if n in net.index]
+
+    horaire = None
+    if affluence_horaire is not None:
+        if depart is None:
+            raise ValueError("Le mode horaire demande depart=(jour, heure).")
+        tranches, minute0 = tranches_horaires(affluence_horaire, *depart)
+        horaire = (tranches, minute0, edge_minutes(net))
+        affluences_noeuds = tranches[0]
+    else:
+        affluences_noeuds = net.affluence_list(affluence_mapping)
+    station_of = net.py_arrays()[2]
+    is_target = [False] * net.n_nodes
+    for n in nodes_arrivee:
+        is_target[n] = True
+
+    alpha, beta, gamma = ponderations(curseur)
+
+    nb_niveaux = max(0, max_visites_station)
+
+    if not nodes_arrivee:
+        # Aucune destination : rien à chercher
+        if stats is not None:
+            stats.update(expansions=0, empilements=0, elagages_domination=0, elagages_visites=0,
+                         pic_tas=0, finales=0, exact=True)
+            stats.setdefault("durees", {})["preparation"] = time.perf_counter() - t0
+        return ([], []) if return_all_explored else []
+
+    # Écart maximal entre le score d'une étiquette et le score final de ses descendants :
+    # la partie affluence peut baisser jusqu'à l'affluence minimale, la pénalité retomber à 0
+    if horaire is None:
+        marge = beta * (max(affluences_noeuds) - min(affluences_noeuds)) + max(gamma, 0.0)
+    else:
+        marge = beta * (max(map(max, tranches)) - min(map(min, tranches))) + max(gamma, 0.0)
+
+    t1 = time.perf_counter() if stats is not None else None
+    if backend == "numba" and NUMBA_AVAILABLE and not return_all_explored and trace is None and horaire is None:
+        it, finals_ids, nb_finals, parent, node_of, score_of, exact, compteurs = blob_search_kernel(
+            net.indptr, net.indices, net.station_id, net.line_id, net.main_line_id,
+            np.asarray(affluences_noeuds, dtype=np.float64),
+            np.asarray(nodes_depart, dtype=np.int64), np.asarray(is_target),
+            alpha, beta, gamma, nb_niveaux, max_iter, topk * 5, marge, TOP_ROUTES, max_front or 0)
+        parent = parent.tolist()
+        node_of = node_of.tolist()
+        finals = []
+        for label in finals_ids[:nb_finals].tolist():
+            path = []
+            x = label
+            while x != -1:
+                path.append(node_of[x])
+                x = parent[x]
+            path.reverse()
+            finals.append((float(score_of[label]), node_of[label], path, [affluences_noeuds[n] for n in path], None))
+        explored_paths = []
+        exact = bool(exact)
+        compteurs = dict(zip(("empilements", "elagages_domination", "elagages_visites", "pic_tas"),
+                             compteurs.tolist()))
+    else:
+        it, finals, explored_paths, exact, compteurs = _search(
+            net, affluences_noeuds, nodes_depart, is_target, alpha, beta, gamma, nb_niveaux,
+            marge, max_iter, topk, max_front, return_all_explored, trace, horaire,
+            compter=stats is not None)
+
+    if stats is not None:
+        t2 = time.perf_counter()
+        stats["expansions"] = it
+        stats.update(compteurs)
+        stats["finales"] = len(finals)
+        stats["exact"] = exact
+
     # Filtrage top 3 pour résultat principal
     def stations_sequence(path):
-        return tuple([G.nodes[n]['station_key'] for n in path])
+        return tuple([station_of[n] for n in path])
 
     unique_routes = {}
-    for tup in sorted(finals, key=lambda x: x[0]):
-        seq = stations_sequence(tup[2])
+    for score, node, path, affluences, duree in sorted(finals, key=lambda x: x[0]):
+        seq = stations_sequence(path)
         if seq not in unique_routes:
-            unique_routes[seq] = tup
+            unique_routes[seq] = (score, node, path, affluences, duree)
 
-    top_routes = list(unique_routes.values())[:3]  # Top 3 uniques
+    top_routes = list(unique_routes.values())[:TOP_ROUTES]  # Top 3 uniques
 
     # Formatage standard pour main.py
     results = []
-    for score, node, path, affluences, lignes in top_routes:
-        stations = [G.nodes[n]['name'] for n in path]
-        lignes_aff = [normalize_line(G.nodes[n]['ligne']) for n in path]
-        aff_moy = sum(affluences) / len(affluences)
-        aff_max = max(affluences)
-        stations_aff_max = [stations[i] for i, aff in enumerate(affluences) if aff == aff_max]
-        changements = [i for i in range(1, len(lignes_aff)) if lignes_aff[i] != lignes_aff[i-1]]
-        nb_changements = len(changements)
-        path_keys = [(G.nodes[n]['station_key'], lignes_aff[i]) for i, n in enumerate(path)]
-        results.append({
-            "path": path_keys,
-            "score": score,
-            "nb_stations": len(path),
-            "nb_changements": nb_changements,
-            "changements": changements,
-            "affluence_moyenne": aff_moy,
-            "affluence_max": aff_max,
-            "stations_affluence_max": stations_aff_max,
-            "raw_path": path,
-            "raw_lignes": lignes_aff,
-        })
+    for score, node, path, affluences, duree in top_routes:
+        r = route_result(net, score, path, affluences)
+        r["exact"] = exact
+        if duree is not None:
+            r["duree_min"] = duree
+        results.append(r)
+
+    if stats is not None:
+        durees = stats.setdefault("durees", {})
+        durees["preparation"] = t1 - t0
+        durees["recherche"] = t2 - t1
+        durees["formatage"] = time.perf_counter() - t2
 
     if return_all_explored:
         # Pour la visu : chaque chemin doit avoir .raw_path
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from blobia.mapping import find_stations_near_monument, normalize_name
+
+class RouteCache:
+    """
+    Cache LRU borné (maxsize entrées), avec durée de vie optionnelle (ttl en secondes),
+    et compteurs hits / misses / evictions / expirations.
+    Les valeurs sont renvoyées telles quelles : ne pas les modifier.
+    Partageable entre threads (Streamlit) : les accès sont protégés par un verrou, le calcul
+    d'une valeur manquante (get_or_compute) se fait hors verrou.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # clé -> (expiration, valeur)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        expiration = None if self.ttl is None else self.clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (expiration, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "taille": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "taux_hits": self.hits / total if total else 0.0,
+            }
+
+_file_fingerprints = {}
+
+def file_fingerprint(path):
+    """
+    Empreinte (sha1) du contenu d'un fichier, recalculée seulement si sa taille ou sa date changent.
+    Pour un dossier (graphe au format colonne), empreinte des fichiers qu'il contient.
+    """
+    if os.path.isdir(path):
+        h = hashlib.sha1()
+        for name in sorted(os.listdir(path)):
+            h.update(name.encode("utf-8"))
+            h.update(file_fingerprint(os.path.join(path, name)).encode("ascii"))
+        return h.hexdigest()
+    st = os.stat(path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    cached = _file_fingerprints.get(path)
+    if cached is None or cached[0] != stamp:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for bloc in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloc)
+        cached = _file_fingerprints[path] = (stamp, h.hexdigest())
+    return cached[1]
+
+def affluence_fingerprint(net, affluence_mapping):
+    """
+    Empreinte de l'affluence telle que vue par le réseau (vecteur par noeud) : deux tables de même
+    contenu ont la même empreinte, une table reconstruite différente invalide les entrées.
+    Accepte aussi un vecteur par noeud (ex. tranche du tenseur d'affluence).
+    """
+    vec = net.affluence_vector(affluence_mapping)
+    return hashlib.sha1(vec.tobytes()).hexdigest()
+
+def _canonical(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _canonical(v)) for k, v in value.items()))
+    return value
+
+def cached_call(cache, fonction, net, affluence_mapping, *args, **kwargs):
+    """
+    fonction(net, affluence_mapping, *args, **kwargs) à travers le cache (ex. find_best_route,
+    find_route_front). La clé réunit la fonction, la requête canonique et les empreintes du
+    réseau compilé et de l'affluence. `stats` n'est pas mis en cache : un appel avec stats
+    est toujours calculé.
+    """
+    if kwargs.get("stats") is not None:
+        return fonction(net, affluence_mapping, *args, **kwargs)
+    key = (
+        fonction.__module__, fonction.__name__,
+        net.fingerprint(), affluence_fingerprint(net, affluence_mapping),
+        _canonical(args), _canonical(kwargs),
+    )
+    return cache.get_or_compute(key, lambda: fonction(net, affluence_mapping, *args, **kwargs))
+
+def cached_stations_near_monument(cache, monument_name, rayon_m=900,
+                                  monuments_csv="data/monuments.csv", stations_csv="data/graph_nodes.csv"):
+    """
+    find_stations_near_monument à travers le cache, invalidé si l'un des deux CSV change.
+    """
+    key = (
+        "find_stations_near_monument", normalize_name(monument_name), rayon_m,
+        file_fingerprint(monuments_csv), file_fingerprint(stations_csv),
+    )
+    return cache.get_or_compute(key, lambda: find_stations_near_monument(
+        monument_name, rayon_m=rayon_m, monuments_csv=monuments_csv, stations_csv=stations_csv))
@@ -0,0 +1,157 @@
+import os
+import pickle
+import time
+
+import pandas as pd
+
+from affluence_builder.get_affluence import get_affluence_mapping_from_file
+from blobia.affluence_tensor import load_affluence_tensor
+from blobia.batch import batch_routes
+from blobia.cache import RouteCache, cached_call, cached_stations_near_monument
+from blobia.graph_store import load_graph_store
+from blobia.hierarchy import load_hierarchy
+from blobia.mapping import normalize_name
+from blobia.monument_access import load_monument_access
+from blobia.network import compile_network
+from blobia.pareto import routes_for_curseur
+from blobia.route import find_best_route, find_route_front
+from blobia.search import load_name_index
+
+class RoutingEngine:
+    """
+    Données d'un processus de calcul, chargées une seule fois : réseau compilé, affluence (tenseur
+    précalculé, sinon CSV lu une fois par créneau), table d'accès aux monuments, hiérarchie de
+    contraction, index des noms et cache des trajets. Mêmes fichiers et mêmes replis que main.py.
+    """
+
+    def __init__(self, data_dir, cache_size=256):
+        t0 = time.perf_counter()
+        self.data_dir = data_dir
+        self.monuments_csv = os.path.join(data_dir, "monuments.csv")
+        self.stations_csv = os.path.join(data_dir, "graph_nodes.csv")
+        self.affluence_path = os.path.join(data_dir, "Stations_IDF_aligned_affluence.csv")
+        store_path = os.path.join(data_dir, "graph_blobia.graph")
+        tensor_path = os.path.join(data_dir, "affluence_tensor.npy")
+        access_path = os.path.join(data_dir, "monument_access.json")
+        ch_path = os.path.join(data_dir, "graph_blobia_ch.npz")
+
+        # Format colonne (mmap, sans pickle) s'il a été construit, sinon le pickle NetworkX
+        if os.path.isdir(store_path):
+            self.net = load_graph_store(store_path).network()
+        else:
+            with open(os.path.join(data_dir, "graph_blobia.gpickle"), "rb") as f:
+                self.net = compile_network(pickle.load(f))
+        self.tensor = load_affluence_tensor(tensor_path, self.net) if os.path.exists(tensor_path) else None
+        self.access = load_monument_access(access_path, self.net) if os.path.exists(access_path) else None
+        # Attachée au réseau (net.hierarchy) pour moteur="ch"
+        if os.path.exists(ch_path):
+            load_hierarchy(ch_path, self.net)
+        self.names = load_name_index(self.net, self.monuments_csv)
+        self.cache = RouteCache(maxsize=cache_size)
+        self._affluences = {}  # (jour, heure) -> mapping lu dans le CSV (sans tenseur)
+        self._lignes = None  # station -> lignes du CSV d'affluence (sans table d'accès)
+        self.duree_chargement_s = time.perf_counter() - t0
+
+    def affluence(self, jour, heure):
+        """
+        Affluence du créneau (jour, heure) : tranche du tenseur, sinon mapping lu dans le CSV.
+        """
+        if self.tensor is not None:
+            return self.tensor.slot(jour, heure)
+        key = (jour.lower(), int(heure) % 24)
+        if key not in self._affluences:
+            self._affluences[key] = get_affluence_mapping_from_file(self.affluence_path, *key)
+        return self._affluences[key]
+
+    def resolve_station(self, nom):
+        """
+        Clé de station pour un nom saisi : nom exact (normalisé), sinon meilleure correspondance
+        approchée de l'index des noms ; None si rien ne correspond.
+        """
+        norm = normalize_name(nom)
+        if self.net.nodes_of_station(norm):
+            return norm
+        return self.names.best(nom, kind="station")
+
+    def resolve_monument(self, nom):
+        """
+        Nom du monument dans monuments.csv : nom exact, sinon meilleure correspondance approchée.
+        """
+        return self.names.exact(nom, "monument") or self.names.best(nom, kind="monument")
+
+    def arrival_stations(self, monument, rayon_m=900):
+        """
+        Clés des stations d'arrivée, comme main.py : la station la plus proche de chaque ligne
+        desservant le monument. Table d'accès si le rayon y est précalculé, sinon calcul à partir
+        des CSV (stations proches mises en cache, lignes lues dans le CSV d'affluence).
+        """
+        if self.access is not None and monument in self.access and int(rayon_m) in self.access.rayons:
+            # Une station desservant plusieurs lignes n'est gardée qu'une fois
+            return list(dict.fromkeys(self.access.stations(monument, rayon_m)))
+        proches = cached_stations_near_monument(
+            self.cache, monument, rayon_m=rayon_m,
+            monuments_csv=self.monuments_csv, stations_csv=self.stations_csv)
+        if self._lignes is None:
+            df = pd.read_csv(self.affluence_path, usecols=["station_key", "ligne"])
+            self._lignes = {}
+            for key, ligne in zip(df["station_key"].astype(str), df["ligne"].astype(str)):
+                self._lignes.setdefault(normalize_name(key), []).append(ligne)
+        # On ne garde qu'une station la plus proche par ligne
+        par_ligne = {}  # {ligne: (station_key, distance)}
+        for st, dist in proches:
+            for ligne in self._lignes.get(normalize_name(st), []):
+                if ligne not in par_ligne or dist < par_ligne[ligne][1]:
+                    par_ligne[ligne] = (normalize_name(st), dist)
+        return list(dict.fromkeys(s for s, _ in par_ligne.values()))
+
+    def routes(self, station_depart, stations_arrivee, jour, heure, curseur, moteur="blob"):
+        """
+        Trajets d'un curseur, mis en cache. moteur="blob" : recherche blob (blob_path_solver), comme
+        main.py ; moteur="pareto" : front des 10 curseurs (blobia/pareto.py, chaque changement de
+        ligne pénalisé) calculé une fois par (départ, arrivées, créneau), curseur choisi dedans ;
+        moteur="ch" : meilleur trajet du mode rapide sur la hiérarchie de contraction (ValueError
+        si elle n'a pas été construite).
+        """
+        afflu_map = self.affluence(jour, heure)
+        if moteur == "pareto":
+            front = cached_call(self.cache, find_route_front, self.net, afflu_map,
+                                station_depart, list(stations_arrivee))
+            return routes_for_curseur(front, curseur)
+        return cached_call(self.cache, find_best_route, self.net, afflu_map,
+                           station_depart, list(stations_arrivee), curseur=curseur, moteur=moteur)
+
+_engines = {}
+
+def load_engine(data_dir):
+    """
+    Moteur du processus pour `data_dir`, chargé au premier appel.
+    """
+    data_dir = os.path.abspath(data_dir)
+    if data_dir not in _engines:
+        _engines[data_dir] = RoutingEngine(data_dir)
+    return _engines[data_dir]
+
+# --- Processus de travail (ProcessPoolExecutor du service HTTP) ---
+# Chaque processus charge son moteur au démarrage : le graphe et le tenseur sont projetés en
+# mémoire, les processus partagent donc les mêmes pages.
+_worker = {}
+
+def init_worker(data_dir):
+    _worker["engine"] = load_engine(data_dir)
+
+def worker_ping():
+    return os.getpid()
+
+def route_task(station_depart, stations_arrivee, jour, heure, curseur, moteur="blob"):
+    t0 = time.perf_counter()
+    trajets = _worker["engine"].routes(station_depart, stations_arrivee, jour, heure, curseur, moteur)
+    return trajets, time.perf_counter() - t0
+
+def batch_task(stations_depart, nom, stations_arrivee, jour, heure, curseur, k, moteur):
+    """
+    Un paquet de départs vers une destination (batch_routes : arbre partagé pour moteur="ksp").
+    """
+    engine = _worker["engine"]
+    return [trajets for _, _, trajets in batch_routes(
+        engine.net, engine.affluence(jour, heure), stations_depart, {nom: stations_arrivee},
+        curseur=curseur, k=k, moteur=moteur)]
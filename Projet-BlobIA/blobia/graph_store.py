@@ -0,0 +1,152 @@
+import json
+import os
+
+import numpy as np
+
+from blobia.network import Network, compile_network
+
+# Format du graphe sur disque : un dossier de tableaux .npy (ouverts en mmap) et un format.json
+# (version, tables de chaînes). Changer la disposition des tableaux impose d'incrémenter la version.
+FORMAT = "blobia-graph"
+FORMAT_VERSION = 1
+
+# Tableaux du réseau compilé (noeuds dans l'ordre trié des identifiants, adjacence CSR)
+NETWORK_ARRAYS = ("indptr", "indices", "distance_m", "station_id", "line_id", "main_line_id", "latitude", "longitude")
+# Ce qu'il faut en plus pour reconstruire le graphe NetworkX à l'identique : ordre d'insertion des
+# noeuds, type et ligne de chaque arête (une entrée par case de l'adjacence CSR) et nature de la
+# distance (0 : None, 1 : flottant, 2 : entier, les correspondances à 0)
+GRAPH_ARRAYS = ("node_order", "edge_type", "edge_line", "distance_kind")
+
+def _edge_attributes(G, net):
+    types, lines = {}, {}
+    edge_type, edge_line, distance_kind = [], [], []
+    for k in net.node_keys:
+        for edge in G.adj[k].values():
+            edge_type.append(types.setdefault(edge.get("type"), len(types)))
+            ligne = edge.get("ligne")
+            edge_line.append(-1 if ligne is None else lines.setdefault(ligne, len(lines)))
+            d = edge.get("distance")
+            distance_kind.append(0 if d is None else 2 if isinstance(d, (int, np.integer)) else 1)
+    return (np.array(edge_type, dtype=np.int8), np.array(edge_line, dtype=np.int32),
+            np.array(distance_kind, dtype=np.int8), list(types), list(lines))
+
+def save_graph_store(G, path, net=None):
+    """
+    Écrit le graphe de graph_builder/build_graph.py au format colonne (dossier `path`) :
+    réseau compilé, attributs des noeuds et des arêtes, tables de chaînes.
+    """
+    net = compile_network(G) if net is None else net
+    os.makedirs(path, exist_ok=True)
+    edge_type, edge_line, distance_kind, edge_types, edge_lines = _edge_attributes(G, net)
+    arrays = {name: getattr(net, name) for name in NETWORK_ARRAYS}
+    arrays["node_order"] = np.array([net.index[k] for k in G.nodes], dtype=np.int32)
+    arrays["edge_type"] = edge_type
+    arrays["edge_line"] = edge_line
+    arrays["distance_kind"] = distance_kind
+    for name, arr in arrays.items():
+        np.save(os.path.join(path, name + ".npy"), np.ascontiguousarray(arr))
+    meta = {
+        "format": FORMAT,
+        "version": FORMAT_VERSION,
+        "n_nodes": net.n_nodes,
+        "n_slots": len(net.indices),
+        "node_keys": list(net.node_keys),
+        "stations": list(net.stations),
+        "lines": list(net.lines),
+        "main_lines": list(net.main_lines),
+        "names": list(net.names),
+        "edge_types": edge_types,
+        "edge_lines": edge_lines,
+    }
+    with open(os.path.join(path, "format.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+class GraphStore:
+    """
+    Graphe ouvert depuis le disque : tableaux projetés en mémoire (rien n'est lu avant le premier
+    accès), réseau compilé construit sans passer par NetworkX, graphe NetworkX reconstruit
+    seulement si un appelant en a besoin (to_networkx).
+    """
+
+    def __init__(self, path, meta, arrays):
+        self.path = path
+        self.meta = meta
+        self.arrays = arrays
+        self._net = None
+        self._graph = None
+
+    def network(self):
+        """
+        Réseau compilé, identique (même empreinte) à compile_network du graphe d'origine.
+        """
+        if self._net is None:
+            m = self.meta
+            self._net = Network(
+                node_keys=m["node_keys"],
+                stations=m["stations"],
+                lines=m["lines"],
+                main_lines=m["main_lines"],
+                names=m["names"],
+                **{name: self.arrays[name] for name in NETWORK_ARRAYS}
+            )
+        return self._net
+
+    def to_networkx(self):
+        """
+        Graphe NetworkX identique à celui qui a été sauvegardé : ordre des noeuds, ordre des voisins
+        de chaque noeud et attributs (types Python compris). Construit au premier appel.
+        """
+        if self._graph is None:
+            import networkx as nx
+
+            m, a = self.meta, self.arrays
+            keys, stations, lines, names = m["node_keys"], m["stations"], m["lines"], m["names"]
+            edge_types, edge_lines = m["edge_types"], m["edge_lines"]
+            station_id, line_id = a["station_id"].tolist(), a["line_id"].tolist()
+            latitude, longitude = a["latitude"].tolist(), a["longitude"].tolist()
+            indptr, indices = a["indptr"].tolist(), a["indices"].tolist()
+            distance = a["distance_m"].tolist()
+            edge_type, edge_line, kind = a["edge_type"].tolist(), a["edge_line"].tolist(), a["distance_kind"].tolist()
+
+            G = nx.Graph()
+            G.add_nodes_from(
+                (keys[i], {"station_key": stations[station_id[i]], "name": names[i], "ligne": lines[line_id[i]],
+                           "latitude": latitude[i], "longitude": longitude[i]})
+                for i in a["node_order"].tolist()
+            )
+            # Remplissage direct de l'adjacence, voisin par voisin dans l'ordre enregistré
+            # (add_edges_from réordonnerait les voisins) ; les deux sens partagent le même dict
+            # d'attributs, comme dans un nx.Graph construit arête par arête
+            shared = {}
+            for u in range(len(keys)):
+                adj_u = G._adj[keys[u]]
+                for j in range(indptr[u], indptr[u + 1]):
+                    v = indices[j]
+                    data = shared.pop((v, u), None)
+                    if data is None:
+                        d = distance[j]
+                        data = {"type": edge_types[edge_type[j]],
+                                "ligne": None if edge_line[j] < 0 else edge_lines[edge_line[j]],
+                                "distance": None if kind[j] == 0 else int(d) if kind[j] == 2 else d}
+                        if v != u:
+                            shared[(u, v)] = data
+                    adj_u[keys[v]] = data
+            self._graph = G
+        return self._graph
+
+def load_graph_store(path):
+    """
+    Ouvre un graphe écrit par save_graph_store. Un format inconnu ou d'une autre version est refusé
+    (relancer graph_builder/build_graph.py).
+    """
+    with open(os.path.join(path, "format.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT or meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} : format {meta.get('format')} v{meta.get('version')} non pris en charge "
+                         f"(attendu {FORMAT} v{FORMAT_VERSION}), relancer graph_builder/build_graph.py")
+    # np.asarray : vue ndarray sur la projection (np.memmap n'est pas accepté par tous les appelants)
+    arrays = {name: np.asarray(np.load(os.path.join(path, name + ".npy"), mmap_mode="r"))
+              for name in NETWORK_ARRAYS + GRAPH_ARRAYS}
+    if len(arrays["indptr"]) != meta["n_nodes"] + 1 or len(arrays["indices"]) != meta["n_slots"]:
+        raise ValueError(f"{path} : tableaux incohérents avec format.json")
+    return GraphStore(path, meta, arrays)
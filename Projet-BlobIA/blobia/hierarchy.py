@@ -0,0 +1,136 @@
+import heapq
+
+import numpy as np
+
+from blobia.blob_solver import ponderations, route_result
+
+CH_VERSION = 1
+
+class Hierarchy:
+    """
+    Hiérarchie de contraction chargée (produite par graph_builder/contraction.py), en listes Python
+    pour la recherche bidirectionnelle montante.
+    """
+
+    def __init__(self, curseur, up_indptr, up_indices, up_weights, milieux):
+        self.curseur = int(curseur)
+        self.up_indptr = up_indptr.tolist()
+        self.up_indices = up_indices.tolist()
+        self.up_weights = up_weights.tolist()
+        # (u, w) -> noeud contracté entre u et w, pour dérouler les raccourcis
+        self.milieux = {(u, w): m for u, w, m in milieux.tolist()}
+
+def save_hierarchy(ch, path, net):
+    """
+    Écrit la hiérarchie de build_contraction_hierarchy en .npz (tableaux seuls, sans pickle) :
+    graphe montant en CSR, raccourcis en lignes (u, w, milieu) et empreinte du réseau.
+    """
+    milieux = np.array([(u, w, m) for (u, w), m in sorted(ch["milieux"].items())], dtype=np.int32).reshape(-1, 3)
+    with open(path, "wb") as f:
+        np.savez(f, version=CH_VERSION, graph=net.fingerprint(), curseur=ch["curseur"], rank=ch["rank"],
+                 up_indptr=ch["up_indptr"], up_indices=ch["up_indices"], up_weights=ch["up_weights"],
+                 milieux=milieux)
+
+def load_hierarchy(path, net):
+    """
+    Charge la hiérarchie et l'attache au réseau compilé (net.hierarchy).
+    Une hiérarchie construite sur un autre graphe est refusée.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        if int(data["version"]) != CH_VERSION or str(data["graph"]) != net.fingerprint():
+            raise ValueError(f"La hiérarchie {path} ne correspond pas au graphe chargé : relancer graph_builder/contraction.py")
+        net.hierarchy = Hierarchy(data["curseur"], data["up_indptr"], data["up_indices"],
+                                  data["up_weights"], data["milieux"])
+    return net.hierarchy
+
+def _upward(ch, sources, dist):
+    """
+    Un pas de recherche montante : dépile le plus petit noeud du tas `sources` et relâche ses arêtes
+    montantes. Renvoie le noeud dépilé.
+    """
+    d, u = heapq.heappop(sources)
+    if d > dist[u][0]:
+        return u
+    for j in range(ch.up_indptr[u], ch.up_indptr[u + 1]):
+        v = ch.up_indices[j]
+        nd = d + ch.up_weights[j]
+        if nd < dist.get(v, (float('inf'),))[0]:
+            dist[v] = (nd, u)
+            heapq.heappush(sources, (nd, v))
+    return u
+
+def _unpack(ch, u, v, out):
+    # Déroule l'arête u -> v (raccourci ou arête d'origine) en ajoutant les noeuds après u
+    m = ch.milieux.get((u, v))
+    if m is None:
+        out.append(v)
+    else:
+        _unpack(ch, u, m, out)
+        _unpack(ch, m, v, out)
+
+def ch_route(net, affluence_mapping, nodes_depart, nodes_arrivee, stats=None):
+    """
+    Meilleur trajet du mode rapide (arrêts + correspondances, curseur de la hiérarchie) par
+    recherche bidirectionnelle sur le graphe montant : on ne monte qu'en rang depuis les départs
+    et depuis les arrivées, et l'on s'arrête dès que les deux fronts ne peuvent plus améliorer
+    le meilleur point de rencontre. Un seul trajet est renvoyé ; son score est
+    alpha * arrêts + beta * affluence moyenne + gamma * changements.
+    """
+    ch = net.hierarchy
+    if ch is None:
+        raise ValueError("Aucune hiérarchie de contraction chargée (voir load_hierarchy).")
+    alpha, beta, gamma = ponderations(ch.curseur)
+
+    avant = {d: (0.0, None) for d in nodes_depart}
+    arriere = {a: (0.0, None) for a in nodes_arrivee}
+    front_avant = [(0.0, d) for d in avant]
+    front_arriere = [(0.0, a) for a in arriere]
+    heapq.heapify(front_avant)
+    heapq.heapify(front_arriere)
+
+    meilleur = float('inf')
+    rencontre = None
+    for d in avant:
+        if d in arriere:
+            meilleur, rencontre = 0.0, d
+    nb_depiles = 0
+    while front_avant or front_arriere:
+        min_avant = front_avant[0][0] if front_avant else float('inf')
+        min_arriere = front_arriere[0][0] if front_arriere else float('inf')
+        if min(min_avant, min_arriere) >= meilleur:
+            break
+        if min_avant <= min_arriere:
+            dist, autre, front = avant, arriere, front_avant
+        else:
+            dist, autre, front = arriere, avant, front_arriere
+        u = _upward(ch, front, dist)
+        nb_depiles += 1
+        if u in autre:
+            total = dist[u][0] + autre[u][0]
+            if total < meilleur:
+                meilleur, rencontre = total, u
+    if stats is not None:
+        stats["expansions"] = nb_depiles
+    if rencontre is None:
+        return []
+
+    # Chemin : départ -> rencontre (arbre avant), puis rencontre -> arrivée (arbre arrière)
+    montee = [rencontre]
+    while avant[montee[-1]][1] is not None:
+        montee.append(avant[montee[-1]][1])
+    montee.reverse()
+    path = [montee[0]]
+    for u, v in zip(montee, montee[1:]):
+        _unpack(ch, u, v, path)
+    u = rencontre
+    while arriere[u][1] is not None:
+        v = arriere[u][1]
+        _unpack(ch, u, v, path)
+        u = v
+
+    aff = net.affluence_list(affluence_mapping)
+    line_of = net.py_arrays()[3]
+    affluences = [aff[n] for n in path]
+    changes = sum(1 for u, v in zip(path, path[1:]) if line_of[u] != line_of[v])
+    score = alpha * len(path) + beta * sum(affluences) / len(path) + gamma * changes
+    return [route_result(net, score, path, affluences)]
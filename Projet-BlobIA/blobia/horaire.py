@@ -0,0 +1,60 @@
+import numpy as np
+
+from affluence_builder.get_affluence import JOURS
+
+# Vitesses commerciales (arrêts compris) par mode, en km/h
+VITESSES_KMH = {"METRO": 25.0, "RER": 45.0}
+# Durée d'une correspondance entre deux lignes différentes (minutes) ; changer de branche
+# d'une même ligne (RER A 1 -> RER A 4) ne coûte rien
+TEMPS_CORRESPONDANCE_MIN = 4.0
+
+_minutes_cache = {}
+
+def mode_of_line(main_line):
+    return main_line.split()[0]
+
+def edge_minutes(net, vitesses_kmh=VITESSES_KMH, correspondance_min=TEMPS_CORRESPONDANCE_MIN):
+    """
+    Durée estimée (minutes) de chaque arête du réseau compilé, alignée sur net.indices :
+    distance_m / vitesse du mode pour une arête de ligne (distance manquante : médiane du réseau),
+    correspondance_min pour un changement de ligne. Mémorisé par réseau.
+    """
+    key = (net.fingerprint(), tuple(sorted(vitesses_kmh.items())), correspondance_min)
+    cached = _minutes_cache.get(key)
+    if cached is not None:
+        return cached
+    src = np.repeat(np.arange(net.n_nodes), np.diff(net.indptr))
+    dst = net.indices
+    meme_ligne = net.line_id[src] == net.line_id[dst]
+    distance = net.distance_m.copy()
+    distance[np.isnan(distance)] = np.nanmedian(net.distance_m[meme_ligne & (net.distance_m > 0)])
+    vitesse = np.array([vitesses_kmh[mode_of_line(m)] for m in net.main_lines])[net.main_line_id[src]]
+    minutes = np.where(meme_ligne, distance / 1000.0 / vitesse * 60.0, 0.0)
+    changement = ~meme_ligne & (net.main_line_id[src] != net.main_line_id[dst])
+    minutes[changement] = correspondance_min
+    cached = _minutes_cache[key] = minutes.tolist()
+    return cached
+
+def parse_heure(heure):
+    """
+    Heure de départ en minutes depuis minuit : 8, 7.5, "7h30" ou "07:30".
+    """
+    if isinstance(heure, str):
+        h, _, m = heure.replace(":", "h").partition("h")
+        return int(h) * 60 + (int(m) if m else 0)
+    return int(round(heure * 60))
+
+def tranches_horaires(affluence_horaire, jour, heure):
+    """
+    Affluence par noeud (listes Python) pour les 24 heures qui suivent le départ, et minute de
+    départ dans la première heure : l'heure réelle de passage à un noeud donne directement sa
+    tranche (passage de minuit compris, jour suivant).
+    """
+    depart = parse_heure(heure)
+    j0 = JOURS.index(jour.lower())
+    h0 = depart // 60
+    tranches = []
+    for k in range(24):
+        j, h = divmod(h0 + k, 24)
+        tranches.append(affluence_horaire[(j0 + j) % len(JOURS), h].tolist())
+    return tranches, depart % 60
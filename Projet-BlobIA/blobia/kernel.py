@@ -0,0 +1,305 @@
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba absent : blob_path_solver garde la boucle Python
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        def decorate(f):
+            return f
+        return decorate
+
+ORDRE_MAX = 1 << 62  # borne des rangs de la liste ordonnée des chemins
+
+@njit(nogil=True, cache=True)
+def _label_lt(a, b, score, node, ordre):
+    # Même ordre que les entrées (score, noeud, _Label) du tas de blob_path_solver ;
+    # ordre[] remplace la comparaison des chemins de _Label.__lt__ (voir _inserer)
+    if score[a] != score[b]:
+        return score[a] < score[b]
+    if node[a] != node[b]:
+        return node[a] < node[b]
+    return ordre[a] < ordre[b]
+
+@njit(nogil=True, cache=True)
+def _heap_push(heap, size, item, score, node, ordre):
+    pos = size
+    heap[pos] = item
+    while pos > 0:
+        up = (pos - 1) >> 1
+        if _label_lt(item, heap[up], score, node, ordre):
+            heap[pos] = heap[up]
+            pos = up
+        else:
+            break
+    heap[pos] = item
+    return size + 1
+
+@njit(nogil=True, cache=True)
+def _heap_pop(heap, size, score, node, ordre):
+    top = heap[0]
+    size -= 1
+    last = heap[size]
+    pos = 0
+    while True:
+        child = 2 * pos + 1
+        if child >= size:
+            break
+        if child + 1 < size and _label_lt(heap[child + 1], heap[child], score, node, ordre):
+            child += 1
+        if _label_lt(heap[child], last, score, node, ordre):
+            heap[pos] = heap[child]
+            pos = child
+        else:
+            break
+    if size > 0:
+        heap[pos] = last
+    return top, size
+
+@njit(nogil=True, cache=True)
+def _renumeroter(ordre, suivant, tete):
+    # Rangs répartis uniformément sur [0, ORDRE_MAX) le long de la liste
+    n = 0
+    x = tete
+    while x != -1:
+        n += 1
+        x = suivant[x]
+    pas = ORDRE_MAX // (n + 1)
+    rang = 1
+    x = tete
+    while x != -1:
+        ordre[x] = rang * pas
+        rang += 1
+        x = suivant[x]
+
+@njit(nogil=True, cache=True)
+def _inserer(ordre, suivant, tete, apres, premier, nb, node, tri):
+    """
+    Insère les étiquettes premier..premier+nb-1 (noeuds distincts), triées par noeud, juste après
+    l'étiquette `apres` (-1 : en tête) dans la liste ordonnée ; renvoie la tête de liste.
+    Les enfants d'une étiquette sont tous créés à son développement : la liste suit le parcours
+    préfixe de l'arbre des chemins, enfants par noeud croissant, soit l'ordre lexicographique des
+    chemins. Chaque étiquette y a un rang (ordre[]) comparé en O(1).
+    """
+    for i in range(nb):
+        x = premier + i
+        j = i
+        while j > 0 and node[tri[j - 1]] > node[x]:
+            tri[j] = tri[j - 1]
+            j -= 1
+        tri[j] = x
+    suiv = tete if apres == -1 else suivant[apres]
+    bas = 0 if apres == -1 else ordre[apres]
+    haut = ORDRE_MAX if suiv == -1 else ordre[suiv]
+    if (haut - bas) // (nb + 1) == 0:
+        # Plus de rang libre entre les voisins : on renumérote toute la liste (rare)
+        _renumeroter(ordre, suivant, tete)
+        bas = 0 if apres == -1 else ordre[apres]
+        haut = ORDRE_MAX if suiv == -1 else ordre[suiv]
+    pas = (haut - bas) // (nb + 1)
+    for i in range(nb):
+        ordre[tri[i]] = bas + (i + 1) * pas
+        suivant[tri[i]] = tri[i + 1] if i + 1 < nb else suiv
+    if apres == -1:
+        return tri[0]
+    suivant[apres] = tri[0]
+    return tete
+
+@njit(nogil=True, cache=True)
+def _agrandir(a, capacite):
+    b = np.empty((capacite,) + a.shape[1:], a.dtype)
+    b[:len(a)] = a
+    return b
+
+@njit(nogil=True, cache=True)
+def _visiter(visites, mot, bit, nb_mots):
+    # Un passage de plus par la station (mot, bit) : visites[k * nb_mots + mot] est le masque des
+    # stations déjà vues au moins k+1 fois (compteur saturé, comme _visit de blob_solver)
+    for k in range(len(visites) // nb_mots):
+        if not visites[k * nb_mots + mot] & bit:
+            visites[k * nb_mots + mot] |= bit
+            return
+
+@njit(nogil=True, cache=True)
+def _same_stations(a, b, station_of, node, parent, length):
+    # Même séquence de stations pour les chemins des étiquettes a et b
+    if length[a] != length[b]:
+        return False
+    while a != -1:
+        if station_of[node[a]] != station_of[node[b]]:
+            return False
+        a = parent[a]
+        b = parent[b]
+    return True
+
+@njit(nogil=True, cache=True)
+def blob_search_kernel(indptr, indices, station_of, line_of, main_of, aff,
+                       nodes_depart, is_target, alpha, beta, gamma, nb_niveaux, max_iter, max_finals,
+                       marge, nb_top, max_front):
+    """
+    Boucle best-first de blob_path_solver sur tableaux, sans le GIL.
+    Les étiquettes sont des indices dans des tableaux (parent, noeud, ligne, cumuls, rang du chemin),
+    agrandis au besoin ; chaque étiquette développée porte ses masques de passages par station,
+    copiés de son parent comme les tuples de _visit.
+    Renvoie (itérations, étiquettes finales dans l'ordre de dépilement, nombre de finales,
+    parent, noeud, score, exact, compteurs) pour reconstruire les chemins côté Python ;
+    compteurs = [empilements, élagages par domination, élagages par visites, pic du tas].
+    """
+    max_degree = 0
+    for u in range(len(indptr) - 1):
+        max_degree = max(max_degree, indptr[u + 1] - indptr[u])
+    capacite = max(1024, 2 * len(nodes_depart))
+
+    parent = np.empty(capacite, np.int64)
+    node = np.empty(capacite, np.int64)
+    ligne = np.empty(capacite, np.int64)
+    aff_sum = np.empty(capacite, np.float64)
+    length = np.empty(capacite, np.int64)
+    score = np.empty(capacite, np.float64)
+    heap = np.empty(capacite, np.int64)
+    ordre = np.empty(capacite, np.int64)
+    suivant = np.empty(capacite, np.int64)
+    ligne_visites = np.empty(capacite, np.int64)
+    # Masques de passages des étiquettes développées, une ligne par développement
+    nb_mots = (station_of.max() + 64) // 64 if len(station_of) else 1
+    visites = np.empty((256, max(nb_niveaux, 1) * nb_mots), np.uint64)
+    nb_developpees = 0
+    tri = np.empty(max(max_degree, len(nodes_depart)), np.int64)
+    finals = np.empty(max_finals, np.int64)
+    best_score = np.full(len(indptr) - 1, np.inf)
+    # Trajets distincts (en stations) parmi les finales : représentant et meilleur score
+    uniques = np.empty(max_finals, np.int64)
+    meilleurs = np.empty(max_finals, np.float64)
+    nb_uniques = 0
+    seuil_arret = np.inf
+    tronque = False
+    nb_abandons = 0
+    nb_domination = 0
+    nb_visites = 0
+
+    nb_labels = 0
+    size = 0
+    for dep in nodes_depart:
+        parent[nb_labels] = -1
+        node[nb_labels] = dep
+        ligne[nb_labels] = line_of[dep]
+        aff_sum[nb_labels] = aff[dep]
+        length[nb_labels] = 1
+        score[nb_labels] = 0.0
+        nb_labels += 1
+    tete = _inserer(ordre, suivant, -1, -1, 0, nb_labels, node, tri)
+    for label in range(nb_labels):
+        size = _heap_push(heap, size, label, score, node, ordre)
+    pic_tas = size
+
+    nb_finals = 0
+    it = 0
+    while size > 0 and it < max_iter and nb_finals < max_finals and score[heap[0]] < seuil_arret:
+        it += 1
+        label, size = _heap_pop(heap, size, score, node, ordre)
+        u = node[label]
+        s = score[label]
+        if is_target[u]:
+            finals[nb_finals] = label
+            nb_finals += 1
+            j = 0
+            while j < nb_uniques and not _same_stations(label, uniques[j], station_of, node, parent, length):
+                j += 1
+            if j == nb_uniques:
+                uniques[j] = label
+                meilleurs[j] = np.inf
+                nb_uniques += 1
+            if s < meilleurs[j]:
+                meilleurs[j] = s
+                if nb_uniques >= nb_top:
+                    seuil_arret = np.sort(meilleurs[:nb_uniques])[nb_top - 1] + marge
+            continue
+        if best_score[u] <= s:
+            nb_domination += 1
+            continue
+        best_score[u] = s
+
+        node_station = station_of[u]
+        # Passages de l'étiquette : ceux du parent plus sa station (la station de départ compte double)
+        if nb_developpees == len(visites):
+            visites = _agrandir(visites, 2 * nb_developpees)
+        v = visites[nb_developpees]
+        ligne_visites[label] = nb_developpees
+        nb_developpees += 1
+        mot = node_station >> 6
+        bit = np.uint64(1) << np.uint64(node_station & 63)
+        if parent[label] == -1:
+            v[:] = 0
+            _visiter(v, mot, bit, nb_mots)
+        else:
+            v[:] = visites[ligne_visites[parent[label]]]
+        _visiter(v, mot, bit, nb_mots)
+        sature_depuis = (nb_niveaux - 1) * nb_mots
+
+        if nb_labels + max_degree > capacite:
+            capacite = 2 * (nb_labels + max_degree)
+            parent = _agrandir(parent, capacite)
+            node = _agrandir(node, capacite)
+            ligne = _agrandir(ligne, capacite)
+            aff_sum = _agrandir(aff_sum, capacite)
+            length = _agrandir(length, capacite)
+            score = _agrandir(score, capacite)
+            heap = _agrandir(heap, capacite)
+            ordre = _agrandir(ordre, capacite)
+            suivant = _agrandir(suivant, capacite)
+            ligne_visites = _agrandir(ligne_visites, capacite)
+
+        main_line = main_of[u]
+        lab_ligne = ligne[label]
+        nb_arrets = length[label]
+        premier = nb_labels
+        for j in range(indptr[u], indptr[u + 1]):
+            succ = indices[j]
+            succ_line = line_of[succ]
+            succ_station = station_of[succ]
+            # Station déjà vue nb_niveaux fois : seule une correspondance y repasse
+            sature = nb_niveaux == 0 or (
+                v[sature_depuis + (succ_station >> 6)] & (np.uint64(1) << np.uint64(succ_station & 63))) != 0
+            if sature and succ_line == lab_ligne:
+                nb_visites += 1
+                continue
+            if main_of[succ] == main_line and succ_station == node_station and succ_line != lab_ligne:
+                continue
+            penalty = 0.0
+            if succ_line != lab_ligne:
+                penalty += gamma
+            aff_moy = (aff_sum[label] + aff[succ]) / (nb_arrets + 1)
+            new_score = alpha * (nb_arrets + 1) + beta * aff_moy + penalty
+
+            parent[nb_labels] = label
+            node[nb_labels] = succ
+            ligne[nb_labels] = succ_line
+            aff_sum[nb_labels] = aff_sum[label] + aff[succ]
+            length[nb_labels] = nb_arrets + 1
+            score[nb_labels] = new_score
+            nb_labels += 1
+        # Rangs des enfants (voisins distincts du graphe compilé), puis empilement dans l'ordre des arêtes
+        if nb_labels > premier:
+            tete = _inserer(ordre, suivant, tete, label, premier, nb_labels - premier, node, tri)
+        for x in range(premier, nb_labels):
+            size = _heap_push(heap, size, x, score, node, ordre)
+
+        # Mode faisceau : on ne garde que les max_front meilleures étiquettes (dépilées dans l'ordre,
+        # elles forment un tableau trié, donc un tas)
+        if size > pic_tas:
+            pic_tas = size
+        if max_front > 0 and size > 2 * max_front:
+            gardes = np.empty(max_front, np.int64)
+            for j in range(max_front):
+                gardes[j], size = _heap_pop(heap, size, score, node, ordre)
+            heap[:max_front] = gardes
+            nb_abandons += size
+            size = max_front
+            tronque = True
+
+    exact = not tronque and (size == 0 or score[heap[0]] >= seuil_arret)
+    compteurs = np.array([it + size + nb_abandons, nb_domination, nb_visites, pic_tas], np.int64)
+    return (it, finals, nb_finals, parent[:nb_labels].copy(), node[:nb_labels].copy(),
+            score[:nb_labels].copy(), exact, compteurs)
@@ -0,0 +1,257 @@
+import heapq
+
+from blobia.blob_solver import ponderations, route_result
+from blobia.network import Network, as_network
+
+INF = float('inf')
+
+def k_shortest_routes(
+    G,
+    affluence_mapping,
+    nodes_depart,
+    nodes_arrivee,
+    curseur=1,
+    k=3,
+    stats=None
+):
+    """
+    k plus courts trajets sans boucle au niveau des stations (algorithme de Yen).
+
+    Un trajet est une suite de stations ; son coût est celui de la meilleure affectation
+    de lignes le long de cette suite. Le coût est additif pour que les sous-chemins optimaux
+    restent optimaux : chaque arrêt coûte alpha + beta * affluence du noeud, chaque changement
+    de ligne gamma (mêmes poids que blob_path_solver, mais affluence cumulée et tous les
+    changements comptés). Les correspondances entre deux branches d'une même ligne principale
+    sont interdites, comme dans blob_path_solver.
+
+    Les déviations de Yen portent sur la station suivante : deux trajets retournés ont donc
+    toujours des suites de stations différentes, sans sur-collecte ni dédoublonnage.
+    L'arbre des plus courts chemins vers les arrivées donne le premier trajet et sert
+    d'heuristique exacte (sans interdiction) à toutes les recherches de déviation, qui sont
+    des A* multi-sources depuis les noeuds de la station de déviation.
+    """
+    if not isinstance(G, Network):
+        net = as_network(G)
+        nodes_depart = [net.index[n] for n in nodes_depart]
+        nodes_arrivee = [net.index[n] for n in nodes_arrivee if n in net.index]
+        G = net
+    solve = k_shortest_solver(G, affluence_mapping, nodes_arrivee, curseur=curseur, k=k, stats=stats)
+    return solve(nodes_depart)
+
+def k_shortest_solver(
+    net,
+    affluence_mapping,
+    nodes_arrivee,
+    curseur=1,
+    k=3,
+    stats=None
+):
+    """
+    Prépare les recherches vers un ensemble d'arrivées (réseau compilé, ids de noeuds) et renvoie
+    une fonction nodes_depart -> k plus courts trajets. L'arbre des plus courts chemins vers les
+    arrivées n'est calculé qu'une fois et partagé par tous les départs.
+    """
+    aff = net.affluence_list(affluence_mapping)
+    indptr, indices, station_of, line_of, main_of = net.py_arrays()
+    station_nodes = net.station_nodes
+    alpha, beta, gamma = ponderations(curseur)
+
+    n = net.n_nodes
+    PUITS = n
+    is_target = [False] * n
+    for a in nodes_arrivee:
+        is_target[a] = True
+
+    def arc_cost(u, v):
+        # Coût de l'arc u -> v, None si l'arc est interdit
+        if v == PUITS:
+            return 0.0
+        if line_of[u] == line_of[v]:
+            return alpha + beta * aff[v]
+        if station_of[u] == station_of[v] and main_of[u] == main_of[v]:
+            return None
+        return alpha + beta * aff[v] + gamma
+
+    # 1. Arbre des plus courts chemins vers les arrivées (Dijkstra sur les arcs inversés)
+    dist = [INF] * (n + 1)
+    suivant = [None] * (n + 1)
+    dist[PUITS] = 0.0
+    front = []
+    for a in nodes_arrivee:
+        if dist[a] > 0.0:
+            dist[a] = 0.0
+            suivant[a] = PUITS
+            front.append((0.0, a))
+    heapq.heapify(front)
+    while front:
+        d, v = heapq.heappop(front)
+        if d > dist[v]:
+            continue
+        for j in range(indptr[v], indptr[v + 1]):
+            u = indices[j]
+            c = arc_cost(u, v)
+            if c is None:
+                continue
+            nd = d + c
+            if nd < dist[u]:
+                dist[u] = nd
+                suivant[u] = v
+                heapq.heappush(front, (nd, u))
+
+    def stations_of(nodes):
+        # Suite de stations d'un chemin de noeuds (une correspondance ne répète pas la station)
+        seq = []
+        for u in nodes:
+            s = station_of[u]
+            if not seq or seq[-1] != s:
+                seq.append(s)
+        return seq
+
+    def with_transfer(arrive, s):
+        # Meilleur coût sur chaque noeud de la station s, en autorisant une correspondance sur place
+        best = {v: (c, None) for v, (c, _) in arrive.items()}
+        for u, (cu, _) in arrive.items():
+            for v in station_nodes[s]:
+                if v == u:
+                    continue
+                c = arc_cost(u, v)
+                if c is not None and cu + c < best.get(v, (INF,))[0]:
+                    best[v] = (cu + c, u)
+        return best
+
+    def viterbi(cout_depart, stations):
+        """
+        Pour chaque station de la suite : coût minimal jusqu'à chacun de ses noeuds en suivant
+        exactement cette suite, avec de quoi reconstruire le chemin de noeuds.
+        """
+        arrivals, bests = [], []
+        arrive = {d: (c, None) for d, c in cout_depart.items() if station_of[d] == stations[0]}
+        for i, s in enumerate(stations):
+            if i > 0:
+                arrive = {}
+                for u, (cu, _) in bests[-1].items():
+                    for j in range(indptr[u], indptr[u + 1]):
+                        v = indices[j]
+                        if station_of[v] != s:
+                            continue
+                        c = arc_cost(u, v)
+                        if c is not None and cu + c < arrive.get(v, (INF,))[0]:
+                            arrive[v] = (cu + c, u)
+            arrivals.append(arrive)
+            bests.append(with_transfer(arrive, s))
+        return arrivals, bests
+
+    def root_nodes(arrivals, bests, i, v):
+        # Chemin de noeuds de la racine se terminant sur le noeud v de la i-ème station
+        nodes = []
+        while i >= 0:
+            via = bests[i][v][1]
+            nodes.append(v)
+            if via is not None:
+                nodes.append(via)
+                v = via
+            v = arrivals[i][v][1]
+            i -= 1
+        nodes.reverse()
+        return nodes
+
+    compteurs = {"recherches_deviation": 0, "candidats": 0}
+
+    def spur_search(s_spur, starts, root_before, banned_next):
+        """
+        Meilleure suite depuis la station de déviation : départ multi-source sur ses noeuds
+        (coûts de la racine), sans revenir sur la racine ni prendre une station suivante interdite.
+        """
+        def allowed(u, v):
+            if v == PUITS:
+                return station_of[u] != s_spur or PUITS not in banned_next
+            s = station_of[v]
+            if s == s_spur or s in root_before:
+                return False
+            return station_of[u] != s_spur or s not in banned_next
+
+        compteurs["recherches_deviation"] += 1
+        g = dict(starts)
+        parent = {u: None for u in starts}
+        front = [(c + dist[u], c, u) for u, c in starts.items() if dist[u] < INF]
+        heapq.heapify(front)
+        closed = set()
+        while front:
+            _, gu, u = heapq.heappop(front)
+            if u in closed:
+                continue
+            if u == PUITS:
+                path = []
+                u = parent[u]
+                while u is not None:
+                    path.append(u)
+                    u = parent[u]
+                path.reverse()
+                return path, gu
+            closed.add(u)
+            succ = indices[indptr[u]:indptr[u + 1]]
+            if is_target[u]:
+                succ = succ + [PUITS]
+            for v in succ:
+                if v in closed or dist[v] == INF or not allowed(u, v):
+                    continue
+                c = arc_cost(u, v)
+                if c is None:
+                    continue
+                gv = gu + c
+                if gv < g.get(v, INF):
+                    g[v] = gv
+                    parent[v] = u
+                    heapq.heappush(front, (gv + dist[v], gv, v))
+        return None, INF
+
+    # 2. Yen sur les suites de stations, pour chaque ensemble de départs
+    def routes_from(nodes_depart):
+        cout_depart = {d: alpha + beta * aff[d] for d in nodes_depart}
+        routes = []      # (coût, noeuds, stations) retenus
+        candidats = []   # tas de (coût, stations, noeuds)
+        vus = set()
+        best_start = min(cout_depart, key=lambda d: cout_depart[d] + dist[d], default=None)
+        if best_start is not None and dist[best_start] < INF:
+            nodes = [best_start]
+            while suivant[nodes[-1]] != PUITS:
+                nodes.append(suivant[nodes[-1]])
+            stations = stations_of(nodes)
+            vus.add(tuple(stations))
+            heapq.heappush(candidats, (cout_depart[best_start] + dist[best_start], stations, nodes))
+
+        while candidats and len(routes) < k:
+            cost, stations, nodes = heapq.heappop(candidats)
+            routes.append((cost, nodes, stations))
+            if len(routes) >= k:
+                break
+
+            arrivals, bests = viterbi(cout_depart, stations)
+            for j, s_spur in enumerate(stations):
+                prefix = stations[:j + 1]
+                banned_next = set()
+                for _, _, other in routes:
+                    if other[:j + 1] == prefix:
+                        banned_next.add(other[j + 1] if len(other) > j + 1 else PUITS)
+                starts = {v: c for v, (c, _) in bests[j].items()}
+                if not starts:
+                    break
+                spur, spur_cost = spur_search(s_spur, starts, set(stations[:j]), banned_next)
+                if spur is None:
+                    continue
+                candidate = stations[:j] + stations_of(spur)
+                key = tuple(candidate)
+                # Trajet sans boucle : une station n'apparaît qu'une fois dans la suite
+                if key in vus or len(set(candidate)) != len(candidate):
+                    continue
+                vus.add(key)
+                full = root_nodes(arrivals, bests, j, spur[0])[:-1] + spur
+                heapq.heappush(candidats, (spur_cost, candidate, full))
+
+        compteurs["candidats"] += len(vus)
+        if stats is not None:
+            stats.update(compteurs)
+
+        return [route_result(net, cost, nodes, [aff[u] for u in nodes]) for cost, nodes, _ in routes]
+
+    return routes_from
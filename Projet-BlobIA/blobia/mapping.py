@@ -1,7 +1,12 @@
+import os
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
-from geopy.distance import geodesic
 import unidecode
 
+from blobia.geo import RAYON_TERRE_M, geodesic_m
+
 def normalize_name(name):
     if not isinstance(name, str):
         return ""
@@ -9,39 +14,112 @@ def normalize_name(name):
     name = name.replace("’", "'").replace("`", "'").replace("–", " ")
     return " ".join(name.split()).strip()
 
-def find_stations_near_monument(
-        monument_name,
-        rayon_m=900,
-        monuments_csv="data/monuments.csv",
-        stations_csv="data/graph_nodes.csv"
-    ):
+class StationSpatialIndex:
+    """
+    Index spatial des stations (KD-tree scipy sur les positions projetées sur la sphère unité :
+    la distance entre deux points y croît avec la distance haversine) et table des monuments.
+    Le KD-tree ne sert qu'à présélectionner les candidats, avec une marge qui couvre l'écart
+    sphère / ellipsoïde ; les distances renvoyées sont géodésiques (WGS-84), comme geopy.
+    """
+
+    # Écart relatif maximal entre distance haversine et distance géodésique (~0.5 %), arrondi
+    MARGE = 0.01
+
+    def __init__(self, monuments, stations):
+        from scipy.spatial import cKDTree
+
+        self.monuments = {}
+        for norm, lat, lon in zip(monuments["monument_norm"], monuments["Latitude"], monuments["Longitude"]):
+            self.monuments.setdefault(norm, (float(lat), float(lon)))
+        self.station_keys = stations["station_key"].tolist()
+        self.latitude = stations["latitude"].to_numpy(dtype=np.float64)
+        self.longitude = stations["longitude"].to_numpy(dtype=np.float64)
+        self.tree = cKDTree(_unit_vectors(self.latitude, self.longitude))
+
+    def monument_coords(self, monument_name):
+        return self.monuments.get(normalize_name(monument_name))
+
+    def _refine(self, lat, lon, candidats):
+        candidats = np.asarray(candidats, dtype=np.int64)
+        distances = geodesic_m(lat, lon, self.latitude[candidats], self.longitude[candidats])
+        # Tri stable : à distance égale, l'ordre du CSV des stations
+        ordre = np.lexsort((candidats, distances))
+        return candidats[ordre], distances[ordre]
+
+    def within(self, lat, lon, rayon_m):
+        """
+        Stations à moins de rayon_m mètres (distance géodésique) de (lat, lon), des plus proches
+        aux plus lointaines : [(station_key, distance_m)].
+        """
+        corde = _chord(rayon_m * (1 + self.MARGE))
+        candidats, distances = self._refine(lat, lon, self.tree.query_ball_point(_unit_vectors(lat, lon), corde))
+        garde = distances <= rayon_m
+        return [(self.station_keys[i], d) for i, d in zip(candidats[garde].tolist(), distances[garde].tolist())]
+
+    def nearest(self, lat, lon, k=1):
+        """
+        Les k stations les plus proches (distance géodésique) de (lat, lon) : [(station_key, distance_m)].
+        """
+        k = min(k, len(self.station_keys))
+        if k <= 0:
+            return []
+        point = _unit_vectors(lat, lon)
+        cordes, _ = self.tree.query(point, k=k)
+        # Toutes les stations que l'écart sphère / ellipsoïde pourrait faire passer devant la k-ième
+        rayon = _chord_to_m(np.max(cordes)) * (1 + self.MARGE) + 1.0
+        candidats, distances = self._refine(lat, lon, self.tree.query_ball_point(point, _chord(rayon)))
+        return [(self.station_keys[i], d) for i, d in zip(candidats[:k].tolist(), distances[:k].tolist())]
+
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+def _chord(distance_m):
+    # Corde sur la sphère unité pour un arc de distance_m (rayon terrestre moyen)
+    return 2 * np.sin(min(distance_m / RAYON_TERRE_M, np.pi) / 2)
+
+def _chord_to_m(corde):
+    return 2 * np.arcsin(min(corde / 2, 1.0)) * RAYON_TERRE_M
+
+SPATIAL_CACHE_SIZE = 4  # index spatiaux gardés (couples de CSV distincts)
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+def load_spatial_index(monuments_csv="data/monuments.csv", stations_csv="data/graph_nodes.csv"):
+    """
+    Index spatial construit une fois par chargement des données : réutilisé tant que les deux
+    CSV ne changent pas (taille, date). Seuls les SPATIAL_CACHE_SIZE derniers sont gardés.
+    """
+    return _spatial_index(_file_stamp(monuments_csv), _file_stamp(stations_csv))
+
+@lru_cache(maxsize=SPATIAL_CACHE_SIZE)
+def _spatial_index(monuments_stamp, stations_stamp):
     # Charger monuments (attention aux noms de colonnes !)
-    monuments = pd.read_csv(monuments_csv, encoding='cp1252')
+    monuments = pd.read_csv(monuments_stamp[0], encoding='cp1252')
     monuments["monument_norm"] = monuments["Monument"].apply(normalize_name)
-    monument_norm = normalize_name(monument_name)
-    row = monuments[monuments["monument_norm"] == monument_norm]
-    if row.empty:
-        raise ValueError(f"Monument '{monument_name}' non trouvé dans {monuments_csv}")
-    lat_m, lon_m = float(row.iloc[0]["Latitude"]), float(row.iloc[0]["Longitude"])
-
     # Charger stations
-    stations = pd.read_csv(stations_csv)
+    stations = pd.read_csv(stations_stamp[0])
     stations["station_key"] = stations["gare_key"].apply(normalize_name)
     stations = stations.drop_duplicates("station_key")
     stations = stations.dropna(subset=["latitude", "longitude"])
+    return StationSpatialIndex(monuments, stations)
 
-    results = []
-    for _, row in stations.iterrows():
-        lat_s, lon_s = float(row["latitude"]), float(row["longitude"])
-        dist = geodesic((lat_m, lon_m), (lat_s, lon_s)).meters
-        if dist <= rayon_m:
-            results.append((row["station_key"], dist))
+def find_stations_near_monument(
+        monument_name,
+        rayon_m=900,
+        monuments_csv="data/monuments.csv",
+        stations_csv="data/graph_nodes.csv"
+    ):
+    index = load_spatial_index(monuments_csv, stations_csv)
+    coords = index.monument_coords(monument_name)
+    if coords is None:
+        raise ValueError(f"Monument '{monument_name}' non trouvé dans {monuments_csv}")
+    results = index.within(*coords, rayon_m)
     if not results:
-        stations["distance"] = stations.apply(
-            lambda r: geodesic((lat_m, lon_m), (float(r["latitude"]), float(r["longitude"]))).meters, axis=1)
-        min_row = stations.loc[stations["distance"].idxmin()]
-        return [(min_row["station_key"], min_row["distance"])]
-    results = sorted(results, key=lambda x: x[1])
+        # Aucune station dans le rayon : la plus proche
+        return index.nearest(*coords, k=1)
     return results
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+import json
+
+from blobia.mapping import normalize_name
+
+ACCESS_VERSION = 1
+# Rayons (m) précalculés par graph_builder/build_monument_access.py
+RAYONS_M = (300, 600, 900, 1200, 1500)
+
+class MonumentAccess:
+    """
+    Table monument -> stations d'accès, précalculée pour chaque rayon de RAYONS_M : résoudre une
+    destination est une recherche dans un dict, sans relire les CSV ni recalculer de distances.
+    """
+
+    def __init__(self, table):
+        self.rayons = table["rayons"]
+        self.monuments = table["monuments"]
+        for monument in self.monuments.values():
+            for entree in monument["rayons"].values():
+                entree["proches"] = [tuple(p) for p in entree["proches"]]
+                entree["acces"] = [tuple(a) for a in entree["acces"]]
+
+    def __contains__(self, monument_name):
+        return normalize_name(monument_name) in self.monuments
+
+    def _entree(self, monument_name, rayon_m):
+        monument = self.monuments.get(normalize_name(monument_name))
+        if monument is None:
+            raise ValueError(f"Monument '{monument_name}' absent de la table d'accès")
+        entree = monument["rayons"].get(str(int(rayon_m)))
+        if entree is None:
+            raise ValueError(f"Rayon {rayon_m} m non précalculé (rayons disponibles : {self.rayons})")
+        return entree
+
+    def proches(self, monument_name, rayon_m=900):
+        """
+        Stations dans le rayon (sinon la plus proche) : [(station_key, distance_m)], comme
+        find_stations_near_monument.
+        """
+        return self._entree(monument_name, rayon_m)["proches"]
+
+    def acces(self, monument_name, rayon_m=900):
+        """
+        [(station_key, ligne, node_id, distance_m)] pour chaque ligne des stations proches.
+        """
+        return self._entree(monument_name, rayon_m)["acces"]
+
+    def stations(self, monument_name, rayon_m=900):
+        """
+        Station la plus proche de chaque ligne desservant le monument.
+        """
+        return self._entree(monument_name, rayon_m)["stations"]
+
+def load_monument_access(path, net):
+    """
+    Charge la table écrite par graph_builder/build_monument_access.py. Une table construite sur
+    un autre graphe est refusée.
+    """
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    if table.get("version") != ACCESS_VERSION or table.get("graph") != net.fingerprint():
+        raise ValueError(f"La table {path} ne correspond pas au graphe chargé : relancer graph_builder/build_monument_access.py")
+    return MonumentAccess(table)
@@ -0,0 +1,261 @@
+import hashlib
+import weakref
+from collections import deque
+
+import numpy as np
+
+def normalize_line(line):
+    parts = line.upper().split()
+    if parts[0] in {"RER", "METRO"}:
+        return f"{parts[0]} {parts[1]}"
+    return line.upper()
+
+def _intern(values):
+    """
+    Remplace chaque valeur par un id entier contigu (ordre de première apparition).
+    """
+    table = {}
+    ids = np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        ids[i] = table.setdefault(v, len(table))
+    return ids, list(table)
+
+class Network:
+    """
+    Instantané compilé du graphe NetworkX pour la boucle de recherche.
+
+    - ids de noeuds entiers contigus, attribués dans l'ordre trié des identifiants
+      d'origine : comparer deux ids (ou deux chemins d'ids) donne le même ordre que
+      comparer les identifiants NetworkX, donc les départages du tas sont inchangés ;
+    - adjacence CSR (`indptr`, `indices`, `distance_m`), voisins dans l'ordre de G ;
+    - stations, lignes et lignes principales (`normalize_line`) internées ;
+    - index des stations : clé de station (exacte ou normalisée) -> ids de noeuds, et noeud ->
+      (station, ligne), pour résoudre les noms en O(1).
+    """
+
+    def __init__(self, node_keys, indptr, indices, distance_m,
+                 station_id, line_id, main_line_id,
+                 stations, lines, main_lines, names, latitude, longitude):
+        self.node_keys = node_keys
+        self.index = {k: i for i, k in enumerate(node_keys)}
+        self.indptr = indptr
+        self.indices = indices
+        self.distance_m = distance_m
+        self.station_id = station_id
+        self.line_id = line_id
+        self.main_line_id = main_line_id
+        self.stations = stations
+        self.lines = lines
+        self.main_lines = main_lines
+        self.names = names
+        self.latitude = latitude
+        self.longitude = longitude
+
+        self.station_index = {s: i for i, s in enumerate(stations)}
+        order = np.argsort(station_id, kind="stable")
+        bounds = np.searchsorted(station_id[order], np.arange(len(stations) + 1))
+        self.station_nodes = [order[bounds[s]:bounds[s + 1]].tolist() for s in range(len(stations))]
+
+        self.hierarchy = None  # hiérarchie de contraction, voir blobia/hierarchy.py
+
+        self._norm_index = None
+
+        self._py = None
+        self._aff_cache = None
+        self._aff_list_cache = None
+        self._bits = None
+        self._fingerprint = None
+
+    @property
+    def n_nodes(self):
+        return len(self.node_keys)
+
+    def fingerprint(self):
+        """
+        Empreinte (sha1) du contenu du réseau : noeuds, adjacence, distances, stations et lignes.
+        """
+        if self._fingerprint is None:
+            h = hashlib.sha1()
+            for table in (self.node_keys, self.stations, self.lines, self.names):
+                h.update(repr(list(table)).encode("utf-8"))
+            for arr in (self.indptr, self.indices, self.distance_m, self.station_id, self.line_id,
+                        self.main_line_id, self.latitude, self.longitude):
+                h.update(arr.tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def station_key_index(self):
+        """
+        Clé de station normalisée (blobia.mapping.normalize_name) -> ids des noeuds de la station.
+        Construit au premier appel.
+        """
+        if self._norm_index is None:
+            from blobia.mapping import normalize_name
+            index = {}
+            for s, nodes in zip(self.stations, self.station_nodes):
+                index.setdefault(normalize_name(s), []).extend(nodes)
+            self._norm_index = index
+        return self._norm_index
+
+    def nodes_of_station(self, station_key):
+        """
+        Ids des noeuds d'une station : clé exacte, sinon clé normalisée (accents, casse, tirets).
+        """
+        sid = self.station_index.get(station_key)
+        if sid is not None:
+            return self.station_nodes[sid]
+        from blobia.mapping import normalize_name
+        return self.station_key_index().get(normalize_name(station_key), [])
+
+    def station_of_node(self, node):
+        """
+        (station_key, ligne) d'un noeud (id entier ou identifiant d'origine).
+        """
+        i = node if isinstance(node, (int, np.integer)) else self.index[node]
+        return self.stations[self.station_id[i]], self.lines[self.line_id[i]]
+
+    def affluence_vector(self, affluence_mapping, default=0.2):
+        """
+        Affluence par noeud (float64) à partir d'un mapping {(station_key, ligne): score}, ou d'un
+        vecteur déjà indexé par noeud (ex. tranche du tenseur d'affluence), converti tel quel.
+        Le dernier mapping converti est mémorisé (par identité).
+        """
+        if not hasattr(affluence_mapping, 'get'):
+            vec = np.asarray(affluence_mapping, dtype=np.float64)
+            if vec.shape != (self.n_nodes,):
+                raise ValueError(f"Vecteur d'affluence de forme {vec.shape}, attendu ({self.n_nodes},)")
+            return vec
+        cached = self._aff_cache
+        if cached is not None and cached[0] is affluence_mapping and cached[1] == default:
+            return cached[2]
+        vec = np.array([
+            affluence_mapping.get((self.stations[s], self.lines[l]), default)
+            for s, l in zip(self.station_id.tolist(), self.line_id.tolist())
+        ], dtype=np.float64)
+        self._aff_cache = (affluence_mapping, default, vec)
+        return vec
+
+    def affluence_list(self, affluence_mapping, default=0.2):
+        """
+        affluence_vector en liste Python, pour les boucles pures Python des moteurs.
+        La dernière liste est mémorisée (par identité du mapping ou du vecteur).
+        """
+        cached = self._aff_list_cache
+        if cached is not None and cached[0] is affluence_mapping and cached[1] == default:
+            return cached[2]
+        values = self.affluence_vector(affluence_mapping, default).tolist()
+        self._aff_list_cache = (affluence_mapping, default, values)
+        return values
+
+    def target_mask(self, node_ids):
+        mask = np.zeros(self.n_nodes, dtype=np.bool_)
+        mask[list(node_ids)] = True
+        return mask
+
+    def py_arrays(self):
+        """
+        Vues en listes Python des tableaux utilisés par la boucle pure Python
+        (indexer une liste est bien plus rapide qu'indexer un tableau NumPy élément par élément).
+        """
+        if self._py is None:
+            self._py = (
+                self.indptr.tolist(),
+                self.indices.tolist(),
+                self.station_id.tolist(),
+                self.line_id.tolist(),
+                self.main_line_id.tolist(),
+            )
+        return self._py
+
+    def station_bits(self):
+        """
+        Un bit par station (1 << station_id), pour les compteurs de passages du solveur.
+        """
+        if self._bits is None:
+            self._bits = [1 << s for s in range(len(self.stations))]
+        return self._bits
+
+    def hop_distances(self, source):
+        """
+        Nombre minimal d'arrêts (arêtes) depuis `source` (un id ou une liste d'ids) vers chaque noeud,
+        inf si inaccessible.
+        """
+        indptr, indices = self.py_arrays()[:2]
+        sources = [source] if isinstance(source, (int, np.integer)) else list(source)
+        dist = [-1] * self.n_nodes
+        for s in sources:
+            dist[s] = 0
+        queue = deque(sources)
+        while queue:
+            u = queue.popleft()
+            du = dist[u] + 1
+            for j in range(indptr[u], indptr[u + 1]):
+                v = indices[j]
+                if dist[v] < 0:
+                    dist[v] = du
+                    queue.append(v)
+        out = np.array(dist, dtype=np.float64)
+        out[out < 0] = np.inf
+        return out
+
+def compile_network(G):
+    """
+    Construit un `Network` à partir du graphe produit par graph_builder/build_graph.py.
+    """
+    try:
+        node_keys = sorted(G.nodes)
+    except TypeError:
+        # Identifiants non comparables : on garde l'ordre d'insertion
+        node_keys = list(G.nodes)
+    index = {k: i for i, k in enumerate(node_keys)}
+
+    indptr = np.zeros(len(node_keys) + 1, dtype=np.int32)
+    indices = []
+    distance_m = []
+    for i, k in enumerate(node_keys):
+        adj = G.adj[k]
+        for succ, edge in adj.items():
+            indices.append(index[succ])
+            d = edge.get('distance')
+            distance_m.append(np.nan if d is None else d)
+        indptr[i + 1] = len(indices)
+
+    data = [G.nodes[k] for k in node_keys]
+    station_id, stations = _intern([d['station_key'] for d in data])
+    line_id, lines = _intern([d['ligne'] for d in data])
+    main_line_table = {}
+    main_of_line = [main_line_table.setdefault(normalize_line(l), len(main_line_table)) for l in lines]
+    main_line_id = np.array(main_of_line, dtype=np.int32)[line_id]
+
+    return Network(
+        node_keys=node_keys,
+        indptr=indptr,
+        indices=np.array(indices, dtype=np.int32),
+        distance_m=np.array(distance_m, dtype=np.float64),
+        station_id=station_id,
+        line_id=line_id,
+        main_line_id=main_line_id,
+        stations=stations,
+        lines=lines,
+        main_lines=list(main_line_table),
+        names=[d.get('name') for d in data],
+        latitude=np.array([d.get('latitude', np.nan) for d in data], dtype=np.float64),
+        longitude=np.array([d.get('longitude', np.nan) for d in data], dtype=np.float64),
+    )
+
+# Instantané compilé de chaque graphe NetworkX déjà vu, gardé tant que le graphe existe
+_compiled = weakref.WeakKeyDictionary()
+
+def as_network(G):
+    """
+    Réseau compilé pour G : G lui-même si c'est déjà un `Network`, sinon l'instantané de G,
+    compilé au premier appel puis réutilisé (recompilé si G gagne ou perd des noeuds ou des
+    arêtes). Une modification en place des attributs de G demande compile_network(G).
+    """
+    if isinstance(G, Network):
+        return G
+    signature = (G.number_of_nodes(), G.number_of_edges())
+    cached = _compiled.get(G)
+    if cached is None or cached[0] != signature:
+        cached = _compiled[G] = (signature, compile_network(G))
+    return cached[1]
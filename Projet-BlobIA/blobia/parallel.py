@@ -0,0 +1,121 @@
+import os
+import time
+from collections import defaultdict
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from blobia.batch import batch_routes
+from blobia.network import Network, as_network
+
+_ARRAYS = ("indptr", "indices", "distance_m", "station_id", "line_id", "main_line_id", "latitude", "longitude")
+_TABLES = ("node_keys", "stations", "lines", "main_lines", "names")
+
+# État d'un processus de travail (renseigné par _init_worker)
+_worker = {}
+
+def _share(arrays):
+    """
+    Copie chaque tableau dans un bloc de mémoire partagée ; renvoie les blocs et leur description
+    (nom, dtype, forme) à transmettre aux processus de travail.
+    """
+    blocs = []
+    specs = {}
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocs.append(shm)
+        specs[name] = (shm.name, arr.dtype.str, arr.shape)
+    return blocs, specs
+
+def _attach(specs):
+    blocs = []
+    arrays = {}
+    for name, (shm_name, dtype, shape) in specs.items():
+        shm = SharedMemory(name=shm_name)
+        blocs.append(shm)
+        arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        arr.flags.writeable = False
+        arrays[name] = arr
+    return blocs, arrays
+
+def _init_worker(specs, tables, options):
+    # Les tableaux sont des vues sur la mémoire partagée : rien n'est copié par tâche
+    blocs, arrays = _attach(specs)
+    aff = arrays.pop("affluence")
+    _worker["blocs"] = blocs
+    _worker["net"] = Network(**arrays, **tables)
+    _worker["aff"] = aff
+    _worker["options"] = options
+
+def _run_chunk(task):
+    index, nom, stations_arrivee, stations_depart = task
+    t0 = time.perf_counter()
+    results = [trajets for _, _, trajets in batch_routes(
+        _worker["net"], _worker["aff"], stations_depart, {nom: stations_arrivee}, **_worker["options"])]
+    return index, os.getpid(), time.perf_counter() - t0, results
+
+def parallel_batch_routes(
+    G,
+    affluence_mapping,
+    stations_depart,
+    destinations,
+    curseur=1,
+    k=3,
+    moteur="ksp",
+    workers=None,
+    chunk=64,
+    stats=None
+):
+    """
+    Version multi-processus de batch_routes : mêmes arguments, mêmes (station_depart,
+    nom_destination, trajets) renvoyés dans le même ordre. affluence_mapping : mapping
+    {(station_key, ligne): score} ou vecteur par noeud (ex. tranche du tenseur d'affluence).
+
+    Le réseau compilé et le vecteur d'affluence sont placés une fois en mémoire partagée ; chaque
+    processus de travail s'y attache à son démarrage (tables de noms transmises une seule fois).
+    Une tâche est un paquet de `chunk` départs vers une destination : l'arbre partagé de
+    batch_routes (moteur="ksp") reste amorti sur le paquet.
+    stats (dict optionnel) reçoit "paires", "duree_s", "paires_par_s" et, par processus
+    ("processus" : pid -> dict), le nombre de paires, le temps de calcul et le débit.
+    """
+    net = as_network(G)
+    arrays = {name: getattr(net, name) for name in _ARRAYS}
+    arrays["affluence"] = net.affluence_vector(affluence_mapping)
+    tables = {name: list(getattr(net, name)) for name in _TABLES}
+    options = {"curseur": curseur, "k": k, "moteur": moteur}
+
+    stations_depart = list(stations_depart)
+    tasks = []
+    for nom, stations_arrivee in destinations.items():
+        for i in range(0, len(stations_depart), chunk):
+            tasks.append((len(tasks), nom, list(stations_arrivee), stations_depart[i:i + chunk]))
+
+    t0 = time.perf_counter()
+    par_processus = defaultdict(lambda: {"paires": 0, "duree_s": 0.0})
+    blocs, specs = _share(arrays)
+    try:
+        with get_context().Pool(workers or os.cpu_count(), initializer=_init_worker,
+                                initargs=(specs, tables, options)) as pool:
+            # imap conserve l'ordre des tâches : les résultats sortent dans l'ordre de batch_routes
+            for index, pid, duree, results in pool.imap(_run_chunk, tasks):
+                _, nom, _, departs = tasks[index]
+                par_processus[pid]["paires"] += len(results)
+                par_processus[pid]["duree_s"] += duree
+                for station, trajets in zip(departs, results):
+                    yield station, nom, trajets
+    finally:
+        for shm in blocs:
+            shm.close()
+            shm.unlink()
+
+    if stats is not None:
+        duree = time.perf_counter() - t0
+        stats["paires"] = sum(p["paires"] for p in par_processus.values())
+        stats["duree_s"] = duree
+        stats["paires_par_s"] = stats["paires"] / duree if duree else 0.0
+        for p in par_processus.values():
+            p["paires_par_s"] = p["paires"] / p["duree_s"] if p["duree_s"] else 0.0
+        stats["processus"] = dict(par_processus)
@@ -0,0 +1,240 @@
+from blobia.blob_solver import TOP_ROUTES, ponderations, route_result
+from blobia.network import Network, as_network
+
+MARGE_ARRETS = 20  # arrêts tolérés au-delà du trajet le plus court en nombre d'arrêts
+CURSEURS = range(1, 11)
+INF = float('inf')
+
+class _Etiquette:
+    """
+    Etiquette multi-critère : nombre d'arrêts, affluence cumulée, nombre de changements de ligne,
+    stations déjà traversées (masque) et id de la suite de stations (internée : deux étiquettes
+    ont le même id si et seulement si elles traversent les mêmes stations dans le même ordre).
+    """
+    __slots__ = ("parent", "node", "length", "aff_sum", "changes", "visited", "seq")
+
+    def __init__(self, parent, node, length, aff_sum, changes, visited, seq):
+        self.parent = parent
+        self.node = node
+        self.length = length
+        self.aff_sum = aff_sum
+        self.changes = changes
+        self.visited = visited
+        self.seq = seq
+
+    def path(self):
+        path = []
+        label = self
+        while label is not None:
+            path.append(label.node)
+            label = label.parent
+        path.reverse()
+        return path
+
+def pareto_routes(
+    G,
+    affluence_mapping,
+    nodes_depart,
+    nodes_arrivee,
+    k=TOP_ROUTES,
+    marge_arrets=MARGE_ARRETS,
+    stats=None
+):
+    """
+    Trajets utiles à au moins un curseur, selon (nombre d'arrêts, affluence moyenne, changements
+    de ligne), calculés en une seule recherche ; `routes_for_curseur` y choisit ensuite les
+    meilleurs trajets d'un curseur sans nouvelle recherche.
+
+    Recherche par tours (un arrêt de plus à chaque tour, à la McRAPTOR) avec un sac d'étiquettes
+    par noeud et par nombre d'arrêts. L'affluence moyenne n'est pas additive mais, à nombre
+    d'arrêts égal, comparer les affluences cumulées suffit : une étiquette n'est écartée que si
+    k étiquettes de suites de stations différentes (ou une de même suite) font au moins aussi bien
+    en affluence cumulée et en changements. Cette dominance ignore les stations déjà traversées
+    et la correspondance sur place, qui restreignent les prolongements : une dominante peut ne pas
+    pouvoir suivre le prolongement de l'étiquette écartée. Le front est donc heuristique : les k
+    meilleurs trajets distincts d'un curseur peuvent en manquer (aucun écart mesuré sur 400 couples
+    requête/curseur, alors que la dominance complète rend la recherche environ 7 fois plus lente).
+    S'y ajoute un élagage par borne : une étiquette qui, pour chacun des 10 curseurs, ne peut plus
+    battre le k-ième trajet déjà trouvé n'est pas prolongée.
+    Une station n'est traversée qu'une fois (hors correspondance sur place) et la longueur est
+    bornée par le plus court trajet en arrêts + marge_arrets.
+    """
+    if isinstance(G, Network):
+        net = G
+    else:
+        net = as_network(G)
+        nodes_depart = [net.index[n] for n in nodes_depart]
+        nodes_arrivee = [net.index[n] for n in nodes_arrivee if n in net.index]
+
+    aff = net.affluence_list(affluence_mapping)
+    indptr, indices, station_of, line_of, main_of = net.py_arrays()
+    station_bits = net.station_bits()
+
+    is_target = [False] * net.n_nodes
+    for a in nodes_arrivee:
+        is_target[a] = True
+    # Nombre minimal d'arrêts restant jusqu'à une arrivée (BFS multi-source, graphe non orienté)
+    restant = net.hop_distances(nodes_arrivee).tolist() if nodes_arrivee else [INF] * net.n_nodes
+    plus_court = min([restant[d] for d in nodes_depart], default=INF)
+    if plus_court == INF:
+        return []
+    max_arrets = plus_court + 1 + marge_arrets
+
+    aff_min = min(aff)
+    poids = [ponderations(c) for c in CURSEURS]
+    meilleurs = [{} for _ in CURSEURS]  # par curseur : suite de stations -> meilleur score final
+    seuils = [INF for _ in CURSEURS]    # par curseur : score du k-ième trajet distinct trouvé
+
+    def kept(bag, candidate):
+        # A nombre d'arrêts égal, la dominance porte sur (affluence cumulée, changements), sans
+        # comparer les stations traversées ni la correspondance sur place (voir la docstring)
+        dominateurs = set()
+        for other in bag:
+            if other.aff_sum <= candidate.aff_sum and other.changes <= candidate.changes:
+                if other.seq == candidate.seq:
+                    return False
+                dominateurs.add(other.seq)
+                if len(dominateurs) >= k:
+                    return False
+        return True
+
+    def record_final(label):
+        for i, (alpha, beta, gamma) in enumerate(poids):
+            score = alpha * label.length + beta * label.aff_sum / label.length + gamma * label.changes
+            scores = meilleurs[i]
+            if score < scores.get(label.seq, INF):
+                scores[label.seq] = score
+                if len(scores) >= k:
+                    seuils[i] = sorted(scores.values())[k - 1]
+
+    def hopeless(label, h):
+        """
+        Vrai si, pour chaque curseur, aucun prolongement ne peut battre le k-ième trajet trouvé.
+        Minorant : au moins h arrêts de plus, tous à l'affluence minimale, aucun changement de plus ;
+        alpha * L + beta * (S + l * aff_min) / L est minimal en L = sqrt(beta * (S - aff_min * L0) / alpha).
+        """
+        reste = label.aff_sum - aff_min * label.length
+        for i, (alpha, beta, gamma) in enumerate(poids):
+            if seuils[i] == INF:
+                return False
+            longueur = (beta * reste / alpha) ** 0.5 if reste > 0 else 0.0
+            longueur = min(max(longueur, label.length + h), max_arrets)
+            borne = alpha * longueur + beta * (aff_min + reste / longueur) + gamma * label.changes
+            if borne <= seuils[i]:
+                return False
+        return True
+
+    # Suites de stations internées : (id de la suite parente, station ajoutée) -> id
+    suites = {}
+
+    def seq_id(parent_seq, station):
+        return suites.setdefault((parent_seq, station), len(suites))
+
+    bags = [{} for _ in range(net.n_nodes)]  # par noeud : nombre d'arrêts -> étiquettes conservées
+    tour = []
+    for d in nodes_depart:
+        s = station_of[d]
+        label = _Etiquette(None, d, 1, aff[d], 0, station_bits[s], seq_id(-1, s))
+        bag = bags[d].setdefault(1, [])
+        if kept(bag, label):
+            bag.append(label)
+            tour.append(label)
+            if is_target[d]:
+                record_final(label)
+
+    nb_etiquettes = len(tour)
+    nb_tours = 0
+    nb_bornes = 0
+    while tour:
+        nb_tours += 1
+        nouveaux = {}
+        for label in tour:
+            node = label.node
+            if is_target[node]:
+                continue
+            if hopeless(label, restant[node]):
+                nb_bornes += 1
+                continue
+            ligne = line_of[node]
+            station = station_of[node]
+            sur_place = label.parent is not None and station_of[label.parent.node] == station
+            for j in range(indptr[node], indptr[node + 1]):
+                succ = indices[j]
+                succ_station = station_of[succ]
+                if label.length + restant[succ] >= max_arrets:
+                    continue
+                if succ_station == station:
+                    # Correspondance sur place : une seule d'affilée, jamais entre branches d'une même ligne
+                    if sur_place or main_of[succ] == main_of[node]:
+                        continue
+                    visited = label.visited
+                    seq = label.seq
+                elif label.visited & station_bits[succ_station]:
+                    continue
+                else:
+                    visited = label.visited | station_bits[succ_station]
+                    seq = seq_id(label.seq, succ_station)
+                changes = label.changes + (line_of[succ] != ligne)
+                nouveaux.setdefault(succ, []).append(_Etiquette(
+                    label, succ, label.length + 1, label.aff_sum + aff[succ], changes, visited, seq))
+
+        tour = []
+        for succ, candidats in nouveaux.items():
+            bag = bags[succ].setdefault(candidats[0].length, [])
+            # Un dominant passe toujours avant les étiquettes qu'il domine
+            candidats.sort(key=lambda e: (e.aff_sum, e.changes))
+            for label in candidats:
+                if kept(bag, label):
+                    bag.append(label)
+                    tour.append(label)
+                    if is_target[succ]:
+                        record_final(label)
+        nb_etiquettes += len(tour)
+
+    # Front restreint aux trajets parmi les k meilleurs d'au moins un curseur
+    utiles = set()
+    for i in range(len(CURSEURS)):
+        utiles.update(sorted(meilleurs[i], key=meilleurs[i].get)[:k])
+    front = []
+    for a in nodes_arrivee:
+        for bag in bags[a].values():
+            for label in bag:
+                if label.seq not in utiles:
+                    continue
+                path = label.path()
+                route = route_result(net, None, path, [aff[n] for n in path])
+                route["criteres"] = (label.length, label.aff_sum, label.changes)
+                front.append(route)
+
+    if stats is not None:
+        stats["tours"] = nb_tours
+        stats["etiquettes"] = nb_etiquettes
+        stats["elagages_borne"] = nb_bornes
+        stats["front"] = len(front)
+    return front
+
+def score_pareto(criteres, curseur):
+    """
+    Score d'un trajet du front pour un curseur : alpha * arrêts + beta * affluence moyenne
+    + gamma * changements de ligne.
+    """
+    alpha, beta, gamma = ponderations(curseur)
+    nb_arrets, aff_sum, changes = criteres
+    return alpha * nb_arrets + beta * aff_sum / nb_arrets + gamma * changes
+
+def routes_for_curseur(front, curseur, k=TOP_ROUTES):
+    """
+    Les k meilleurs trajets distincts (en suite de stations) du front pour un curseur, sans recherche.
+    """
+    results = []
+    vus = set()
+    for route in sorted(front, key=lambda r: score_pareto(r["criteres"], curseur)):
+        seq = tuple([station for i, (station, _) in enumerate(route["path"])
+                     if i == 0 or route["path"][i - 1][0] != station])
+        if seq in vus:
+            continue
+        vus.add(seq)
+        results.append(dict(route, score=score_pareto(route["criteres"], curseur)))
+        if len(results) == k:
+            break
+    return results
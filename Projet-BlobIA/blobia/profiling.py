@@ -0,0 +1,67 @@
+import threading
+
+# Fonctions appelées avec (nom_requete, stats) après chaque recherche de blobia/route.py
+_hooks = []
+
+def add_stats_hook(hook):
+    """
+    Enregistre hook(nom_requete, stats), appelé après chaque recherche de find_best_route /
+    find_route_front. Tant qu'aucun hook n'est enregistré (et sans dict stats fourni par
+    l'appelant), les recherches ne collectent rien.
+    """
+    if hook not in _hooks:
+        _hooks.append(hook)
+    return hook
+
+def remove_stats_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+def stats_hooks_enabled():
+    return bool(_hooks)
+
+def publish_stats(nom, stats):
+    for hook in list(_hooks):
+        hook(nom, stats)
+
+def format_stats(nom, stats):
+    """
+    Résumé d'une ligne d'un profil de requête (pour les logs de la CLI).
+    """
+    durees = stats.get("durees", {})
+    compteurs = " ".join(f"{k}={v}" for k, v in stats.items() if k != "durees")
+    phases = " ".join(f"{k}={v * 1000:.1f}ms" for k, v in durees.items())
+    return f"[{nom}] {compteurs} | {phases}"
+
+class StatsAggregator:
+    """
+    Hook qui cumule les profils : nombre de requêtes, et pour chaque compteur ou durée
+    numérique la somme et le maximum. Garde aussi le dernier profil reçu.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requetes = 0
+        self.totaux = {}
+        self.maxima = {}
+        self.dernier = None
+
+    def __call__(self, nom, stats):
+        valeurs = {k: v for k, v in stats.items() if k != "durees"}
+        valeurs.update({f"duree_{k}_s": v for k, v in stats.get("durees", {}).items()})
+        with self._lock:
+            self.requetes += 1
+            self.dernier = (nom, dict(stats))
+            for k, v in valeurs.items():
+                if isinstance(v, bool) or not isinstance(v, (int, float)):
+                    continue
+                self.totaux[k] = self.totaux.get(k, 0) + v
+                self.maxima[k] = max(self.maxima.get(k, v), v)
+
+    def summary(self):
+        with self._lock:
+            n = self.requetes
+            return {
+                k: {"moyenne": total / n, "max": self.maxima[k], "total": total}
+                for k, total in self.totaux.items()
+            }
@@ -1,35 +1,139 @@
+import time
+
 from blobia.blob_solver import blob_path_solver
+from blobia.hierarchy import ch_route
+from blobia.ksp import k_shortest_routes
+from blobia.network import Network
+from blobia.pareto import pareto_routes, routes_for_curseur
+from blobia.profiling import publish_stats, stats_hooks_enabled
+
+def resolve_nodes(G, station_depart, list_stations_arrivee):
+    """
+    Noeuds du graphe pour la station de départ et les stations d'arrivée.
+    """
+    # G : graphe NetworkX, ou Network compilé (résolution des stations par son index)
+    if isinstance(G, Network):
+        stations_nodes = G.nodes_of_station
+    else:
+        # Un seul passage sur les noeuds, puis une recherche par station
+        index = {}
+        for n, d in G.nodes(data=True):
+            index.setdefault(d['station_key'], []).append(n)
+
+        def stations_nodes(s):
+            return index.get(s, [])
 
-def find_best_route(
-    G,
-    affluence_mapping,
-    station_depart,
-    list_stations_arrivee,
-    curseur=1,
-    rayon_m=500,
-    verbose=False
-):
     # 1. Noeuds départ
-    nodes_depart = [n for n, d in G.nodes(data=True) if d['station_key'] == station_depart]
+    nodes_depart = stations_nodes(station_depart)
     if not nodes_depart:
         raise ValueError(f"Aucune station de départ trouvée pour '{station_depart}' dans le graphe !")
 
     # 2. Arrivée
     nodes_arrivee = []
     for s in list_stations_arrivee:
-        nodes_arrivee.extend([n for n, d in G.nodes(data=True) if d['station_key'] == s])
+        nodes_arrivee.extend(stations_nodes(s))
     if not nodes_arrivee:
         raise ValueError(f"Aucune station d'arrivée trouvée pour {list_stations_arrivee} !")
+    return nodes_depart, nodes_arrivee
+
+def find_route_front(
+    G,
+    affluence_mapping,
+    station_depart,
+    list_stations_arrivee,
+    stats=None
+):
+    """
+    Trajets candidats pour les 10 curseurs en une seule recherche (blobia/pareto.py) ;
+    routes_for_curseur(front, curseur) donne ensuite les trajets d'un curseur sans recalcul.
+    stats : voir find_best_route.
+    """
+    if stats is None and stats_hooks_enabled():
+        stats = {}
+    t0 = time.perf_counter() if stats is not None else None
+    nodes_depart, nodes_arrivee = resolve_nodes(G, station_depart, list_stations_arrivee)
+    if stats is not None:
+        t1 = time.perf_counter()
+    front = pareto_routes(G, affluence_mapping, nodes_depart, nodes_arrivee, stats=stats)
+    if stats is not None:
+        stats.setdefault("durees", {}).update(resolution=t1 - t0, recherche=time.perf_counter() - t1)
+        publish_stats("find_route_front", stats)
+    return front
+
+def find_best_route(
+    G,
+    affluence_mapping,
+    station_depart,
+    list_stations_arrivee,
+    curseur=1,
+    rayon_m=500,
+    verbose=False,
+    stats=None,
+    moteur="blob",
+    k=3,
+    backend="python",
+    max_front=None,
+    affluence_horaire=None,
+    depart=None
+):
+    """
+    moteur="blob" : recherche best-first historique (top 3 distincts parmi les trajets collectés) ;
+    backend="numba" l'exécute dans le noyau compilé (blobia/kernel.py), mêmes résultats ;
+    max_front borne le front (mode faisceau, trajets alors marqués "exact": False) ;
+    affluence_horaire + depart=(jour, heure) : affluence lue à l'heure estimée de passage
+    à chaque station (mode horaire de blob_path_solver).
+    moteur="ksp" : k plus courts trajets distincts en stations (blobia/ksp.py), coût additif.
+    moteur="pareto" : trajets du curseur choisis dans le front multi-critère (voir find_route_front).
+    moteur="ch" : meilleur trajet du mode rapide sur la hiérarchie de contraction attachée au réseau
+    (blobia/hierarchy.py, G compilé), sans tenir compte du curseur ; un seul trajet.
+    stats (dict optionnel) reçoit les compteurs du moteur et les durées par phase ("durees",
+    dont "resolution" des stations) ; le profil est ensuite transmis aux hooks de
+    blobia/profiling.py. Sans stats ni hook, aucune mesure n'est faite.
+    """
+    # Profil de la requête : seulement si l'appelant le demande ou si un hook l'attend
+    if stats is None and stats_hooks_enabled():
+        stats = {}
+    t0 = time.perf_counter() if stats is not None else None
+    nodes_depart, nodes_arrivee = resolve_nodes(G, station_depart, list_stations_arrivee)
+    if stats is not None:
+        t1 = time.perf_counter()
+        stats.setdefault("durees", {})["resolution"] = t1 - t0
+
+    if moteur == "ksp":
+        results = k_shortest_routes(
+            G,
+            affluence_mapping,
+            nodes_depart,
+            nodes_arrivee,
+            curseur=curseur,
+            k=k,
+            stats=stats
+        )
+    elif moteur == "ch":
+        results = ch_route(G, affluence_mapping, nodes_depart, nodes_arrivee, stats=stats)
+    elif moteur == "pareto":
+        front = pareto_routes(G, affluence_mapping, nodes_depart, nodes_arrivee, k=k, stats=stats)
+        results = routes_for_curseur(front, curseur, k=k)
+    else:
+        # 3. Appel blob_solver (on récupère plusieurs routes, déjà filtrées)
+        results = blob_path_solver(
+            G,
+            affluence_mapping,
+            nodes_depart,
+            nodes_arrivee,
+            curseur=curseur,
+            verbose=verbose,
+            max_visites_station=2,
+            topk=8,
+            stats=stats,
+            backend=backend,
+            max_front=max_front,
+            affluence_horaire=affluence_horaire,
+            depart=depart
+        )
 
-    # 3. Appel blob_solver (on récupère plusieurs routes, déjà filtrées)
-    results = blob_path_solver(
-        G,
-        affluence_mapping,
-        nodes_depart,
-        nodes_arrivee,
-        curseur=curseur,
-        verbose=verbose,
-        max_visites_station=2,
-        topk=8
-    )
+    if stats is not None:
+        # blob_path_solver détaille ses phases ; pour les autres moteurs, la recherche en bloc
+        stats["durees"].setdefault("recherche", time.perf_counter() - t1)
+        publish_stats("find_best_route", stats)
     return results
@@ -0,0 +1,143 @@
+import os
+import weakref
+
+import pandas as pd
+
+from blobia.mapping import normalize_name
+from utils import correspondances_physiques_groupes
+
+def trigrams(norm):
+    """
+    Trigrammes d'un nom normalisé, mot par mot (deux espaces avant, un après, comme pg_trgm) :
+    une faute dans un mot n'enlève que les trigrammes de ce mot.
+    """
+    grams = set()
+    for mot in norm.split():
+        mot = f"  {mot} "
+        grams.update(mot[i:i + 3] for i in range(len(mot) - 2))
+    return grams
+
+class NameIndex:
+    """
+    Index trigrammes des noms de stations et de monuments (normalisés par normalize_name, avec
+    les synonymes de utils.correspondances_physiques_groupes), pour la recherche approchée et
+    l'autocomplétion. Chaque nom indexé renvoie vers une entrée (type, clé) : la clé de station
+    du réseau, ou le nom du monument dans monuments.csv.
+    """
+
+    def __init__(self):
+        self.noms = []      # nom normalisé indexé
+        self.labels = []    # nom affiché
+        self.entrees = []   # (type, clé)
+        self.tailles = []   # nombre de trigrammes du nom
+        self.postings = {}  # trigramme -> indices des noms qui le contiennent
+        self.exacts = {}    # (nom normalisé, type) -> clé
+
+    def __len__(self):
+        return len(self.noms)
+
+    def add(self, nom, label, kind, key):
+        norm = normalize_name(nom)
+        if not norm:
+            return
+        i = len(self.noms)
+        grams = trigrams(norm)
+        self.noms.append(norm)
+        self.labels.append(label)
+        self.entrees.append((kind, key))
+        self.tailles.append(len(grams))
+        self.exacts.setdefault((norm, kind), key)
+        for g in grams:
+            self.postings.setdefault(g, []).append(i)
+
+    def search(self, query, limit=10, kind=None, min_score=0.3):
+        """
+        Meilleures entrées pour `query` : [(label, type, clé, score)], score décroissant.
+        Score : similarité de Jaccard des trigrammes, + 1 si le nom commence par la saisie,
+        + 0.5 si l'un de ses mots commence par la saisie (autocomplétion). Une entrée trouvée
+        par plusieurs noms (synonymes) n'apparaît qu'une fois, avec son meilleur score.
+        """
+        q = normalize_name(query)
+        if not q:
+            return []
+        grams = trigrams(q)
+        communs = {}
+        for g in grams:
+            for i in self.postings.get(g, ()):
+                communs[i] = communs.get(i, 0) + 1
+
+        meilleurs = {}
+        n = len(grams)
+        for i, c in communs.items():
+            if kind is not None and self.entrees[i][0] != kind:
+                continue
+            score = c / (n + self.tailles[i] - c)
+            nom = self.noms[i]
+            if nom.startswith(q):
+                score += 1.0
+            elif f" {q}" in f" {nom}":
+                score += 0.5
+            elif score < min_score:
+                continue
+            entree = self.entrees[i]
+            if entree not in meilleurs or score > meilleurs[entree][0]:
+                meilleurs[entree] = (score, i)
+
+        # À score égal : le nom le plus court, puis l'ordre alphabétique
+        classes = sorted(meilleurs.items(), key=lambda e: (-e[1][0], len(self.noms[e[1][1]]), self.noms[e[1][1]]))
+        return [(self.labels[i], kind_, key, score) for (kind_, key), (score, i) in classes[:limit]]
+
+    def exact(self, query, kind):
+        """
+        Clé de l'entrée dont un nom est exactement `query` une fois normalisé (None sinon).
+        """
+        return self.exacts.get((normalize_name(query), kind))
+
+    def best(self, query, kind=None):
+        """
+        Clé de la meilleure entrée pour `query` (None si aucune).
+        """
+        resultats = self.search(query, limit=1, kind=kind)
+        return resultats[0][2] if resultats else None
+
+def build_name_index(net, monuments_csv="data/monuments.csv", synonym_groups=correspondances_physiques_groupes):
+    """
+    Index des stations du réseau compilé (nom affiché, clé, synonymes) et des monuments.
+    """
+    index = NameIndex()
+    for s, station in enumerate(net.stations):
+        label = net.names[net.station_nodes[s][0]] if net.station_nodes[s] else station
+        index.add(label, label, "station", station)
+        if normalize_name(station) != normalize_name(label):
+            index.add(station, label, "station", station)
+
+    # Synonymes : chaque alias renvoie vers la station maîtresse (premier nom du groupe)
+    for groupe in synonym_groups:
+        if not groupe:
+            continue
+        master = normalize_name(groupe[0])
+        nodes = net.nodes_of_station(master)
+        if not nodes:
+            continue
+        station = net.stations[net.station_id[nodes[0]]]
+        for alias in groupe[1:]:
+            index.add(alias, alias, "station", station)
+
+    for nom in pd.read_csv(monuments_csv, encoding='cp1252')["Monument"].drop_duplicates():
+        nom = str(nom).strip()
+        index.add(nom, nom, "monument", nom)
+    return index
+
+_name_indexes = weakref.WeakKeyDictionary()
+
+def load_name_index(net, monuments_csv="data/monuments.csv"):
+    """
+    Index des noms construit une fois par réseau et par fichier de monuments (taille, date) :
+    un seul index par réseau, libéré avec lui, reconstruit si le fichier change.
+    """
+    st = os.stat(monuments_csv)
+    signature = (os.path.abspath(monuments_csv), st.st_size, st.st_mtime_ns)
+    cached = _name_indexes.get(net)
+    if cached is None or cached[0] != signature:
+        cached = _name_indexes[net] = (signature, build_name_index(net, monuments_csv))
+    return cached[1]
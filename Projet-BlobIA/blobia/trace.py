@@ -0,0 +1,47 @@
+from collections import deque, namedtuple
+from itertools import islice
+
+# Un dépilement de la recherche : id séquentiel, id de l'événement parent (-1 pour un départ),
+# noeud, score et arrivée ou non
+TraceEvent = namedtuple("TraceEvent", ["id", "parent", "node", "score", "final"])
+
+class ExplorationTrace:
+    """
+    Callback de trace pour blob_path_solver(trace=...) et visu_routes.visu_blob_solver.
+
+    Chaque événement ne coûte que son parent et son noeud (deux références), ce qui suffit à
+    reconstruire n'importe quel chemin par path(id) ; seuls les événements gardés
+    (un sur sample_every, les arrivées toujours, au plus max_events derniers) sont conservés
+    en entier pour l'affichage.
+    """
+
+    def __init__(self, max_events=None, sample_every=1):
+        self.sample_every = max(1, sample_every)
+        self.parents = []
+        self.nodes = []
+        self.events = deque(maxlen=max_events)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __call__(self, event):
+        self.parents.append(event.parent)
+        self.nodes.append(event.node)
+        if event.final or event.id % self.sample_every == 0:
+            self.events.append(event)
+
+    def path(self, event_id):
+        path = []
+        while event_id != -1:
+            path.append(self.nodes[event_id])
+            event_id = self.parents[event_id]
+        path.reverse()
+        return path
+
+    def paths(self, limit=None):
+        """
+        Générateur de (événement, chemin) sur les événements gardés (au plus limit) :
+        seuls les chemins demandés sont reconstruits.
+        """
+        for event in islice(self.events, limit):
+            yield event, self.path(event.id)
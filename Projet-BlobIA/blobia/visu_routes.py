@@ -8,6 +8,9 @@ import matplotlib.pyplot as plt
 from geopy.distance import geodesic
 import pickle
 
+from blobia.blob_solver import _Label
+from blobia.trace import ExplorationTrace, TraceEvent
+
 def normalize_name(name):
     return name.lower().replace('-', ' ').replace('’', "'").replace("œ", "oe").replace('é', 'e').replace('ê', 'e').replace('è', 'e').replace('à', 'a').replace('â', 'a').replace('î', 'i').replace('ï', 'i').replace('ç', 'c')
 
@@ -29,6 +32,24 @@ def find_stations_near_monument(monument, rayon_m=900, monuments_csv=None, stati
             near.append(row['gare_key'])
     return near
 
+class _VisuLabel(_Label):
+    """
+    Etiquette de blob_solver (pointeur parent, cumuls) avec le nombre de changements de ligne.
+    """
+    __slots__ = ("nb_chg",)
+
+    def __init__(self, parent, node, ligne, aff, nb_chg):
+        super().__init__(parent, node, ligne, aff)
+        self.nb_chg = nb_chg
+
+    def on_path(self, node):
+        label = self
+        while label is not None:
+            if label.node == node:
+                return True
+            label = label.parent
+        return False
+
 def find_depart_nodes(G, station_str):
     norm = normalize_name(station_str)
     nodes = [n for n in G.nodes if norm in normalize_name(G.nodes[n]['name'])]
@@ -36,7 +57,14 @@ def find_depart_nodes(G, station_str):
         print(f"[WARN] Station '{station_str}' non trouvée dans le graphe.")
     return nodes
 
-def visu_blob_solver(G, affluence_map, nodes_depart, nodes_arrivee, curseur=5, max_iter=50000, topk=10):
+def visu_blob_solver(G, affluence_map, nodes_depart, nodes_arrivee, curseur=5, max_iter=50000, topk=10,
+                     max_events=None, sample_every=1):
+    """
+    Renvoie (trajets aboutis triés, trace) : la trace (blobia/trace.ExplorationTrace) garde un
+    événement compact par dépilement (échantillonné / borné par sample_every et max_events) ;
+    plot_routes_on_graph ne reconstruit que les chemins qu'il dessine. Comme dans blob_solver,
+    chaque étiquette ne garde que son parent : les chemins aboutis sont reconstruits à la fin.
+    """
     # Pondérations : à adapter à ta logique (peux raffiner si besoin)
     alpha = 0.4 + 0.08 * curseur  # distance (nombre d'arrêts)
     beta = 0.1 + 0.04 * curseur   # affluence
@@ -44,68 +72,49 @@ def visu_blob_solver(G, affluence_map, nodes_depart, nodes_arrivee, curseur=5, m
 
     print(f"[DEBUG] VISU Params: alpha={alpha:.2f}, beta={beta:.2f}, gamma={gamma:.2f}")
 
+    trace = ExplorationTrace(max_events=max_events, sample_every=sample_every)
     front = []
     heapq.heapify(front)
     for dep in nodes_depart:
         data = G.nodes[dep]
         score_init = 0.0
         aff_init = affluence_map.get((data['station_key'], data['ligne']), 0.2)
-        heapq.heappush(front, (score_init, dep, [dep], [aff_init], [data['ligne']], set(), 0))
+        # Départage à score et noeud égaux par _Label.__lt__ : même ordre que les listes de chemins
+        heapq.heappush(front, (score_init, dep, _VisuLabel(None, dep, data['ligne'], aff_init, 0)))
 
     finals = []
-    explored_paths = []  # Toutes les routes explorées
 
     for it in range(max_iter):
         if not front:
             break
-        score, node, path, affluences, lignes, visited_set, nb_chg = heapq.heappop(front)
-        explored_paths.append((score, node, path.copy(), affluences.copy(), lignes.copy(), nb_chg, node in nodes_arrivee))
+        score, node, label = heapq.heappop(front)
+        label.trace_id = it
+        parent_id = label.parent.trace_id if label.parent is not None else -1
+        trace(TraceEvent(it, parent_id, node, score, node in nodes_arrivee))
         if node in nodes_arrivee:
-            finals.append((score, node, path.copy(), affluences.copy(), lignes.copy(), nb_chg))
+            finals.append((score, label))
             if len(finals) >= topk:
                 break
-        visited = visited_set.copy()
-        visited.add(node)
         for succ in G.neighbors(node):
-            if succ in path:
+            if label.on_path(succ):
                 continue
             succ_line = G.nodes[succ]['ligne']
             succ_aff = affluence_map.get((G.nodes[succ]['station_key'], succ_line), 0.2)
-            chg = nb_chg + (succ_line != lignes[-1])
-            aff_moy = (sum(affluences) + succ_aff) / (len(affluences) + 1)
-            new_score = alpha * (len(path) + 1) + beta * aff_moy + gamma * chg
-            heapq.heappush(front, (
-                new_score,
-                succ,
-                path + [succ],
-                affluences + [succ_aff],
-                lignes + [succ_line],
-                visited,
-                chg
-            ))
-
-    # Reformat all explored paths as dicts
-    explored_routes = []
-    for tup in explored_paths:
-        score, node, path, affluences, lignes, nb_chg, finished = tup
-        explored_routes.append({
-            "score": score,
-            "raw_path": path,
-            "raw_lignes": lignes,
-            "final": finished,
-            "nb_changements": nb_chg,
-        })
+            chg = label.nb_chg + (succ_line != label.ligne)
+            aff_moy = (label.aff_sum + succ_aff) / (label.length + 1)
+            new_score = alpha * (label.length + 1) + beta * aff_moy + gamma * chg
+            heapq.heappush(front, (new_score, succ, _VisuLabel(label, succ, succ_line, succ_aff, chg)))
 
     # finals = completed paths only
     finals_sorted = sorted([{
         "score": score,
-        "raw_path": path,
-        "raw_lignes": lignes,
+        "raw_path": label.path(),
+        "raw_lignes": label.lignes(),
         "final": True,
-        "nb_changements": nb_chg,
-    } for (score, node, path, affluences, lignes, nb_chg) in finals], key=lambda x: x["score"])
+        "nb_changements": label.nb_chg,
+    } for (score, label) in finals], key=lambda x: x["score"])
 
-    return finals_sorted, explored_routes
+    return finals_sorted, trace
 
 def plot_routes_on_graph(G, best_trajs, explored, max_explored=3000):
     # Use latitude/longitude for pos
@@ -126,10 +135,9 @@ def plot_routes_on_graph(G, best_trajs, explored, max_explored=3000):
     edgelist = [(u, v) for u, v in G.edges if u in pos and v in pos]
     nx.draw_networkx_edges(G, pos, edgelist=edgelist, alpha=0.05, edge_color='gray', width=0.5)
 
-    # Jaune = chemins explorés non aboutis
-    for r in explored[:max_explored]:
-        if not r["final"]:
-            path = r["raw_path"]
+    # Jaune = chemins explorés non aboutis (seuls ceux-ci sont reconstruits depuis la trace)
+    for event, path in explored.paths(limit=max_explored):
+        if not event.final:
             path = [n for n in path if n in pos]
             if len(path) > 1:
                 nx.draw_networkx_edges(G, pos, edgelist=[(path[i], path[i+1]) for i in range(len(path)-1)], width=1.5, edge_color="gold", alpha=0.14)
@@ -1,10 +1,17 @@
 import sys
 import os
+import argparse
+import pickle
+import time
+from itertools import combinations
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
 import pandas as pd
 import networkx as nx
-import pickle
-from geopy.distance import geodesic
-import matplotlib.pyplot as plt
+
+from blobia.geo import geodesic_m
+from blobia.graph_store import save_graph_store
 
 # -- Répertoires --
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -40,75 +47,89 @@ def join_coords_to_stations():
     stations.to_csv(os.path.join(DATA_DIR, "stations_lignes_coords.csv"), index=False)
     return stations
 
-def build_graph():
-    stations = join_coords_to_stations()
+def line_order(stations):
+    """
+    Index des stations branche par branche, dans l'ordre de la ligne (même tri que
+    groupby("ligne") + sort_values("ordre"), ex aequo des lignes en boucle compris).
+    """
+    return np.concatenate([group.sort_values("ordre").index.to_numpy() for _, group in stations.groupby("ligne")])
+
+def build_graph(plot=False, stations=None):
+    """
+    Construit et sauvegarde le graphe (pickle, format colonne, arêtes en CSV). `stations` : table
+    stations + coordonnées déjà jointe (étape coords de graph_pipeline.py), sinon jointure ici.
+    """
+    t0 = time.perf_counter()
+    if stations is None:
+        stations = join_coords_to_stations()
+    t_coords = time.perf_counter()
 
     G = nx.Graph()
+    node_ids = stations["station_key"] + "_" + stations["ligne"].astype(str)
 
     # -- Création des noeuds --
-    for _, row in stations.iterrows():
-        node_id = row['station_key'] + "_" + str(row['ligne'])
-        G.add_node(
-            node_id,
-            station_key=row['station_key'],
-            name=row['station'],
-            ligne=row['ligne'],
-            latitude=row['latitude'],
-            longitude=row['longitude']
-        )
+    colonnes = [stations[c].tolist() for c in ("station_key", "station", "ligne", "latitude", "longitude")]
+    G.add_nodes_from(
+        (node_id, {"station_key": key, "name": name, "ligne": ligne, "latitude": lat, "longitude": lon})
+        for node_id, key, name, ligne, lat, lon in zip(node_ids.tolist(), *colonnes)
+    )
 
     # -- Ajout des arêtes "adjacence" sur la même ligne --
-    for ligne, group in stations.groupby("ligne"):
-        group_sorted = group.sort_values("ordre")
-        previous = None
-        for _, row in group_sorted.iterrows():
-            node_id = row['station_key'] + "_" + str(row['ligne'])
-            if previous is not None:
-                prev_id = previous['station_key'] + "_" + str(previous['ligne'])
-                coord1 = (previous['latitude'], previous['longitude'])
-                coord2 = (row['latitude'], row['longitude'])
-                if pd.notnull(coord1[0]) and pd.notnull(coord1[1]) and pd.notnull(coord2[0]) and pd.notnull(coord2[1]):
-                    distance = geodesic(coord1, coord2).meters
-                else:
-                    distance = None
-                G.add_edge(
-                    prev_id, node_id,
-                    type="adjacence",
-                    ligne=ligne,
-                    distance=distance
-                )
-            previous = row
+    # Paires de stations consécutives de chaque branche, distances calculées en un seul passage
+    order = line_order(stations)
+    prev, cur = order[:-1], order[1:]
+    lignes = stations["ligne"].to_numpy()
+    meme_ligne = lignes[prev] == lignes[cur]
+    prev, cur = prev[meme_ligne], cur[meme_ligne]
+    lat = stations["latitude"].to_numpy(dtype=np.float64)
+    lon = stations["longitude"].to_numpy(dtype=np.float64)
+    distances = geodesic_m(lat[prev], lon[prev], lat[cur], lon[cur])
+    ids = node_ids.to_numpy()
+    G.add_edges_from(
+        (u, v, {"type": "adjacence", "ligne": ligne, "distance": None if np.isnan(d) else float(d)})
+        for u, v, ligne, d in zip(ids[prev].tolist(), ids[cur].tolist(), lignes[cur].tolist(), distances.tolist())
+    )
 
     # -- Ajout des arêtes de correspondance (synonymes) --
-    stations_by_key = stations.groupby('station_key')
-    for station_key, group in stations_by_key:
-        node_ids = [row['station_key'] + "_" + str(row['ligne']) for _, row in group.iterrows()]
-        for i, node_a in enumerate(node_ids):
-            for node_b in node_ids[i+1:]:
-                G.add_edge(node_a, node_b, type="correspondance", ligne=None, distance=0)
+    G.add_edges_from(
+        (node_a, node_b, {"type": "correspondance", "ligne": None, "distance": 0})
+        for group in node_ids.groupby(stations["station_key"]).agg(list)
+        for node_a, node_b in combinations(group, 2)
+    )
+    t_graph = time.perf_counter()
 
     print(f"Graphe créé avec {G.number_of_nodes()} noeuds et {G.number_of_edges()} arêtes.")
 
     # -- Export des arêtes pour debug --
-    edges = []
-    for u, v, data in G.edges(data=True):
-        edges.append({
-            "source": u,
-            "target": v,
-            "type": data.get('type', 'adjacence'),
-            "ligne": data.get('ligne', None),
-            "distance_m": data.get('distance', None)
-        })
-    edges_df = pd.DataFrame(edges)
+    edges_df = pd.DataFrame(
+        [(u, v, d.get("type", "adjacence"), d.get("ligne", None), d.get("distance", None)) for u, v, d in G.edges(data=True)],
+        columns=["source", "target", "type", "ligne", "distance_m"]
+    )
     edges_df.to_csv(os.path.join(DATA_DIR, "graph_edges.csv"), index=False)
     print("Arêtes sauvegardées dans graph_edges.csv")
 
     # -- Sauvegarde du graphe en pickle --
     with open(os.path.join(DATA_DIR, "graph_blobia.gpickle"), "wb") as f:
-        pickle.dump(G, f)    
+        pickle.dump(G, f)
     print("Graphe sauvegardé en pickle : graph_blobia.gpickle")
+    save_graph_store(G, os.path.join(DATA_DIR, "graph_blobia.graph"))
+    print("Graphe sauvegardé au format colonne : graph_blobia.graph")
+    t_fin = time.perf_counter()
+
+    print(f"Construction en {t_fin - t0:.3f} s (coordonnées {t_coords - t0:.3f} s, "
+          f"graphe {t_graph - t_coords:.3f} s, export {t_fin - t_graph:.3f} s)")
+
+    if plot:
+        plot_graph(G)
+    return G
+
+def plot_graph(G):
+    """
+    Visualisation rapide (bloquante) du graphe : seulement sur demande (--plot), pour que la
+    construction tourne sur une machine sans affichage.
+    """
+    import matplotlib.pyplot as plt
 
-    # -- Visualisation rapide --
     edges_with_distance = [
         (u, v) for u, v, d in G.edges(data=True)
         if G.nodes[u].get('latitude') is not None and G.nodes[u].get('longitude') is not None
@@ -128,5 +149,8 @@ def build_graph():
     plt.show()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construit le graphe Blob IA (graph_blobia.gpickle)")
+    parser.add_argument("--plot", action="store_true", help="affiche le graphe une fois construit")
+    args = parser.parse_args()
     build_nodes()
-    build_graph()
+    build_graph(plot=args.plot)
@@ -0,0 +1,92 @@
+import sys
+import os
+import json
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+
+from blobia.cache import file_fingerprint
+from blobia.graph_store import load_graph_store
+from blobia.mapping import load_spatial_index, normalize_name
+from blobia.monument_access import ACCESS_VERSION, RAYONS_M
+
+# -- Répertoires --
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+
+ACCESS_FILENAME = "monument_access.json"
+
+def station_rows(stations):
+    """
+    Lignes de chaque station (clé normalisée) : [(ligne, identifiant du noeud)], dans l'ordre du CSV.
+    """
+    rows = {}
+    for key, ligne in zip(stations["station_key"].astype(str), stations["ligne"].astype(str)):
+        rows.setdefault(normalize_name(key), []).append((ligne, f"{key}_{ligne}"))
+    return rows
+
+def monument_entry(proches, rows, net):
+    """
+    Accès d'un monument pour un rayon, à partir des stations proches [(station_key, distance_m)] :
+    - acces : [station_key, ligne, node_id, distance_m] pour chaque ligne de chaque station proche ;
+    - stations : la station la plus proche de chaque ligne (ordre de première apparition, comme main.py).
+    """
+    acces = []
+    par_ligne = {}
+    for station, distance in proches:
+        for ligne, node_id in rows.get(station, []):
+            if node_id not in net.index:
+                continue
+            acces.append([station, ligne, node_id, distance])
+            if ligne not in par_ligne or distance < par_ligne[ligne][1]:
+                par_ligne[ligne] = (station, distance)
+    return {
+        "proches": [[s, d] for s, d in proches],
+        "acces": acces,
+        "stations": [s for s, _ in par_ligne.values()],
+    }
+
+def build_monument_access(net, monuments_csv, stations_csv, lignes_csv, rayons=RAYONS_M):
+    """
+    Table monument -> accès pour chaque rayon de `rayons`, avec le même choix de stations que
+    find_stations_near_monument (stations dans le rayon, sinon la plus proche).
+    """
+    index = load_spatial_index(monuments_csv, stations_csv)
+    rows = station_rows(pd.read_csv(lignes_csv))
+    monuments = {}
+    for nom in pd.read_csv(monuments_csv, encoding='cp1252')["Monument"].drop_duplicates():
+        norm = normalize_name(nom)
+        if norm in monuments:
+            continue
+        lat, lon = index.monument_coords(nom)
+        plus_proche = index.nearest(lat, lon, k=1)
+        entree = {}
+        for rayon in rayons:
+            proches = index.within(lat, lon, rayon) or plus_proche
+            entree[str(rayon)] = monument_entry(proches, rows, net)
+        monuments[norm] = {"nom": nom, "latitude": lat, "longitude": lon, "rayons": entree}
+    return {
+        "version": ACCESS_VERSION,
+        "rayons": list(rayons),
+        "graph": net.fingerprint(),
+        "sources": {os.path.basename(p): file_fingerprint(p) for p in (monuments_csv, stations_csv, lignes_csv)},
+        "monuments": monuments,
+    }
+
+def save_monument_access():
+    net = load_graph_store(os.path.join(DATA_DIR, "graph_blobia.graph")).network()
+    t0 = time.perf_counter()
+    table = build_monument_access(
+        net,
+        os.path.join(DATA_DIR, "monuments.csv"),
+        os.path.join(DATA_DIR, "graph_nodes.csv"),
+        os.path.join(DATA_DIR, "Stations_IDF_aligned.csv"),
+    )
+    with open(os.path.join(DATA_DIR, ACCESS_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False)
+    print(f"Table d'accès : {len(table['monuments'])} monuments, rayons {table['rayons']} m "
+          f"en {time.perf_counter() - t0:.2f} s : {ACCESS_FILENAME}")
+
+if __name__ == "__main__":
+    save_monument_access()
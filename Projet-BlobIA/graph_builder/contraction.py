@@ -0,0 +1,155 @@
+import sys
+import os
+import heapq
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from blobia.blob_solver import ponderations
+from blobia.graph_store import load_graph_store
+from blobia.hierarchy import save_hierarchy
+
+# -- Répertoires --
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+
+CH_FILENAME = "graph_blobia_ch.npz"
+LIMITE_TEMOIN = 500  # noeuds visités au plus par recherche de témoin
+
+def fast_mode_weights(net, curseur=1):
+    """
+    Coût statique du mode rapide sur chaque arête (non orientée) : alpha par arrêt,
+    alpha + gamma pour une correspondance. L'affluence (beta = 0.01 au curseur 1) dépend du jour
+    et de l'heure : elle n'entre pas dans la hiérarchie. Les correspondances entre branches d'une
+    même ligne principale sont exclues, comme dans blob_path_solver.
+    """
+    alpha, _, gamma = ponderations(curseur)
+    indptr, indices, station_of, line_of, main_of = net.py_arrays()
+    adj = [{} for _ in range(net.n_nodes)]
+    for u in range(net.n_nodes):
+        for j in range(indptr[u], indptr[u + 1]):
+            v = indices[j]
+            if line_of[u] == line_of[v]:
+                w = alpha
+            elif station_of[u] == station_of[v] and main_of[u] == main_of[v]:
+                continue
+            else:
+                w = alpha + gamma
+            if w < adj[u].get(v, float('inf')):
+                adj[u][v] = w
+                adj[v][u] = w
+    return adj
+
+def _witness(adj, contracted, source, exclu, limite, cibles):
+    """
+    Dijkstra borné depuis source, sans passer par `exclu` ni par les noeuds déjà contractés.
+    """
+    dist = {source: 0.0}
+    front = [(0.0, source)]
+    restantes = set(cibles)
+    visites = 0
+    while front and restantes and visites < LIMITE_TEMOIN:
+        d, u = heapq.heappop(front)
+        if d > dist[u]:
+            continue
+        if d > limite:
+            break
+        restantes.discard(u)
+        visites += 1
+        for v, w in adj[u].items():
+            if v == exclu or contracted[v]:
+                continue
+            nd = d + w
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                heapq.heappush(front, (nd, v))
+    return dist
+
+def _shortcuts(adj, contracted, v):
+    # Raccourcis nécessaires si v est contracté maintenant : (u, w, poids)
+    voisins = [(u, wu) for u, wu in adj[v].items() if not contracted[u]]
+    out = []
+    for i, (u, wu) in enumerate(voisins):
+        cibles = {w: wu + ww for w, ww in voisins[i + 1:]}
+        if not cibles:
+            continue
+        dist = _witness(adj, contracted, u, v, max(cibles.values()), cibles)
+        for w, via in cibles.items():
+            if dist.get(w, float('inf')) > via:
+                out.append((u, w, via))
+    return out, len(voisins)
+
+def build_contraction_hierarchy(net, curseur=1):
+    """
+    Hiérarchie de contraction du coût mode rapide : ordre des noeuds par différence d'arêtes
+    (mise à jour paresseuse), raccourcis ajoutés seulement sans chemin témoin plus court.
+    Renvoie un dict (écrit par blobia.hierarchy.save_hierarchy) : rang de chaque noeud, graphe
+    montant en CSR et noeud du milieu de chaque raccourci (pour dérouler les chemins).
+    """
+    adj = fast_mode_weights(net, curseur)
+    n = net.n_nodes
+    contracted = [False] * n
+    voisins_contractes = [0] * n
+    rank = [0] * n
+    milieux = {}
+
+    def priorite(v):
+        raccourcis, degre = _shortcuts(adj, contracted, v)
+        return len(raccourcis) - degre + voisins_contractes[v]
+
+    tas = [(priorite(v), v) for v in range(n)]
+    heapq.heapify(tas)
+    niveau = 0
+    while tas:
+        _, v = heapq.heappop(tas)
+        if contracted[v]:
+            continue
+        p = priorite(v)
+        if tas and p > tas[0][0]:
+            heapq.heappush(tas, (p, v))
+            continue
+        raccourcis, _ = _shortcuts(adj, contracted, v)
+        for u, w, poids in raccourcis:
+            if poids < adj[u].get(w, float('inf')):
+                adj[u][w] = poids
+                adj[w][u] = poids
+                milieux[(u, w)] = v
+                milieux[(w, u)] = v
+        contracted[v] = True
+        rank[v] = niveau
+        niveau += 1
+        for u in adj[v]:
+            voisins_contractes[u] += 1
+
+    # Graphe montant : chaque arête (d'origine ou raccourci) vers le noeud de rang supérieur
+    up_indptr = np.zeros(n + 1, dtype=np.int32)
+    up_indices = []
+    up_weights = []
+    for u in range(n):
+        for v, w in sorted(adj[u].items()):
+            if rank[v] > rank[u]:
+                up_indices.append(v)
+                up_weights.append(w)
+        up_indptr[u + 1] = len(up_indices)
+
+    return {
+        "curseur": curseur,
+        "rank": np.array(rank, dtype=np.int32),
+        "up_indptr": up_indptr,
+        "up_indices": np.array(up_indices, dtype=np.int32),
+        "up_weights": np.array(up_weights, dtype=np.float64),
+        "milieux": milieux,
+    }
+
+def save_contraction_hierarchy():
+    net = load_graph_store(os.path.join(DATA_DIR, "graph_blobia.graph")).network()
+    t0 = time.perf_counter()
+    ch = build_contraction_hierarchy(net)
+    print(f"Hiérarchie de contraction : {len(ch['up_indices'])} arêtes montantes, "
+          f"{len(ch['milieux']) // 2} raccourcis en {time.perf_counter() - t0:.1f} s")
+    save_hierarchy(ch, os.path.join(DATA_DIR, CH_FILENAME), net)
+    print(f"Hiérarchie sauvegardée : {CH_FILENAME}")
+
+if __name__ == "__main__":
+    save_contraction_hierarchy()
@@ -1,8 +1,197 @@
-import subprocess
+import os
+import json
+import time
+import hashlib
+import argparse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
-def run():
-    subprocess.run(['python', 'graph_builder/normalize.py'], check=True)
-    subprocess.run(['python', 'graph_builder/build_graph.py'], check=True)
+from blobia.cache import file_fingerprint
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+STATE_PATH = os.path.join(DATA_DIR, ".pipeline_state.json")
+
+# Une étape : fichiers lus (données et code, chemins relatifs à la racine du projet), fichiers
+# écrits, fonction à appeler. Les dépendances entre étapes se déduisent des fichiers : une étape
+# attend celles qui écrivent ses entrées.
+Stage = namedtuple("Stage", ["name", "inputs", "outputs", "fn"])
+
+def _normalize():
+    from graph_builder.normalize import normalize_tables
+    normalize_tables()
+
+def _align():
+    from graph_builder.normalize import align_tables_with_synonyms
+    align_tables_with_synonyms()
+
+def _nodes():
+    from graph_builder.build_graph import build_nodes
+    build_nodes()
+
+def _coords():
+    from graph_builder.build_graph import join_coords_to_stations
+    join_coords_to_stations()
+
+def _graph():
+    import pandas as pd
+    from graph_builder.build_graph import build_graph
+    # round_trip : mêmes coordonnées (au bit près) que la jointure faite en mémoire
+    stations = pd.read_csv(os.path.join(DATA_DIR, "stations_lignes_coords.csv"), float_precision="round_trip")
+    stations["station_key"] = stations["station_key"].astype(str)
+    build_graph(stations=stations)
+
+def _affluence():
+    from affluence_builder.create_affluence import create_affluence
+    _, lignes = create_affluence()
+    if lignes is not None:
+        print(f"Affluence : {len(lignes)} branches recalculées")
+
+def _contraction():
+    from graph_builder.contraction import save_contraction_hierarchy
+    save_contraction_hierarchy()
+
+def _monuments():
+    from graph_builder.build_monument_access import save_monument_access
+    save_monument_access()
+
+def _tensor():
+    from affluence_builder.build_affluence_tensor import save_affluence_tensor
+    save_affluence_tensor()
+
+# Code qui lit le graphe au format colonne / code qui l'écrit
+LOAD_CODE = ["blobia/graph_store.py", "blobia/network.py"]
+GRAPH_CODE = ["graph_builder/build_graph.py", "blobia/geo.py"] + LOAD_CODE
+
+STAGES = [
+    Stage("normalize",
+          ["data/Stations_IDF.csv", "data/emplacement-des-gares-idf.csv", "graph_builder/normalize.py"],
+          ["data/Stations_IDF_normalized.csv", "data/emplacement_des_gares_idf_normalized.csv"],
+          _normalize),
+    Stage("align",
+          ["data/Stations_IDF_normalized.csv", "data/emplacement_des_gares_idf_normalized.csv",
+           "graph_builder/normalize.py", "utils.py"],
+          ["data/Stations_IDF_aligned.csv", "data/emplacement_des_gares_idf_aligned.csv"],
+          _align),
+    Stage("nodes",
+          ["data/emplacement_des_gares_idf_aligned.csv", "graph_builder/build_graph.py"],
+          ["data/graph_nodes.csv"],
+          _nodes),
+    Stage("coords",
+          ["data/Stations_IDF_aligned.csv", "data/graph_nodes.csv", "graph_builder/build_graph.py"],
+          ["data/stations_lignes_coords.csv"],
+          _coords),
+    Stage("graph",
+          ["data/stations_lignes_coords.csv"] + GRAPH_CODE,
+          ["data/graph_blobia.gpickle", "data/graph_edges.csv", "data/graph_blobia.graph"],
+          _graph),
+    Stage("affluence",
+          ["data/Stations_IDF_aligned.csv", "affluence_builder/create_affluence.py", "utils.py"],
+          ["data/Stations_IDF_aligned_affluence.csv", "data/Stations_IDF_aligned_affluence_params.json"],
+          _affluence),
+    Stage("contraction",
+          ["data/graph_blobia.graph", "graph_builder/contraction.py", "blobia/blob_solver.py",
+           "blobia/hierarchy.py"] + LOAD_CODE,
+          ["data/graph_blobia_ch.npz"],
+          _contraction),
+    Stage("tensor",
+          ["data/graph_blobia.graph", "data/Stations_IDF_aligned_affluence.csv", "utils.py",
+           "affluence_builder/build_affluence_tensor.py", "affluence_builder/get_affluence.py",
+           "blobia/affluence_tensor.py"] + LOAD_CODE,
+          ["data/affluence_tensor.npy", "data/affluence_tensor_index.json"],
+          _tensor),
+    Stage("monuments",
+          ["data/monuments.csv", "data/graph_nodes.csv", "data/Stations_IDF_aligned.csv", "data/graph_blobia.graph",
+           "graph_builder/build_monument_access.py", "blobia/monument_access.py", "blobia/mapping.py",
+           "blobia/geo.py"] + LOAD_CODE,
+          ["data/monument_access.json"],
+          _monuments),
+]
+
+def _path(rel):
+    return os.path.join(BASE_DIR, rel)
+
+def stage_key(stage):
+    """
+    Empreinte d'une étape : contenu de chacune de ses entrées (données et code).
+    """
+    h = hashlib.sha1(stage.name.encode("utf-8"))
+    for rel in sorted(stage.inputs):
+        h.update(rel.encode("utf-8"))
+        h.update(file_fingerprint(_path(rel)).encode("ascii"))
+    return h.hexdigest()
+
+def _outputs_fingerprint(stage):
+    if not all(os.path.exists(_path(rel)) for rel in stage.outputs):
+        return None
+    return {rel: file_fingerprint(_path(rel)) for rel in stage.outputs}
+
+def _load_state():
+    if not os.path.exists(STATE_PATH):
+        return {}
+    with open(STATE_PATH) as f:
+        return json.load(f)
+
+def _save_state(state):
+    with open(STATE_PATH, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+def _dependencies(stages):
+    producers = {rel: s.name for s in stages for rel in s.outputs}
+    return {s.name: {producers[rel] for rel in s.inputs if rel in producers} for s in stages}
+
+def run(force=False, jobs=2, stages=STAGES):
+    """
+    Exécute le pipeline de données dans le processus : une étape n'est relancée que si l'empreinte
+    de ses entrées a changé depuis sa dernière exécution ou si ses sorties ont été modifiées ou
+    supprimées. Jusqu'à `jobs` étapes indépendantes tournent en parallèle (threads).
+    Renvoie {étape: "reconstruite" | "à jour"}.
+    """
+    t0 = time.perf_counter()
+    state = _load_state()
+    deps = _dependencies(stages)
+    by_name = {s.name: s for s in stages}
+    restantes = [s.name for s in stages]
+    statuts = {}
+
+    def execute(stage):
+        key = stage_key(stage)
+        previous = state.get(stage.name)
+        if (not force and previous is not None and previous["key"] == key
+                and previous["outputs"] == _outputs_fingerprint(stage)):
+            return "à jour", 0.0
+        t = time.perf_counter()
+        stage.fn()
+        # L'empreinte gardée est celle des entrées lues au lancement de l'étape
+        state[stage.name] = {"key": key, "outputs": _outputs_fingerprint(stage)}
+        return "reconstruite", time.perf_counter() - t
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        en_cours = {}
+        while restantes or en_cours:
+            for name in [n for n in restantes if deps[n] <= statuts.keys()]:
+                restantes.remove(name)
+                en_cours[pool.submit(execute, by_name[name])] = name
+            finies, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for future in finies:
+                name = en_cours.pop(future)
+                try:
+                    statut, duree = future.result()
+                except Exception:
+                    # Les étapes déjà terminées restent à jour au prochain lancement
+                    _save_state(state)
+                    raise
+                statuts[name] = statut
+                print(f"[{name}] {statut}" + (f" en {duree:.2f} s" if statut == "reconstruite" else ""))
+
+    _save_state(state)
+    print(f"Pipeline terminé en {time.perf_counter() - t0:.2f} s "
+          f"({sum(s == 'reconstruite' for s in statuts.values())} étapes reconstruites)")
+    return statuts
 
 if __name__ == '__main__':
-    run()
+    parser = argparse.ArgumentParser(description="Pipeline de données Blob IA (étapes ignorées si rien n'a changé)")
+    parser.add_argument("--force", action="store_true", help="relance toutes les étapes")
+    parser.add_argument("--jobs", type=int, default=2, help="étapes indépendantes exécutées en parallèle")
+    args = parser.parse_args()
+    run(force=args.force, jobs=args.jobs)
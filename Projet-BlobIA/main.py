@@ -1,24 +1,51 @@
 import os
 import pickle
 import pandas as pd
-import networkx as nx
 
-from blobia.mapping import normalize_name, find_stations_near_monument
+from blobia.mapping import normalize_name
 from affluence_builder.get_affluence import get_affluence_mapping_from_file
-from blobia.route import find_best_route
+from blobia.route import find_best_route, find_route_front
+from blobia.pareto import routes_for_curseur
+from blobia.network import compile_network
 from blobia.show_route import format_route
+from blobia.cache import RouteCache, cached_call, cached_stations_near_monument
+from blobia.profiling import add_stats_hook, format_stats
+from blobia.affluence_tensor import load_affluence_tensor
+from blobia.graph_store import load_graph_store
+from blobia.hierarchy import load_hierarchy
+from blobia.monument_access import load_monument_access
+from blobia.search import load_name_index
 
 DEPART_STR = "aeroport d'orly"
 MONUMENT_STR = "Jardin de la Tour Effeil"
 JOUR = "lundi"
 HEURE = 8
 
+# Requêtes (stations proches, trajets) mémorisées pour la durée du processus
+ROUTE_CACHE = RouteCache(maxsize=256)
+
+# BLOBIA_STATS=1 : affiche le profil (compteurs, durées par phase) de chaque recherche
+AFFICHER_STATS = bool(os.environ.get("BLOBIA_STATS"))
+
+# BLOBIA_MOTEUR : "blob" par défaut, la recherche blob (blob_path_solver), une par curseur ;
+# "pareto" : moteur multi-critère (blobia/pareto.py), une seule recherche pour les 10 curseurs
+# mais un autre score (chaque changement de ligne est pénalisé) ; "ch" : meilleur trajet du mode
+# rapide sur la hiérarchie de contraction (graph_builder/contraction.py), curseur ignoré
+MOTEUR = os.environ.get("BLOBIA_MOTEUR", "blob")
+
 def main():
     BASE = os.path.dirname(os.path.abspath(__file__))
     graph_path = os.path.join(BASE, "data", "graph_blobia.gpickle")
+    store_path = os.path.join(BASE, "data", "graph_blobia.graph")
     affluence_path = os.path.join(BASE, "data", "Stations_IDF_aligned_affluence.csv")
     monuments_csv = os.path.join(BASE, "data", "monuments.csv")
     stations_csv = os.path.join(BASE, "data", "graph_nodes.csv")
+    tensor_path = os.path.join(BASE, "data", "affluence_tensor.npy")
+    access_path = os.path.join(BASE, "data", "monument_access.json")
+    ch_path = os.path.join(BASE, "data", "graph_blobia_ch.npz")
+
+    if AFFICHER_STATS:
+        add_stats_hook(lambda nom, stats: print(format_stats(nom, stats)))
 
     print("==== Planificateur de trajet Métro/RER Blob IA ====\n")
     print(f"Départ : {DEPART_STR} | Arrivée : {MONUMENT_STR} | Jour : {JOUR} | Heure : {HEURE}h\n")
@@ -31,81 +58,122 @@ def main():
 
     print("\nChargement du graphe…")
     try:
-        with open(graph_path, "rb") as f:
-            G = pickle.load(f)
+        # Format colonne (mmap, sans pickle) s'il a été construit, sinon le pickle NetworkX
+        if os.path.exists(store_path):
+            net = load_graph_store(store_path).network()
+        else:
+            with open(graph_path, "rb") as f:
+                net = compile_network(pickle.load(f))
+        if MOTEUR == "ch":
+            load_hierarchy(ch_path, net)
     except Exception as e:
         print(f"Erreur lors du chargement du graphe : {e}")
         return
     try:
-        afflu_map = get_affluence_mapping_from_file(affluence_path, JOUR, HEURE)
-        afflu_df = pd.read_csv(affluence_path)  # Pour lier station -> ligne
+        # Tranche (jour, heure) du tenseur précalculé, sans copie ; sinon lecture du CSV
+        if os.path.exists(tensor_path):
+            afflu_map = load_affluence_tensor(tensor_path, net).slot(JOUR, HEURE)
+        else:
+            afflu_map = get_affluence_mapping_from_file(affluence_path, JOUR, HEURE)
     except Exception as e:
         print(f"Erreur lors du chargement de l'affluence : {e}")
         return
 
+    # Noms inconnus (fautes de frappe) : meilleure correspondance approchée
+    name_index = load_name_index(net, monuments_csv)
     dep_norm = normalize_name(DEPART_STR)
-    dep_node_ids = [n for n, d in G.nodes(data=True) if normalize_name(d.get("station_key", "")) == dep_norm]
+    dep_node_ids = net.nodes_of_station(dep_norm)
+    if not dep_node_ids:
+        dep_match = name_index.best(DEPART_STR, kind="station")
+        if dep_match is not None:
+            print(f"Départ « {DEPART_STR} » : station retenue « {dep_match} »")
+            dep_norm = dep_match
+            dep_node_ids = net.nodes_of_station(dep_norm)
     if not dep_node_ids:
         print(f"Départ « {DEPART_STR} » introuvable dans le graphe.")
         return
 
     # -- Sélection des stations d’arrivée proches du monument --
+    # Table d'accès précalculée par graph_pipeline.py (recherche dans un dict), sinon calcul
+    # à partir des CSV
+    monument = name_index.exact(MONUMENT_STR, "monument")
+    if monument is None:
+        monument = name_index.best(MONUMENT_STR, kind="monument") or MONUMENT_STR
+        print(f"Monument « {MONUMENT_STR} » : monument retenu « {monument} »")
     try:
-        arr_candidates = find_stations_near_monument(
-            MONUMENT_STR,
-            rayon_m=900,
-            monuments_csv=monuments_csv,
-            stations_csv=stations_csv
-        )
+        if os.path.exists(access_path):
+            access = load_monument_access(access_path, net)
+            arr_candidates = access.proches(monument, 900)
+            arr_station_keys = access.stations(monument, 900)
+        else:
+            arr_candidates = cached_stations_near_monument(
+                ROUTE_CACHE,
+                monument,
+                rayon_m=900,
+                monuments_csv=monuments_csv,
+                stations_csv=stations_csv
+            )
+            arr_station_keys = None
     except Exception as e:
         print(f"Erreur : {e}")
         return
 
     print(f" Stations proches considérées : {[st for st, _ in arr_candidates]}")
 
-    # Pour chaque station proche, trouve TOUTES ses lignes, ne garde que la plus proche par ligne
-    line_to_station = dict()  # {ligne: (station_key, distance)}
-    for st, dist in arr_candidates:
-        # Pour chaque ligne associée à cette station dans afflu_df
-        for _, row in afflu_df[afflu_df["station_key"].apply(lambda x: normalize_name(str(x)) == normalize_name(st))].iterrows():
-            line = str(row["ligne"])
-            if (line not in line_to_station) or (dist < line_to_station[line][1]):
-                line_to_station[line] = (normalize_name(st), dist)
-
-    # On ne garde qu'une station la plus proche par ligne
-    arr_station_keys = [s for s, _ in line_to_station.values()]
-    arr_lines = [line for line in line_to_station.keys()]
-
-    # On construit les node_ids d'arrivée
-    arr_node_ids = []
-    arr_debug = []
-    for node, data in G.nodes(data=True):
-        skey = normalize_name(data.get("station_key", ""))
-        line = str(data.get("ligne", ""))
-        if skey in arr_station_keys and line in arr_lines:
-            arr_node_ids.append(node)
-            arr_debug.append(f"{data.get('name', skey)} ({line})")
-
-    if not arr_node_ids:
-        print(f"Aucune station d’arrivée trouvée près du monument « {MONUMENT_STR} ».")
+    if arr_station_keys is None:
+        # Sans table d'accès : le CSV d'affluence lie chaque station à ses lignes
+        try:
+            afflu_df = pd.read_csv(affluence_path)
+        except Exception as e:
+            print(f"Erreur lors du chargement de l'affluence : {e}")
+            return
+        # Pour chaque station proche, trouve TOUTES ses lignes, ne garde que la plus proche par ligne
+        line_to_station = dict()  # {ligne: (station_key, distance)}
+        for st, dist in arr_candidates:
+            # Pour chaque ligne associée à cette station dans afflu_df
+            for _, row in afflu_df[afflu_df["station_key"].apply(lambda x: normalize_name(str(x)) == normalize_name(st))].iterrows():
+                line = str(row["ligne"])
+                if (line not in line_to_station) or (dist < line_to_station[line][1]):
+                    line_to_station[line] = (normalize_name(st), dist)
+
+        # On ne garde qu'une station la plus proche par ligne
+        arr_station_keys = [s for s, _ in line_to_station.values()]
+
+    if not arr_station_keys:
+        print(f"Aucune station d’arrivée trouvée près du monument « {monument} ».")
         return
 
-    print("\nCalcul du meilleur trajet (algorithme Blob)...")
-    result = find_best_route(
-        G=G,
-        affluence_mapping=afflu_map,
-        station_depart=dep_norm,
-        list_stations_arrivee=arr_station_keys,
-        curseur=curseur,
-        verbose=True
-    )
-
-    if result:
-        for i, r in enumerate(result, 1):
-            print(f"\n--- Trajet #{i} ---\n")
-            print(format_route(r))
+    if MOTEUR == "pareto":
+        print("\nCalcul des trajets pour tous les curseurs (algorithme Blob multi-critère)...")
+        front = cached_call(ROUTE_CACHE, find_route_front, net, afflu_map, dep_norm, arr_station_keys)
+    elif MOTEUR == "ch":
+        print("\nCalcul du trajet le plus rapide (hiérarchie de contraction)...")
     else:
-        print("Aucun trajet trouvé entre les points sélectionnés.")
+        print("\nCalcul du meilleur trajet (algorithme Blob)...")
+
+    while True:
+        if MOTEUR == "pareto":
+            # Les trajets de chaque curseur sont déjà dans le front : pas de nouvelle recherche
+            result = routes_for_curseur(front, curseur)
+        else:
+            result = cached_call(ROUTE_CACHE, find_best_route, net, afflu_map, dep_norm, arr_station_keys,
+                                 curseur=curseur, moteur=MOTEUR)
+        if result:
+            for i, r in enumerate(result, 1):
+                print(f"\n--- Trajet #{i} ---\n")
+                print(format_route(r))
+        else:
+            print("Aucun trajet trouvé entre les points sélectionnés.")
+            return
+        choix = input("\nAutre curseur 1 → 10 (Entrée pour quitter) : ").strip()
+        if not choix:
+            return
+        try:
+            curseur = int(choix)
+            assert 1 <= curseur <= 10
+        except (ValueError, AssertionError):
+            print("Erreur : Curseur doit être un entier entre 1 et 10.")
+            return
 
 if __name__ == "__main__":
     main()
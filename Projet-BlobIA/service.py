@@ -0,0 +1,194 @@
+import os
+import time
+import asyncio
+import argparse
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import List, Literal
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from affluence_builder.get_affluence import JOURS
+from blobia.engine import load_engine, init_worker, worker_ping, route_task, batch_task
+
+# --- Configuration (variables d'environnement, ou arguments de `python service.py`) ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("BLOBIA_DATA_DIR", os.path.join(BASE_DIR, "data"))
+# Processus de calcul : les recherches (Python pur) ne bloquent ni la boucle asyncio ni entre elles
+WORKERS = int(os.environ.get("BLOBIA_WORKERS", min(4, os.cpu_count() or 1)))
+# Départs par tâche de /batch : l'arbre partagé de batch_routes reste amorti sur le paquet
+BATCH_CHUNK = 64
+MAX_PAIRES = 20000
+
+# État du service (renseigné au démarrage par lifespan)
+_service = {}
+
+class RouteRequest(BaseModel):
+    depart: str
+    monument: str
+    jour: Literal[tuple(JOURS)] = "lundi"
+    heure: int = Field(8, ge=0, le=23)
+    curseur: int = Field(5, ge=1, le=10)
+    rayon_m: int = Field(900, gt=0, le=5000)
+    # "pareto" : moteur multi-critère (un front pour les 10 curseurs, autre score), sur demande ;
+    # "ch" : meilleur trajet du mode rapide sur la hiérarchie de contraction (un seul trajet)
+    moteur: Literal["blob", "pareto", "ch"] = "blob"
+
+class BatchRequest(BaseModel):
+    departs: List[str] = Field(min_length=1)
+    monuments: List[str] = Field(min_length=1)
+    jour: Literal[tuple(JOURS)] = "lundi"
+    heure: int = Field(8, ge=0, le=23)
+    curseur: int = Field(5, ge=1, le=10)
+    rayon_m: int = Field(900, gt=0, le=5000)
+    k: int = Field(3, ge=1, le=10)
+    moteur: Literal["ksp", "blob"] = "ksp"
+
+@asynccontextmanager
+async def lifespan(app):
+    # Moteur du processus principal : résolution des noms et des monuments, sans passer par le pool
+    t0 = time.perf_counter()
+    engine = load_engine(DATA_DIR)
+    pool = ProcessPoolExecutor(WORKERS, mp_context=get_context(), initializer=init_worker, initargs=(DATA_DIR,))
+    # Démarre les processus de travail (chargement du moteur) avant la première requête
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[loop.run_in_executor(pool, worker_ping) for _ in range(WORKERS)])
+    _service.update(engine=engine, pool=pool, workers=WORKERS, demarrage=time.time(),
+                    duree_demarrage_s=time.perf_counter() - t0, requetes={"route": 0, "batch": 0})
+    print(f"Service prêt en {_service['duree_demarrage_s']:.2f} s : {len(engine.net.node_keys)} noeuds, "
+          f"{WORKERS} processus de calcul")
+    try:
+        yield
+    finally:
+        pool.shutdown(cancel_futures=True)
+        _service.clear()
+
+app = FastAPI(title="Blob IA", description="Planificateur de trajets Métro/RER", lifespan=lifespan)
+
+def _resolve_depart(engine, nom):
+    station = engine.resolve_station(nom)
+    if station is None:
+        raise HTTPException(404, f"Départ « {nom} » introuvable dans le graphe.")
+    return station
+
+def _resolve_monument(engine, nom, rayon_m):
+    monument = engine.resolve_monument(nom)
+    if monument is None:
+        raise HTTPException(404, f"Monument « {nom} » introuvable.")
+    stations = engine.arrival_stations(monument, rayon_m)
+    if not stations:
+        raise HTTPException(404, f"Aucune station d’arrivée trouvée près du monument « {monument} ».")
+    return monument, stations
+
+@app.get("/health")
+async def health():
+    engine = _service["engine"]
+    return {
+        "statut": "ok",
+        "graphe": engine.net.fingerprint(),
+        "noeuds": len(engine.net.node_keys),
+        "stations": len(engine.net.stations),
+        "tenseur_affluence": engine.tensor is not None,
+        "table_acces": engine.access is not None,
+        "hierarchie": engine.net.hierarchy is not None,
+        "processus_calcul": _service["workers"],
+        "demarrage_s": round(_service["duree_demarrage_s"], 3),
+        "uptime_s": round(time.time() - _service["demarrage"], 1),
+        "requetes": _service["requetes"],
+    }
+
+@app.post("/route")
+async def route(req: RouteRequest):
+    """
+    Trajets d'un départ vers un monument pour un curseur (noms approchés acceptés).
+    """
+    t0 = time.perf_counter()
+    engine = _service["engine"]
+    station = _resolve_depart(engine, req.depart)
+    monument, arrivees = _resolve_monument(engine, req.monument, req.rayon_m)
+    loop = asyncio.get_running_loop()
+    try:
+        trajets, duree_calcul = await loop.run_in_executor(
+            _service["pool"], route_task, station, arrivees, req.jour, req.heure, req.curseur, req.moteur)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+    _service["requetes"]["route"] += 1
+    return {
+        "depart": station,
+        "monument": monument,
+        "stations_arrivee": arrivees,
+        "jour": req.jour,
+        "heure": req.heure,
+        "curseur": req.curseur,
+        "moteur": req.moteur,
+        "trajets": trajets,
+        "duree_calcul_s": duree_calcul,
+        "duree_s": time.perf_counter() - t0,
+    }
+
+@app.post("/batch")
+async def batch(req: BatchRequest):
+    """
+    Trajets de chaque départ vers chaque monument (batch_routes), répartis sur les processus de
+    calcul par paquets de BATCH_CHUNK départs. Un départ ou un monument inconnu donne des trajets
+    vides, comme une paire sans trajet.
+    """
+    if len(req.departs) * len(req.monuments) > MAX_PAIRES:
+        raise HTTPException(413, f"Au plus {MAX_PAIRES} paires départ/monument par requête.")
+    t0 = time.perf_counter()
+    engine = _service["engine"]
+    departs = [(nom, engine.resolve_station(nom)) for nom in req.departs]
+    connus = [station for _, station in departs if station is not None]
+
+    loop = asyncio.get_running_loop()
+    destinations = []
+    taches = []
+    for nom in req.monuments:
+        monument = engine.resolve_monument(nom)
+        arrivees = engine.arrival_stations(monument, req.rayon_m) if monument is not None else []
+        destinations.append((nom, monument))
+        paquets = [connus[i:i + BATCH_CHUNK] for i in range(0, len(connus), BATCH_CHUNK)] if arrivees else []
+        taches.append(asyncio.gather(*[
+            loop.run_in_executor(_service["pool"], batch_task, paquet, monument, arrivees,
+                                 req.jour, req.heure, req.curseur, req.k, req.moteur)
+            for paquet in paquets
+        ]))
+    resultats_paquets = await asyncio.gather(*taches)
+
+    resultats = []
+    for (nom, monument), paquets in zip(destinations, resultats_paquets):
+        trajets = iter([t for paquet in paquets for t in paquet])
+        for saisie, station in departs:
+            resultats.append({
+                "depart": saisie,
+                "station_depart": station,
+                "monument": nom,
+                "monument_retenu": monument,
+                "trajets": (next(trajets, []) if station is not None else []),
+            })
+    _service["requetes"]["batch"] += 1
+    return {
+        "paires": len(resultats),
+        "resultats": resultats,
+        "duree_s": time.perf_counter() - t0,
+    }
+
+@app.get("/search")
+async def search(q: str, limit: int = 10, kind: Literal["station", "monument"] = None):
+    """
+    Suggestions pour une saisie (autocomplétion des stations et des monuments).
+    """
+    resultats = _service["engine"].names.search(q, limit=limit, kind=kind)
+    return [{"nom": label, "type": type_, "cle": cle, "score": score} for label, type_, cle, score in resultats]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON de calcul de trajets Blob IA")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="processus de calcul")
+    args = parser.parse_args()
+    WORKERS = max(1, args.workers)
+    uvicorn.run(app, host=args.host, port=args.port)
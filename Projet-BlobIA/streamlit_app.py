@@ -3,27 +3,72 @@ import pandas as pd
 import pickle
 import os
 
-from blobia.mapping import normalize_name, find_stations_near_monument
+from blobia.mapping import normalize_name
 from affluence_builder.get_affluence import get_affluence_mapping_from_file
-from blobia.route import find_best_route
+from blobia.route import find_best_route, find_route_front
+from blobia.pareto import routes_for_curseur
+from blobia.network import compile_network
 from blobia.show_route import format_route
+from blobia.cache import RouteCache, cached_call, cached_stations_near_monument, file_fingerprint
+from blobia.profiling import StatsAggregator, add_stats_hook
+from blobia.affluence_tensor import load_affluence_tensor
+from blobia.graph_store import load_graph_store
+from blobia.monument_access import load_monument_access
+from blobia.hierarchy import load_hierarchy
+from blobia.search import load_name_index
 
 # --- Fonctions utilitaires pour chargement en cache ---
-@st.cache_data(show_spinner="Chargement du graphe…")
-def load_graph(graph_path):
+# L'empreinte du fichier fait partie de la clé : un fichier reconstruit est rechargé
+@st.cache_resource(show_spinner="Chargement du graphe…")
+def load_store(graph_path, empreinte=None):
+    # Format colonne (graph_blobia.graph) : tableaux en mmap, graphe NetworkX reconstruit à la demande
+    return load_graph_store(graph_path)
+
+@st.cache_resource(show_spinner="Chargement du graphe…")
+def load_graph(graph_path, empreinte=None):
+    # Pickle NetworkX, seulement si le format colonne n'a pas été construit
     with open(graph_path, "rb") as f:
         return pickle.load(f)
 
+@st.cache_resource(show_spinner="Compilation du réseau…")
+def load_network(graph_path, empreinte=None):
+    if os.path.isdir(graph_path):
+        return load_store(graph_path, empreinte).network()
+    return compile_network(load_graph(graph_path, empreinte))
+
 @st.cache_data(show_spinner="Chargement de l'affluence…")
-def load_affluence(affluence_path, jour, heure):
+def load_affluence(affluence_path, jour, heure, empreinte=None):
     return get_affluence_mapping_from_file(affluence_path, jour, heure)
 
-@st.cache_data(show_spinner="Chargement des stations…")
-def load_stations(stations_path):
-    df = pd.read_csv(stations_path)
-    # On retourne toutes les stations, même si doublons (plusieurs lignes par station)
-    df["station_key"] = df["station_key"].astype(str)
-    return df[["station", "station_key"]].drop_duplicates()
+@st.cache_resource(show_spinner="Ouverture du tenseur d'affluence…")
+def load_tensor(tensor_path, graph_path, empreinte=None):
+    # Un seul tenseur projeté en mémoire pour tous les (jour, heure), au lieu d'un dict par créneau
+    return load_affluence_tensor(tensor_path, load_network(graph_path, file_fingerprint(graph_path)))
+
+@st.cache_resource(show_spinner="Chargement des accès aux monuments…")
+def load_access(access_path, graph_path, empreinte=None):
+    return load_monument_access(access_path, load_network(graph_path, file_fingerprint(graph_path)))
+
+@st.cache_resource(show_spinner="Chargement de la hiérarchie de contraction…")
+def load_ch(ch_path, graph_path, empreinte=None):
+    # Attachée au réseau en cache (net.hierarchy), lue au premier trajet du moteur "ch" ; l'empreinte
+    # couvre aussi le graphe : un réseau rechargé reçoit à nouveau la hiérarchie
+    return load_hierarchy(ch_path, load_network(graph_path, file_fingerprint(graph_path)))
+
+@st.cache_resource
+def get_route_cache():
+    # Partagé entre les sessions : les mêmes requêtes reviennent toute la journée
+    return RouteCache(maxsize=512, ttl=6 * 3600)
+
+@st.cache_resource
+def get_stats_aggregator():
+    # Un seul hook par processus : cumule le profil de chaque recherche effectivement calculée
+    return add_stats_hook(StatsAggregator())
+
+@st.cache_resource(show_spinner="Index des noms…")
+def load_names(graph_path, monuments_path, empreinte=None):
+    # Trigrammes des stations (synonymes compris) et des monuments, construit une fois
+    return load_name_index(load_network(graph_path, file_fingerprint(graph_path)), monuments_path)
 
 @st.cache_data(show_spinner="Chargement des monuments…")
 def load_monuments(monuments_path):
@@ -33,11 +78,25 @@ def load_monuments(monuments_path):
 # --- Chemins fichiers ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "data")
-GRAPH_PATH = os.path.join(DATA_DIR, "graph_blobia.gpickle")
+# Format colonne s'il a été construit (graph_builder/build_graph.py), sinon le pickle NetworkX
+GRAPH_PATH = os.path.join(DATA_DIR, "graph_blobia.graph")
+if not os.path.isdir(GRAPH_PATH):
+    GRAPH_PATH = os.path.join(DATA_DIR, "graph_blobia.gpickle")
 AFFLUENCE_PATH = os.path.join(DATA_DIR, "Stations_IDF_aligned_affluence.csv")
-STATIONS_PATH = os.path.join(DATA_DIR, "Stations_IDF_aligned.csv")
 MONUMENTS_PATH = os.path.join(DATA_DIR, "monuments.csv")
 GRAPH_NODES_PATH = os.path.join(DATA_DIR, "graph_nodes.csv")
+TENSOR_PATH = os.path.join(DATA_DIR, "affluence_tensor.npy")
+ACCESS_PATH = os.path.join(DATA_DIR, "monument_access.json")
+CH_PATH = os.path.join(DATA_DIR, "graph_blobia_ch.npz")
+
+MOTEURS = {
+    "blob": "Blob (une recherche par curseur)",
+    "pareto": "Multi-critère (tous les curseurs en une recherche)",
+    "ch": "Hiérarchie de contraction (le plus rapide, curseur ignoré)",
+}
+
+# Enregistré avant toute recherche (dès le premier passage du script)
+PROFILS = get_stats_aggregator()
 
 # --- Onglets/sidebar ---
 st.sidebar.title("Navigation")
@@ -53,17 +112,21 @@ if page == "Calcul d'itinéraire":
     st.title("🟢 Planificateur de trajet Métro/RER Blob IA")
     st.markdown("Calcule le meilleur trajet selon tes critères : rapidité ou confort d'affluence.")
 
-    # Chargement listes stations/monuments
-    stations_df = load_stations(STATIONS_PATH)
+    # Chargement liste monuments et index des noms (recherche approchée des stations)
     monuments_df = load_monuments(MONUMENTS_PATH)
-    # --- mapping affichage -> clé ---
-    station_affichage_to_key = dict(zip(stations_df["station"], stations_df["station_key"]))
+    name_index = load_names(GRAPH_PATH, MONUMENTS_PATH, file_fingerprint(MONUMENTS_PATH))
+
+    # Hors formulaire : chaque frappe met à jour les suggestions (au plus 10 envoyées au navigateur,
+    # au lieu de la liste complète des stations)
+    recherche_depart = st.text_input("Rechercher la station de départ", "Châtelet", key="recherche_depart")
+    suggestions = name_index.search(recherche_depart, limit=10, kind="station")
 
     with st.form("params_form"):
-        # Liste triée des noms "jolis" pour la UI
-        station_depart_affichage = st.selectbox(
+        # (nom affiché, type, clé, score) : on affiche le nom, on garde la clé
+        station_depart = st.selectbox(
             "Station de départ",
-            stations_df["station"].sort_values().tolist(),
+            suggestions,
+            format_func=lambda r: r[0],
             key="station_depart"
         )
         monument_arrivee = st.selectbox(
@@ -74,51 +137,96 @@ if page == "Calcul d'itinéraire":
         jours = ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
         jour = st.selectbox("Jour du trajet", jours, index=0, key="jour")
         heure = st.slider("Heure du trajet", 0, 23, 8, key="heure")
-        curseur = st.slider("Curseur : 1 (Rapide) → 10 (Affluence minimale)", 1, 10, 5, key="curseur")
+        # Par défaut, la recherche blob d'origine par curseur ; multi-critère (blobia/pareto.py) :
+        # une recherche pour les 10 curseurs, mais chaque changement de ligne est pénalisé ;
+        # hiérarchie de contraction (blobia/hierarchy.py) : un seul trajet, le plus rapide
+        moteur = st.selectbox("Moteur", list(MOTEURS), format_func=MOTEURS.get, key="moteur")
         submit = st.form_submit_button("Calculer l’itinéraire")
+    # Hors formulaire : bouger le curseur relit le front (multi-critère) ou relance une recherche
+    # blob (mise en cache), sans revalider le formulaire
+    curseur = st.slider("Curseur : 1 (Rapide) → 10 (Affluence minimale)", 1, 10, 5, key="curseur")
 
     if submit:
         try:
             with st.spinner("Chargement du réseau et des données…"):
-                G = load_graph(GRAPH_PATH)
-                afflu_map = load_affluence(AFFLUENCE_PATH, jour, heure)
+                net = load_network(GRAPH_PATH, file_fingerprint(GRAPH_PATH))
+                route_cache = get_route_cache()
+            if station_depart is None:
+                st.error(f"Aucune station ne correspond à « {recherche_depart} ».")
+                st.stop()
             # Prend la vraie clé station_key
-            station_depart_key = station_affichage_to_key[station_depart_affichage]
-            # Recherche des nodes du graphe pour cette clé
-            stations_nodes = [n for n, d in G.nodes(data=True) if d.get("station_key", "") == station_depart_key]
+            station_depart_affichage, _, station_depart_key, _ = station_depart
+            # Noeuds du réseau pour cette clé (index des stations du réseau)
+            stations_nodes = net.nodes_of_station(station_depart_key)
             if not stations_nodes:
                 st.error(f"Station de départ « {station_depart_affichage} » (clé: {station_depart_key}) introuvable dans le réseau.")
                 st.stop()
-            # Recherche des stations proches du monument (toujours par clé)
-            arr_candidates = find_stations_near_monument(
-                monument_arrivee,
-                rayon_m=900,
-                monuments_csv=MONUMENTS_PATH,
-                stations_csv=GRAPH_NODES_PATH
-            )
+            # Recherche des stations proches du monument (toujours par clé) : table d'accès
+            # précalculée si elle existe, sinon calcul à partir des CSV
+            if os.path.exists(ACCESS_PATH):
+                access = load_access(ACCESS_PATH, GRAPH_PATH, file_fingerprint(ACCESS_PATH))
+                arr_candidates = access.proches(monument_arrivee, 900)
+            else:
+                arr_candidates = cached_stations_near_monument(
+                    route_cache,
+                    monument_arrivee,
+                    rayon_m=900,
+                    monuments_csv=MONUMENTS_PATH,
+                    stations_csv=GRAPH_NODES_PATH
+                )
             arr_station_keys = [st_key for st_key, _ in arr_candidates]
             if not arr_station_keys:
                 st.error(f"Aucun accès métro/RER détecté pour le monument « {monument_arrivee} ».")
                 st.stop()
-            # Calcul du trajet (toujours avec la clé !)
-            result = find_best_route(
-                G=G,
-                affluence_mapping=afflu_map,
-                station_depart=station_depart_key,
-                list_stations_arrivee=arr_station_keys,
-                curseur=curseur,
-                verbose=False
-            )
-            if result:
-                st.success("Résultats trouvés !")
-                for i, trajet in enumerate(result):
-                    st.markdown(f"**Trajet #{i+1}**")
-                    st.code(format_route(trajet))
-            else:
-                st.warning("Aucun trajet n'a pu être trouvé entre ces points pour vos critères.")
+            # Requête retenue (toujours avec la clé !) : trajets calculés plus bas pour le curseur courant
+            st.session_state["requete"] = (station_depart_key, arr_station_keys, jour, heure, moteur)
         except Exception as e:
+            st.session_state.pop("requete", None)
             st.error(f"Erreur lors du calcul : {e}")
 
+    # Trajets du curseur courant pour la dernière requête validée
+    result = None
+    if "requete" in st.session_state:
+        station_depart_key, arr_station_keys, jour_req, heure_req, moteur_req = st.session_state["requete"]
+        try:
+            with st.spinner("Calcul des trajets…"):
+                net = load_network(GRAPH_PATH, file_fingerprint(GRAPH_PATH))
+                if os.path.exists(TENSOR_PATH):
+                    afflu_map = load_tensor(TENSOR_PATH, GRAPH_PATH, file_fingerprint(TENSOR_PATH)).slot(jour_req, heure_req)
+                else:
+                    afflu_map = load_affluence(AFFLUENCE_PATH, jour_req, heure_req, file_fingerprint(AFFLUENCE_PATH))
+                if moteur_req == "ch" and os.path.exists(CH_PATH):
+                    load_ch(CH_PATH, GRAPH_PATH, (file_fingerprint(CH_PATH), file_fingerprint(GRAPH_PATH)))
+                if moteur_req == "pareto":
+                    front = cached_call(get_route_cache(), find_route_front, net, afflu_map,
+                                        station_depart_key, arr_station_keys)
+                    result = routes_for_curseur(front, curseur)
+                else:
+                    result = cached_call(get_route_cache(), find_best_route, net, afflu_map,
+                                         station_depart_key, arr_station_keys, curseur=curseur,
+                                         moteur=moteur_req)
+        except Exception as e:
+            st.session_state.pop("requete", None)
+            st.error(f"Erreur lors du calcul : {e}")
+
+    info = get_route_cache().info()
+    st.sidebar.caption(f"Cache trajets : {info['hits']} hits / {info['misses']} misses, {info['taille']} entrées")
+    if PROFILS.dernier is not None:
+        with st.sidebar.expander(f"Profil des recherches ({PROFILS.requetes})"):
+            st.caption(f"Dernière recherche ({PROFILS.dernier[0]})")
+            st.json(PROFILS.dernier[1])
+            st.caption("Cumul")
+            st.dataframe(pd.DataFrame(PROFILS.summary()).T)
+
+    if "requete" in st.session_state:
+        if result:
+            st.success("Résultats trouvés !")
+            for i, trajet in enumerate(result):
+                st.markdown(f"**Trajet #{i+1}**")
+                st.code(format_route(trajet))
+        else:
+            st.warning("Aucun trajet n'a pu être trouvé entre ces points pour vos critères.")
+
 # --- Page 2 : À propos / future page custom ---
 elif page == "À propos":
     st.title("À propos")
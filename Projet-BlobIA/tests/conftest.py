@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les tests importent le projet comme les scripts (blobia, utils, affluence_builder...)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
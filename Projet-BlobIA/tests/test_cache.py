@@ -0,0 +1,35 @@
+import sys
+import threading
+import time
+
+from blobia.cache import RouteCache
+
+def test_shared_between_threads():
+    # Comme le cache de streamlit_app.py (avec ttl), partagé par les threads des sessions ; l'horloge
+    # en Python laisse un thread en interrompre un autre au milieu de get
+    cache = RouteCache(maxsize=2, ttl=3600, clock=lambda: time.monotonic())
+    nb_threads, nb_appels = 8, 20000
+    erreurs = []
+
+    def session(t):
+        try:
+            for i in range(nb_appels):
+                cache.get_or_compute((7 * t + i) % 3, lambda: i)
+        except Exception as e:
+            erreurs.append(e)
+
+    intervalle = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # bascules de thread fréquentes
+    try:
+        threads = [threading.Thread(target=session, args=(t,)) for t in range(nb_threads)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+    finally:
+        sys.setswitchinterval(intervalle)
+
+    assert erreurs == []
+    info = cache.info()
+    assert info["hits"] + info["misses"] == nb_threads * nb_appels
+    assert info["taille"] == len(cache._entries) <= 2
@@ -0,0 +1,25 @@
+import pytest
+
+from affluence_builder import create_affluence as ca
+
+def _build(tmp_path, nom, incremental):
+    sortie = str(tmp_path / nom)
+    df, lignes = ca.create_affluence(output_path=sortie, incremental=incremental)
+    with open(sortie, "rb") as f:
+        return f.read(), lignes
+
+@pytest.mark.parametrize("constante, valeur", [("PROPAGATION_FACTOR", 0.8), ("SCORE_MIN", 0.2)])
+def test_changed_constant_rebuilds_everything(tmp_path, monkeypatch, constante, valeur):
+    # Premier CSV avec les constantes d'origine, puis reconstruction incrémentale après changement
+    _build(tmp_path, "affluence.csv", incremental=True)
+    monkeypatch.setattr(ca, constante, valeur)
+    incremental, lignes = _build(tmp_path, "affluence.csv", incremental=True)
+    complet, _ = _build(tmp_path, "complet.csv", incremental=False)
+    assert lignes is None
+    assert incremental == complet
+
+def test_unchanged_parameters_stay_incremental(tmp_path):
+    premier, _ = _build(tmp_path, "affluence.csv", incremental=True)
+    second, lignes = _build(tmp_path, "affluence.csv", incremental=True)
+    assert lignes == set()
+    assert second == premier
@@ -0,0 +1,14 @@
+import os
+
+from blobia.engine import RoutingEngine
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+def test_arrival_stations_per_line():
+    # Même sélection que main.py : la station la plus proche de chaque ligne, table d'accès ou non
+    engine = RoutingEngine(DATA_DIR)
+    monument = engine.resolve_monument("Tour Eiffel")
+    attendu = ["champ de mars", "bir hakeim", "iena"]
+    assert engine.arrival_stations(monument, 900) == attendu
+    engine.access = None
+    assert engine.arrival_stations(monument, 900) == attendu
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import service
+from blobia.engine import load_engine
+from blobia.graph_store import load_graph_store
+from blobia.hierarchy import load_hierarchy
+from blobia.route import find_best_route
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+CH_PATH = os.path.join(DATA_DIR, "graph_blobia_ch.npz")
+
+@pytest.fixture(scope="module")
+def client():
+    service.WORKERS = 1
+    with TestClient(service.app) as c:
+        yield c
+
+def test_route_ch_through_service(client):
+    assert client.get("/health").json()["hierarchie"] is True
+    reponse = client.post("/route", json={"depart": "chatelet", "monument": "Tour Eiffel", "moteur": "ch"})
+    assert reponse.status_code == 200
+    corps = reponse.json()
+    assert corps["moteur"] == "ch"
+    assert len(corps["trajets"]) == 1
+
+    # Même trajet que find_best_route sur le réseau du moteur (hiérarchie chargée au démarrage)
+    engine = load_engine(DATA_DIR)
+    attendu = find_best_route(engine.net, engine.affluence("lundi", 8), corps["depart"],
+                              corps["stations_arrivee"], moteur="ch")
+    assert corps["trajets"][0]["raw_path"] == attendu[0]["raw_path"]
+
+def test_hierarchy_of_other_graph_refused(tmp_path):
+    net = load_graph_store(os.path.join(DATA_DIR, "graph_blobia.graph")).network()
+    with np.load(CH_PATH, allow_pickle=False) as data:
+        arrays = dict(data)
+    arrays["graph"] = np.array("autre graphe")
+    with open(tmp_path / "ch.npz", "wb") as f:
+        np.savez(f, **arrays)
+    with pytest.raises(ValueError, match="contraction.py"):
+        load_hierarchy(str(tmp_path / "ch.npz"), net)
+    assert net.hierarchy is None
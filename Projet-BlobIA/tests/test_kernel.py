@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from blobia.affluence_tensor import load_affluence_tensor
+from blobia.graph_store import load_graph_store
+from blobia.kernel import NUMBA_AVAILABLE
+from blobia.route import find_best_route
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+REQUETES = [
+    ("aeroport d'orly", ["champ de mars", "bir hakeim"]),
+    ("chatelet", ["la defense"]),
+    ("nation", ["gare du nord", "saint lazare"]),
+    ("cergy le haut", ["marne la vallee chessy parc disneyland"]),
+]
+
+pytestmark = pytest.mark.skipif(not NUMBA_AVAILABLE, reason="numba absent")
+
+@pytest.fixture(scope="module")
+def net():
+    return load_graph_store(os.path.join(DATA_DIR, "graph_blobia.graph")).network()
+
+@pytest.mark.parametrize("max_front", [None, 200])
+def test_numba_matches_python(net, max_front):
+    # Mêmes trajets et mêmes compteurs que la boucle Python, départages compris
+    slot = load_affluence_tensor(os.path.join(DATA_DIR, "affluence_tensor.npy"), net).slot("lundi", 8)
+    for depart, arrivees in REQUETES:
+        for curseur in (1, 5, 10):
+            resultats = []
+            for backend in ("python", "numba"):
+                stats = {}
+                trajets = find_best_route(net, slot, depart, arrivees, curseur=curseur, backend=backend,
+                                          max_front=max_front, stats=stats)
+                stats.pop("durees")
+                resultats.append((trajets, stats))
+            assert resultats[0] == resultats[1]
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+from affluence_builder.get_affluence import get_affluence_mapping_from_file
+from blobia.affluence_tensor import load_affluence_tensor
+from blobia.batch import batch_routes
+from blobia.graph_store import load_graph_store
+from blobia.parallel import parallel_batch_routes
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+DEPARTS = ["chatelet", "nation", "la defense", "gare de lyon", "inconnue"]
+DESTINATIONS = {"Tour Eiffel": ["champ de mars", "bir hakeim"], "Aucune": []}
+
+@pytest.fixture(scope="module")
+def net():
+    return load_graph_store(os.path.join(DATA_DIR, "graph_blobia.graph")).network()
+
+def _expected(net, affluence):
+    return list(batch_routes(net, affluence, DEPARTS, DESTINATIONS, curseur=5))
+
+def test_tensor_slot_through_pool(net):
+    # Tranche du tenseur (memmap float32, vecteur par noeud) : acceptée comme par batch_routes
+    slot = load_affluence_tensor(os.path.join(DATA_DIR, "affluence_tensor.npy"), net).slot("lundi", 8)
+    resultats = list(parallel_batch_routes(net, slot, DEPARTS, DESTINATIONS, curseur=5, workers=2, chunk=2))
+    assert resultats == _expected(net, slot)
+    assert any(trajets for _, _, trajets in resultats)
+
+def test_mapping_through_pool(net):
+    mapping = get_affluence_mapping_from_file(
+        os.path.join(DATA_DIR, "Stations_IDF_aligned_affluence.csv"), "lundi", 8)
+    resultats = list(parallel_batch_routes(net, mapping, DEPARTS, DESTINATIONS, curseur=5, workers=2, chunk=2))
+    assert resultats == _expected(net, mapping)